@@ -0,0 +1,417 @@
+import asyncio
+import gzip
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+from itertools import groupby, islice
+from typing import Collection, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Connection, func, select  # type: ignore[attr-defined]
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import text_of
+from api.partitions import Partition, list_partitions
+from api.routers.utils import NO_FILTER, LogFilter
+
+LOG_ARCHIVE_DIR: str = os.getenv("LOG_ARCHIVE_DIR", "./archive")
+LOG_ARCHIVE_AFTER_DAYS: int = int(os.getenv("LOG_ARCHIVE_AFTER_DAYS", "0"))
+LOG_ARCHIVE_SEGMENT_ROWS: int = int(os.getenv("LOG_ARCHIVE_SEGMENT_ROWS", "100000"))
+
+ARCHIVE_CHUNK_SIZE = 1000
+SEGMENT_SUFFIX = ".ndjson.gz"
+SIDECAR_SUFFIX = ".json"
+
+
+class ArchivedLog(NamedTuple):
+    """A log entry read back from a segment; has the same fields as a row selected with `log_columns()`."""
+    id: int
+    user_id: int
+    command: str
+    timestamp: datetime
+    response: str
+
+
+class Segment(NamedTuple):
+    """
+    Sidecar index of one immutable segment file.
+
+    A segment holds the logs of one partition month for a contiguous range of user ids, sorted by
+    `(timestamp, id)`, so a read can skip it by user id, by date or by cursor without opening it.
+    `first_id` and `last_id` are the ids of its first and last log in that order; sidecars written
+    before they were recorded leave them unset, and those segments are skipped by timestamp alone.
+    """
+    name: str
+    partition: str
+    rows: int
+    min_timestamp: datetime
+    max_timestamp: datetime
+    min_user_id: int
+    max_user_id: int
+    first_id: Optional[int] = None
+    last_id: Optional[int] = None
+
+    @property
+    def prefix(self) -> str:
+        """`<partition>_<lowest id>` of the partition contents the segment was written from."""
+        return self.name.rsplit("_", 1)[0]
+
+    def matches(
+            self,
+            user_id: Optional[int],
+            start_date: Optional[datetime],
+            end_date: Optional[datetime],
+            log_filter: LogFilter = NO_FILTER,
+            cursor: Optional[Tuple[datetime, int]] = None,
+            descending: bool = False
+    ) -> bool:
+        if user_id is not None and not self.min_user_id <= user_id <= self.max_user_id:
+            return False
+        if log_filter.user_ids and not any(self.min_user_id <= user <= self.max_user_id for user in log_filter.user_ids):
+            return False
+        if start_date and self.max_timestamp < start_date:
+            return False
+        if end_date and self.min_timestamp > end_date:
+            return False
+        if cursor and descending and self.min_timestamp >= cursor[0]:
+            # Every log is at or after the cursor unless one shares its timestamp with a smaller id.
+            return self.min_timestamp == cursor[0] and (self.first_id is None or self.first_id < cursor[1])
+        if cursor and not descending and self.max_timestamp <= cursor[0]:
+            return self.max_timestamp == cursor[0] and (self.last_id is None or self.last_id > cursor[1])
+        return True
+
+
+class LogArchive:
+    """
+    Cold tier of logs that were moved out of the database into gzip NDJSON segment files.
+
+    Each `<name>.ndjson.gz` segment has a `<name>.json` sidecar with its row count and its min/max
+    timestamp and user id. The sidecar is written last, so a segment only becomes visible once it
+    is complete. Sidecars and the directory listing are cached in memory; the listing is read again
+    after this archive writes or removes segments, or when the directory changes under another process.
+    Segment files are only opened by reads that need them.
+    """
+
+    def __init__(self, directory: str, segment_rows: int) -> None:
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self._sidecars: Dict[str, Segment] = {}
+        # Modification time of the directory when it was last listed, None once the listing is stale.
+        self._listed: Optional[int] = None
+
+    def segments(self) -> List[Segment]:
+        try:
+            modified = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if modified != self._listed:
+            names = sorted(
+                entry.name[:-len(SIDECAR_SUFFIX)]
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith(SIDECAR_SUFFIX)
+            )
+            self._sidecars = {name: self._sidecars.get(name) or self._load_sidecar(name) for name in names}
+            self._listed = modified
+        return list(self._sidecars.values())
+
+    def matching(
+            self,
+            live: Collection[str],
+            user_id: Optional[int],
+            start_date: Optional[datetime],
+            end_date: Optional[datetime],
+            log_filter: LogFilter = NO_FILTER,
+            cursor: Optional[Tuple[datetime, int]] = None,
+            descending: bool = False
+    ) -> List[Segment]:
+        """
+        Segments that may hold logs for the filters, oldest first.
+
+        With `cursor`, segments that end at or before it (start at or after it when `descending`) are
+        left out, so paging past the archive opens no segment at all.
+
+        Segments written from the contents of a live partition, whose prefixes `read_live_prefixes` lists,
+        are skipped: the archiver drops the partition only after all of its segments are written, so until
+        then the database is authoritative for those logs.
+        """
+        return [
+            segment for segment in self.segments()
+            if segment.prefix not in live
+            and segment.matches(user_id, start_date, end_date, log_filter, cursor, descending)
+        ]
+
+    def iter_rows(
+            self,
+            segments: Sequence[Segment],
+            user_id: Optional[int],
+            start_date: Optional[datetime],
+            end_date: Optional[datetime],
+            cursor: Optional[Tuple[datetime, int]],
+            log_filter: LogFilter = NO_FILTER,
+            descending: bool = False
+    ) -> Iterator[ArchivedLog]:
+        """
+        Yield the archived logs matching the filters in `(timestamp, id)` order, after `cursor` if given.
+
+        `descending` yields the newest first and continues before `cursor`. Segments are written oldest
+        first, so the matching logs of one month are then held in memory to be reversed.
+        """
+        months = groupby(sorted(segments, key=lambda segment: segment.partition), lambda segment: segment.partition)
+        for _, month in (reversed([(name, list(month)) for name, month in months]) if descending else months):
+            streams = [
+                self._read_segment(segment, user_id, start_date, end_date, cursor, log_filter, descending)
+                for segment in month
+            ]
+            merged = heapq.merge(*streams, key=lambda log: (log.timestamp, log.id))
+            yield from reversed(list(merged)) if descending else merged
+
+    def read(
+            self,
+            segments: Sequence[Segment],
+            user_id: Optional[int],
+            start_date: Optional[datetime],
+            end_date: Optional[datetime],
+            cursor: Optional[Tuple[datetime, int]],
+            count: int,
+            log_filter: LogFilter = NO_FILTER,
+            descending: bool = False
+    ) -> List[ArchivedLog]:
+        rows = self.iter_rows(segments, user_id, start_date, end_date, cursor, log_filter, descending)
+        return list(islice(rows, count))
+
+    def write_partition(self, connection: Connection, partition: Partition) -> List[Segment]:
+        """
+        Write the logs of `partition` into segments of about `segment_rows` rows, split by user id range.
+
+        Segment names are derived from the partition and its lowest id, so archiving the same rows again
+        replaces their segments instead of duplicating them, while rows that reach an already archived
+        month later get segments of their own.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        table = partition.table
+        prefix = f"{partition.name}_{connection.scalar(select(func.min(table.c.id)))}"
+        self._remove(prefix)
+        counts = connection.execute(
+            select(table.c.user_id, func.count()).group_by(table.c.user_id).order_by(table.c.user_id)  # type: ignore[arg-type]
+        ).all()
+
+        ranges: List[Tuple[int, int]] = []
+        first, rows = None, 0
+        for user_id, count in counts:
+            first = user_id if first is None else first
+            rows += count
+            if rows >= self.segment_rows:
+                ranges.append((first, user_id))
+                first, rows = None, 0
+        if first is not None:
+            ranges.append((first, counts[-1][0]))
+
+        segments = []
+        for number, (low, high) in enumerate(ranges):
+            query = (
+                select(
+                    table.c.id,  # type: ignore[arg-type]
+                    table.c.user_id,
+                    text_of(table.c.command_id),
+                    table.c.timestamp,
+                    text_of(table.c.response_id)
+                )
+                .where(table.c.user_id.between(low, high))
+                .order_by(table.c.timestamp, table.c.id)
+                .execution_options(yield_per=ARCHIVE_CHUNK_SIZE)
+            )
+            logs = (ArchivedLog(*row) for row in connection.execute(query))
+            segments.append(self._write_segment(f"{prefix}_{number:04d}", partition.name, logs))
+        return segments
+
+    def drop_expired(self, cutoff: datetime) -> List[str]:
+        """Delete the segments of every partition month that ended at or before `cutoff`."""
+        expired = sorted({
+            segment.partition for segment in self.segments()
+            if Partition.named(segment.partition).end <= cutoff
+        })
+        for name in expired:
+            self._remove(name)
+        return expired
+
+    def _read_segment(
+            self,
+            segment: Segment,
+            user_id: Optional[int],
+            start_date: Optional[datetime],
+            end_date: Optional[datetime],
+            cursor: Optional[Tuple[datetime, int]],
+            log_filter: LogFilter = NO_FILTER,
+            descending: bool = False
+    ) -> Iterator[ArchivedLog]:
+        with gzip.open(os.path.join(self.directory, segment.name + SEGMENT_SUFFIX), "rt", encoding="utf-8") as file:
+            for line in file:
+                log = decode_log(line)
+                if end_date and log.timestamp > end_date:
+                    return
+                if user_id is not None and log.user_id != user_id:
+                    continue
+                if start_date and log.timestamp < start_date:
+                    continue
+                if cursor and ((log.timestamp, log.id) >= cursor if descending else (log.timestamp, log.id) <= cursor):
+                    continue
+                if log_filter.active and not log_filter.matches(log):
+                    continue
+                yield log
+
+    def _write_segment(self, name: str, partition: str, logs: Iterator[ArchivedLog]) -> Segment:
+        path = os.path.join(self.directory, name + SEGMENT_SUFFIX)
+        rows = 0
+        first: Optional[ArchivedLog] = None
+        last: Optional[ArchivedLog] = None
+        min_user_id = max_user_id = 0
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as file:
+            for log in logs:
+                file.write(encode_log(log))
+                rows += 1
+                if first is None:
+                    first, min_user_id, max_user_id = log, log.user_id, log.user_id
+                last = log
+                min_user_id = min(min_user_id, log.user_id)
+                max_user_id = max(max_user_id, log.user_id)
+        os.replace(path + ".tmp", path)
+
+        # `archive` never writes an empty user id range, and its logs come sorted by `(timestamp, id)`.
+        assert first is not None and last is not None
+        segment = Segment(
+            name, partition, rows, first.timestamp, last.timestamp, min_user_id, max_user_id, first.id, last.id
+        )
+        sidecar = os.path.join(self.directory, name + SIDECAR_SUFFIX)
+        with open(sidecar + ".tmp", "w", encoding="utf-8") as file:
+            json.dump({
+                **segment._asdict(),
+                "min_timestamp": segment.min_timestamp.isoformat(),
+                "max_timestamp": segment.max_timestamp.isoformat()
+            }, file)
+        os.replace(sidecar + ".tmp", sidecar)
+        self._sidecars[name] = segment
+        self._listed = None
+        return segment
+
+    def _load_sidecar(self, name: str) -> Segment:
+        with open(os.path.join(self.directory, name + SIDECAR_SUFFIX), encoding="utf-8") as file:
+            data = json.load(file)
+        data["min_timestamp"] = datetime.fromisoformat(data["min_timestamp"])
+        data["max_timestamp"] = datetime.fromisoformat(data["max_timestamp"])
+        return Segment(**data)
+
+    def _remove(self, prefix: str) -> None:
+        """Delete the segments whose name starts with `prefix` followed by `_`."""
+        if not os.path.isdir(self.directory):
+            return
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.startswith(prefix + "_")]
+        # Sidecars first, so that a half-removed segment is never visible.
+        for entry in sorted(entries, key=lambda entry: not entry.name.endswith(SIDECAR_SUFFIX)):
+            os.remove(entry.path)
+        self._sidecars = {name: segment for name, segment in self._sidecars.items() if not name.startswith(prefix + "_")}
+        self._listed = None
+
+
+def encode_log(log: ArchivedLog) -> str:
+    return json.dumps({**log._asdict(), "timestamp": log.timestamp.isoformat()}) + "\n"
+
+
+def decode_log(line: str) -> ArchivedLog:
+    data = json.loads(line)
+    return ArchivedLog(data["id"], data["user_id"], data["command"], datetime.fromisoformat(data["timestamp"]), data["response"])
+
+
+def archive_partitions(connection: Connection, archive: LogArchive, now: datetime, archive_after_days: int) -> List[str]:
+    """
+    Write every partition whose month ended more than `archive_after_days` ago into the archive.
+
+    Only reads from the database; the caller drops the returned partitions afterwards in a short
+    write transaction. Until then reads keep using the partitions and ignore their segments.
+    """
+    cutoff = now - timedelta(days=archive_after_days)
+    archived = []
+    for partition in list_partitions(connection):
+        if partition.end <= cutoff:
+            archive.write_partition(connection, partition)
+            archived.append(partition.name)
+    return archived
+
+
+def live_prefixes(connection: Connection, archive: LogArchive, partitions: Sequence[Partition]) -> Set[str]:
+    """
+    Prefixes of the archived segments whose logs are still in one of the live `partitions`.
+
+    Segments are named after the partition and its lowest id at the time it was archived. Late logs
+    that rotation moves into a recreated partition of an archived month give it a new lowest id, so
+    the segments archived before stay readable next to it. Only partitions with segments are queried.
+    """
+    archived = {segment.partition for segment in archive.segments()}
+    prefixes = set()
+    for partition in partitions:
+        if partition.name in archived:
+            lowest = connection.scalar(select(func.min(partition.table.c.id)))  # type: ignore[arg-type]
+            if lowest is not None:
+                prefixes.add(f"{partition.name}_{lowest}")
+    return prefixes
+
+
+async def read_live_prefixes(db: AsyncSession, archive: LogArchive, partitions: Sequence[Partition]) -> Set[str]:
+    return await db.run_sync(lambda session: live_prefixes(session.connection(), archive, partitions))
+
+
+async def read_archived_page(
+        archive: LogArchive,
+        segments: Sequence[Segment],
+        user_id: Optional[int],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        cursor: Optional[Tuple[datetime, int]],
+        skip: int,
+        limit: int,
+        log_filter: LogFilter = NO_FILTER
+) -> Tuple[List[ArchivedLog], int, int]:
+    """
+    Read the archived part of a page.
+
+    Archived logs are older than anything in the database, so they come first. Returns the archived
+    logs of the page together with the `skip` and `limit` that are left for the database query.
+    """
+    if not segments:
+        return [], skip, limit
+    logs = await asyncio.to_thread(
+        archive.read, segments, user_id, start_date, end_date, cursor, skip + limit, log_filter
+    )
+    page = logs[skip:]
+    return page, max(skip - len(logs), 0), limit - len(page)
+
+
+async def read_archived_tail(
+        archive: LogArchive,
+        segments: Sequence[Segment],
+        user_id: Optional[int],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        cursor: Optional[Tuple[datetime, int]],
+        skip: int,
+        limit: int,
+        log_filter: LogFilter = NO_FILTER
+) -> List[ArchivedLog]:
+    """
+    Read the archived part of a newest-first page.
+
+    Archived logs are older than anything in the database, so they come last: `skip` and `limit` are
+    what is left of the page after the database rows.
+    """
+    if not segments or limit <= 0:
+        return []
+    logs = await asyncio.to_thread(
+        archive.read, segments, user_id, start_date, end_date, cursor, skip + limit, log_filter, True
+    )
+    return logs[skip:]
+
+
+log_archive = LogArchive(LOG_ARCHIVE_DIR, LOG_ARCHIVE_SEGMENT_ROWS)
+
+
+def get_log_archive() -> LogArchive:
+    return log_archive
@@ -0,0 +1,132 @@
+"""
+Checks whether a slow read stalls concurrent writes.
+
+One deliberately slow query runs next to a steady stream of single-row inserts, first through a
+blocking `Session` called from the event loop (how the routers used to work) and then through
+`AsyncSession`. Write latency is measured from the moment each write was due, so time spent
+waiting for a blocked event loop is counted.
+
+Usage:
+    python -m api.benchmarks.concurrency --writes 100 --interval-ms 20 --slow-rows 3000000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from api.models import Base, Log
+
+SLOW_QUERY = text(
+    "WITH RECURSIVE cnt(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM cnt LIMIT :rows) SELECT sum(x) FROM cnt"
+)
+
+
+def make_log(index: int) -> Log:
+    return Log(user_id=index % 100, command="/start", timestamp=datetime.utcnow(), response="Benchmark")
+
+
+async def measure(
+        read: Callable[[], Awaitable[None]],
+        write: Callable[[int], Awaitable[None]],
+        writes: int,
+        interval: float
+) -> Tuple[float, List[float]]:
+    started = time.perf_counter()
+
+    async def reader() -> float:
+        # Let the first few writes go through before the slow read starts.
+        await asyncio.sleep(interval * 10)
+        read_started = time.perf_counter()
+        await read()
+        return time.perf_counter() - read_started
+
+    async def writer() -> List[float]:
+        latencies = []
+        for index in range(writes):
+            due = started + index * interval
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await write(index)
+            latencies.append(time.perf_counter() - due)
+        return latencies
+
+    read_time, latencies = await asyncio.gather(reader(), writer())
+    return read_time, latencies
+
+
+async def run_blocking(url: str, slow_rows: int, writes: int, interval: float) -> Tuple[float, List[float]]:
+    engine = create_engine(url)
+
+    async def read() -> None:
+        with Session(engine) as db:  # type: ignore[attr-defined]
+            db.execute(SLOW_QUERY, {"rows": slow_rows}).scalar()
+
+    async def write(index: int) -> None:
+        with Session(engine) as db:  # type: ignore[attr-defined]
+            db.add(make_log(index))
+            db.commit()
+
+    try:
+        return await measure(read, write, writes, interval)
+    finally:
+        engine.dispose()
+
+
+async def run_async(url: str, slow_rows: int, writes: int, interval: float) -> Tuple[float, List[float]]:
+    engine = create_async_engine(url)
+
+    async def read() -> None:
+        async with AsyncSession(engine) as db:
+            (await db.execute(SLOW_QUERY, {"rows": slow_rows})).scalar()
+
+    async def write(index: int) -> None:
+        async with AsyncSession(engine) as db:
+            db.add(make_log(index))
+            await db.commit()
+
+    try:
+        return await measure(read, write, writes, interval)
+    finally:
+        await engine.dispose()
+
+
+def report(name: str, read_time: float, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    print(
+        f"{name:<10} slow read {read_time * 1000:8.1f} ms | "
+        f"write p50 {statistics.median(ordered) * 1000:7.2f} ms, "
+        f"p99 {ordered[int(len(ordered) * 0.99) - 1] * 1000:7.2f} ms, "
+        f"max {ordered[-1] * 1000:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=100, help="number of inserts issued during the run")
+    parser.add_argument("--interval-ms", type=float, default=20.0, help="delay between consecutive inserts")
+    parser.add_argument("--slow-rows", type=int, default=3_000_000, help="rows generated by the slow query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.connect() as connection:
+            # WAL keeps SQLite's own file locking out of the picture: only event-loop blocking is measured.
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        Base.metadata.create_all(bind=engine)
+        engine.dispose()
+
+        interval = args.interval_ms / 1000
+        report("blocking", *asyncio.run(run_blocking(f"sqlite:///{path}", args.slow_rows, args.writes, interval)))
+        report("async", *asyncio.run(run_async(f"sqlite+aiosqlite:///{path}", args.slow_rows, args.writes, interval)))
+
+
+if __name__ == "__main__":
+    main()
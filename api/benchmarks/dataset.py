@@ -0,0 +1,209 @@
+"""
+Generates a realistic synthetic log database for benchmarks.
+
+Writes `--rows` logs into a new SQLite database with the schema of the api:
+- Users follow a Zipf distribution: a few heavy users write a large share of the logs, and a long
+  tail of users writes a handful each.
+- Commands are mostly `/weather <city>` with skewed cities, plus `/start`, malformed `/weather` calls
+  and unknown commands or plain text. Responses are the ones the bot would send.
+- Timestamps are spread evenly over `--months` months ending at `--end`.
+
+The `log_texts` dictionary, the full-text index and the rollup counters are filled as the api would
+fill them. Closed months are then moved into monthly partitions like the maintenance task does, unless
+`--no-partitions` is given. The same arguments always produce the same data.
+
+Usage:
+    python -m api.benchmarks.dataset --rows 1000000 --output bench.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from typing import Dict, Iterator, List, NamedTuple
+
+from sqlalchemy import create_engine
+
+from api.models import Base
+from api.partitions import rotate_partitions
+from api.rollups import RollupKey, count_rollups
+
+DEFAULT_END = datetime(2024, 6, 15)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+CHUNK_SIZE = 50_000
+
+CITIES = (
+    "Moscow", "London", "Paris", "Berlin", "Tokyo", "NewYork", "Madrid", "Rome", "Kazan", "Novosibirsk",
+    "Yekaterinburg", "Minsk", "Almaty", "Tbilisi", "Yerevan", "Riga", "Vilnius", "Tallinn", "Helsinki", "Oslo",
+    "Stockholm", "Warsaw", "Prague", "Vienna", "Budapest", "Istanbul", "Dubai", "Beijing", "Seoul", "Sydney",
+    "Toronto", "Chicago", "Lisbon", "Athens", "Cairo", "Delhi", "Bangkok", "Singapore", "Omsk", "Sochi",
+)
+DESCRIPTIONS = ("Sunny", "Clear", "Partly cloudy", "Cloudy", "Overcast", "Light rain", "Rain", "Snow", "Fog", "Thunderstorm")
+
+START_RESPONSE = "This bot was created as a test for the BobrAi company."
+WEATHER_ERROR = "/weather command error, city may be incorrect"
+# Commands that are not answered with a forecast, and what the bot answers.
+OTHER_COMMANDS = (
+    ("/weather", "City not specified"),
+    ("/weather New York", "Invalid input format"),
+    ("/weather Atlantis", WEATHER_ERROR),
+    ("/help", "Unknown command"),
+    ("/forecast Moscow", "Unknown command"),
+    ("/settings", "Unknown command"),
+    ("hello", "Unknown command"),
+    ("what is the weather today?", "Unknown command"),
+)
+# Share of `/weather <city>`, `/start` and everything else.
+COMMAND_WEIGHTS = (0.7, 0.15, 0.15)
+
+
+class GeneratedLog(NamedTuple):
+    user_id: int
+    command: str
+    timestamp: datetime
+    response: str
+
+
+def zipf_weights(count: int, skew: float) -> List[float]:
+    """Cumulative weights of ranks 1..`count` with probability proportional to `1 / rank ** skew`."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def weather_message(city: str, hour: datetime) -> str:
+    """Forecast answer; the same for every user asking about `city` within the same hour."""
+    rng = random.Random(f"{city} {hour:%Y-%m-%d %H}")
+    temperature = rng.randint(-25, 35)
+    return (
+        f"Temperature: {temperature}\n"
+        f"Feels like: {temperature - rng.randint(0, 5)}\n"
+        f"Weather description: {rng.choice(DESCRIPTIONS).lower()}\n"
+        f"Humidity: {rng.randrange(20, 100, 5)}\n"
+        f"Wind speed: {rng.randint(0, 15)}\n"
+    )
+
+
+def generate_logs(
+        rows: int,
+        users: int,
+        end: datetime,
+        months: int,
+        skew: float,
+        seed: int = 0
+) -> Iterator[GeneratedLog]:
+    """Logs oldest first; user ids are ranks, so user 1 is the heaviest and `users` the lightest."""
+    rng = random.Random(seed)
+    user_weights = zipf_weights(users, skew)
+    city_weights = zipf_weights(len(CITIES), 1.0)
+    start = end - timedelta(days=30 * months)
+    span = (end - start).total_seconds()
+    forecasts: Dict[str, str] = {}
+    forecast_hour = None
+    for index in range(rows):
+        timestamp = start + timedelta(seconds=span * (index + rng.random()) / rows)
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        if hour != forecast_hour:
+            forecasts, forecast_hour = {}, hour
+        user_id = bisect_left(user_weights, rng.random() * user_weights[-1]) + 1
+        kind = rng.choices(range(3), weights=COMMAND_WEIGHTS)[0]
+        if kind == 0:
+            city = CITIES[bisect_left(city_weights, rng.random() * city_weights[-1])]
+            command = f"/weather {city}"
+            if rng.random() < 0.02:
+                response = WEATHER_ERROR
+            else:
+                response = forecasts.get(city) or forecasts.setdefault(city, weather_message(city, hour))
+        elif kind == 1:
+            command, response = "/start", START_RESPONSE
+        else:
+            command, response = rng.choice(OTHER_COMMANDS)
+        yield GeneratedLog(user_id, command, timestamp, response)
+
+
+def create_dataset(
+        path: str,
+        rows: int,
+        users: int = 100_000,
+        end: datetime = DEFAULT_END,
+        months: int = 6,
+        skew: float = 1.1,
+        seed: int = 0,
+        partitions: bool = True
+) -> None:
+    """Write a new database at `path`; see the module docstring."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    connection = sqlite3.connect(path)
+    # A throwaway file: durability does not matter while loading.
+    connection.execute("PRAGMA journal_mode = MEMORY")
+    connection.execute("PRAGMA synchronous = OFF")
+    texts: Dict[str, int] = {}
+    logs = generate_logs(rows, users, end, months, skew, seed)
+    while chunk := list(islice(logs, CHUNK_SIZE)):
+        new_texts = []
+        for log in chunk:
+            for text in (log.command, log.response):
+                if text not in texts:
+                    texts[text] = len(texts) + 1
+                    new_texts.append((texts[text], text))
+        # Texts first: the full-text trigger on `logs` looks them up.
+        connection.executemany("INSERT INTO log_texts (id, text) VALUES (?, ?)", new_texts)
+        connection.executemany(
+            "INSERT INTO logs (user_id, command_id, timestamp, response_id) VALUES (?, ?, ?, ?)",
+            (
+                (log.user_id, texts[log.command], log.timestamp.strftime(TIMESTAMP_FORMAT), texts[log.response])
+                for log in chunk
+            )
+        )
+        counts: Counter[RollupKey] = Counter()
+        count_rollups((log._asdict() for log in chunk), counts)
+        connection.executemany(
+            "INSERT INTO log_rollups (granularity, dimension, bucket, key, count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (granularity, dimension, bucket, key) DO UPDATE SET count = count + excluded.count",
+            (
+                (granularity, dimension, bucket.strftime(TIMESTAMP_FORMAT), key, count)
+                for (granularity, dimension, bucket, key), count in counts.items()
+            )
+        )
+    connection.commit()
+    connection.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        if partitions:
+            with engine.begin() as connection:
+                rotate_partitions(connection, end)
+        with engine.connect() as connection:
+            connection.exec_driver_sql("ANALYZE")  # type: ignore[attr-defined]
+    finally:
+        engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of log entries to generate")
+    parser.add_argument("--users", type=int, default=100_000, help="number of distinct users")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the user distribution")
+    parser.add_argument("--months", type=int, default=6, help="months the timestamps are spread over")
+    parser.add_argument("--end", type=datetime.fromisoformat, default=DEFAULT_END, help="newest timestamp")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--no-partitions", action="store_true", help="keep every log in the `logs` table")
+    parser.add_argument("--output", default="bench.db", help="path of the database to create")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        parser.error(f"{args.output} already exists")
+    started = time.perf_counter()
+    create_dataset(
+        args.output, args.rows, args.users, args.end, args.months, args.skew, args.seed, not args.no_partitions
+    )
+    print(f"wrote {args.rows} logs to {args.output} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
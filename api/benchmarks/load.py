@@ -0,0 +1,263 @@
+"""
+End-to-end load test of the logs api.
+
+Starts `api.main:app` under uvicorn against a temporary SQLite database seeded with `--rows` log
+entries, or targets an already running server given with `--url`, and replays a mix of requests at
+a fixed rate: `add` is `POST /logs/`, `read` is `GET /logs/` and `read_user` is `GET /logs/{user_id}`.
+Requests are sent on schedule whether or not earlier ones have returned, and latency is measured from
+the moment a request was due, so a server that falls behind shows it in the percentiles instead of
+silently lowering the rate.
+
+Prints the throughput and the p50/p95/p99 latency per operation. `--output` saves the results with the
+commit and the settings of the run as JSON; `--compare` prints the change against such a file.
+
+Usage:
+    python -m api.benchmarks.load --rate 200 --duration 30 --mix add=2,read=3,read_user=5 --output run.json
+    python -m api.benchmarks.load --env LOG_RECENT_ENABLED=true --compare run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import httpx
+
+from api.benchmarks.recent import seed
+from api.benchmarks.startup import free_port
+
+OPERATIONS = ("add", "read", "read_user")
+DEFAULT_MIX = "add=2,read=3,read_user=5"
+PERCENTILES = (50, 95, 99)
+START_TIMEOUT = 60
+
+USERS = 1000
+
+
+class PlannedRequest(NamedTuple):
+    due: float
+    operation: str
+    method: str
+    url: str
+    body: Optional[Dict[str, Any]]
+
+
+class Sample(NamedTuple):
+    operation: str
+    latency: float
+    status: int
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Weights of the operations in `add=2,read=3,read_user=5`; missing operations are not sent."""
+    weights = {}
+    for part in mix.split(","):
+        operation, _, weight = part.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS or not weight:
+            raise ValueError(f"mix must look like {DEFAULT_MIX}, with operations among {', '.join(OPERATIONS)}")
+        weights[operation] = float(weight)
+    if not any(weight > 0 for weight in weights.values()):
+        raise ValueError("mix needs at least one operation with a positive weight")
+    return weights
+
+
+def plan_requests(
+        mix: Dict[str, float],
+        rate: float,
+        duration: float,
+        users: int,
+        limit: int,
+        seed: int = 0
+) -> List[PlannedRequest]:
+    """Requests evenly spaced at `rate` per second over `duration` seconds; the same seed gives the same plan."""
+    rng = random.Random(seed)
+    operations = rng.choices(list(mix), weights=list(mix.values()), k=int(rate * duration))
+    plan = []
+    for index, operation in enumerate(operations):
+        user_id = rng.randrange(users)
+        request: Tuple[str, str, Optional[Dict[str, Any]]]
+        if operation == "add":
+            request = ("POST", "/logs/", {"user_id": user_id, "command": "/start", "response": f"Load {index}"})
+        elif operation == "read":
+            request = ("GET", f"/logs/?limit={limit}", None)
+        else:
+            request = ("GET", f"/logs/{user_id}?limit={limit}", None)
+        plan.append(PlannedRequest(index / rate, operation, *request))
+    return plan
+
+
+async def replay(client: httpx.AsyncClient, plan: Sequence[PlannedRequest], concurrency: int) -> List[Sample]:
+    """Send the planned requests on schedule, at most `concurrency` at a time; time spent queued counts."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[Sample] = []
+    started = time.perf_counter()
+
+    async def send(request: PlannedRequest) -> None:
+        async with semaphore:
+            try:
+                response = await client.request(request.method, request.url, json=request.body)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+        samples.append(Sample(request.operation, time.perf_counter() - started - request.due, status))
+
+    tasks = []
+    for request in plan:
+        delay = started + request.due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(request)))
+    await asyncio.gather(*tasks)
+    return samples
+
+
+def percentile(ordered: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return ordered[max(int(len(ordered) * percent / 100 + 0.5) - 1, 0)]
+
+
+def summarize(samples: Sequence[Sample], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    """Per operation and for `all`: request and error counts, throughput and latency percentiles in ms."""
+    groups: Dict[str, List[Sample]] = {"all": list(samples)}
+    for operation in OPERATIONS:
+        group = [sample for sample in samples if sample.operation == operation]
+        if group:
+            groups[operation] = group
+    results = {}
+    for operation, group in groups.items():
+        ordered = sorted(sample.latency for sample in group)
+        result: Dict[str, Any] = {
+            "requests": len(group),
+            "errors": sum(1 for sample in group if not 200 <= sample.status < 300),
+            "throughput": len(group) / elapsed if elapsed else 0.0,
+        }
+        for percent in PERCENTILES:
+            result[f"p{percent}_ms"] = percentile(ordered, percent) * 1000 if ordered else None
+        result["max_ms"] = ordered[-1] * 1000 if ordered else None
+        results[operation] = result
+    return results
+
+
+def report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    for operation, result in results.items():
+        line = (
+            f"{operation:<10} {result['requests']:7d} req | {result['errors']:5d} err | "
+            f"{result['throughput']:8.1f} req/s | "
+            + " | ".join(f"p{percent} {result[f'p{percent}_ms']:8.2f} ms" for percent in PERCENTILES)
+        )
+        previous = (baseline or {}).get(operation)
+        if previous and previous["p50_ms"] and previous["p99_ms"]:
+            line += " | vs baseline p50 {:+.1%} p99 {:+.1%}".format(
+                result["p50_ms"] / previous["p50_ms"] - 1, result["p99_ms"] / previous["p99_ms"] - 1
+            )
+        print(line)
+
+
+def current_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def start_server(env: Dict[str, str], port: int, workers: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--workers", str(workers),
+            "--log-level", "warning", "--no-access-log"
+        ],
+        env=env
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < START_TIMEOUT:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/logs/?limit=1").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before answering")
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError(f"no answer within {START_TIMEOUT} s")
+
+
+async def run(url: str, args: argparse.Namespace, mix: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        if args.warmup:
+            warmup = plan_requests(mix, args.rate, args.warmup, args.users, args.limit, args.seed + 1)
+            await replay(client, warmup, args.concurrency)
+        plan = plan_requests(mix, args.rate, args.duration, args.users, args.limit, args.seed)
+        started = time.perf_counter()
+        samples = await replay(client, plan, args.concurrency)
+        return summarize(samples, time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running api; by default one is started under uvicorn")
+    parser.add_argument("--rows", type=int, default=100_000, help="log entries to seed the temporary database with")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE", help="setting of the started api, repeatable"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="relative weights of add, read and read_user")
+    parser.add_argument("--rate", type=float, default=200, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of unmeasured load before the run")
+    parser.add_argument("--concurrency", type=int, default=64, help="maximum requests in flight")
+    parser.add_argument("--users", type=int, default=USERS, help="distinct user ids in requests")
+    parser.add_argument("--limit", type=int, default=10, help="page size of reads")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a request counts as failed")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the request mix")
+    parser.add_argument("--output", help="save the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    if args.url:
+        results = asyncio.run(run(args.url, args, mix))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "load.db")
+            print(f"seeding {args.rows} rows ...")
+            seed(path, args.rows)
+            env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "DATABASE_READ_URLS": ""}
+            env.update(setting.split("=", 1) for setting in args.env)
+            port = free_port()
+            server = start_server(env, port, args.workers)
+            try:
+                results = asyncio.run(run(f"http://127.0.0.1:{port}", args, mix))
+            finally:
+                server.terminate()
+                server.wait()
+
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"commit": current_commit(), "started_at": started_at, "settings": vars(args), "results": results},
+                file,
+                indent=2
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Measures the overhead of the request and database metrics.
+
+Builds a temporary SQLite database with `--rows` log entries and requests pages of `/logs/` and
+`/logs/{user_id}` through the application with the metrics disabled and enabled, alternating the modes
+in rounds so that both see the same warm caches. Prints the median and p99 latency per request and
+mode and the median overhead of the metrics per request.
+
+Usage:
+    python -m api.benchmarks.metrics --rows 100000 --requests 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, Dict, List
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api import metrics as api_metrics
+from api.main import app
+from api.metrics import Metrics, instrument_engine
+from api.models import Base, get_db, get_read_db, get_user_read_db
+
+USERS = 1000
+
+
+def seed(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    started = datetime(2024, 1, 1)
+    connection = sqlite3.connect(path)
+    connection.executemany("INSERT INTO log_texts (id, text) VALUES (?, ?)", [(1, "/start"), (2, "Benchmark")])
+    connection.executemany(
+        "INSERT INTO logs (user_id, command_id, timestamp, response_id) VALUES (?, ?, ?, ?)",
+        (
+            (index % USERS, 1, (started + timedelta(seconds=index)).strftime("%Y-%m-%d %H:%M:%S.%f"), 2)
+            for index in range(rows)
+        )
+    )
+    connection.commit()
+    connection.close()
+
+
+async def measure(client: AsyncClient, urls: List[str]) -> List[float]:
+    latencies = []
+    for url in urls:
+        started = time.perf_counter()
+        response = await client.get(url)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    print(
+        f"{name:<32} p50 {statistics.median(ordered) * 1000:7.3f} ms | "
+        f"p99 {ordered[int(len(ordered) * 0.99) - 1] * 1000:7.3f} ms"
+    )
+
+
+async def run(path: str, requests: int, rounds: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    registry = Metrics()
+    instrument_engine(engine.sync_engine, registry)
+    api_metrics.metrics = registry
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        async with session_factory() as db:
+            yield db
+
+    for dependency in (get_db, get_read_db, get_user_read_db):
+        app.dependency_overrides[dependency] = override_get_db
+
+    urls = {
+        "/logs/": [f"/logs/?limit=10&skip={index % 100}" for index in range(requests)],
+        "/logs/{user_id}": [f"/logs/{index % USERS}?limit=10" for index in range(requests)],
+    }
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for route, route_urls in urls.items():
+                latencies: Dict[bool, List[float]] = {False: [], True: []}
+                await measure(client, route_urls[:50])
+                for _ in range(rounds):
+                    for enabled in (False, True):
+                        registry.enabled = enabled
+                        latencies[enabled].extend(await measure(client, route_urls))
+                report(f"{route} without metrics", latencies[False])
+                report(f"{route} with metrics", latencies[True])
+                overhead = statistics.median(latencies[True]) - statistics.median(latencies[False])
+                print(f"{route:<32} overhead {overhead * 1_000_000:7.1f} µs per request")
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    print(f"rendered /metrics: {len(registry.render().encode())} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="number of log entries to generate")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per route, mode and round")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds alternating the two modes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        print(f"seeding {args.rows} rows ...")
+        seed(path, args.rows)
+        asyncio.run(run(path, args.requests, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
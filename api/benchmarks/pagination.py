@@ -0,0 +1,96 @@
+"""
+Compares offset and keyset (cursor) pagination on a large logs table.
+
+Builds a temporary SQLite database with `--rows` log entries, then times fetching page 1 and
+page `--page` with `skip`/`limit` and with the `(timestamp, id)` cursor used by the read endpoints.
+
+Usage:
+    python -m api.benchmarks.pagination --rows 2000000 --page 10000 --limit 10
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from api.models import Base, Log
+from api.routers.utils import paginate_logs
+
+REPEATS = 5
+
+
+def seed(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    started = datetime(2024, 1, 1)
+    connection = sqlite3.connect(path)
+    connection.executemany("INSERT INTO log_texts (id, text) VALUES (?, ?)", [(1, "/start"), (2, "Benchmark")])
+    connection.executemany(
+        "INSERT INTO logs (user_id, command_id, timestamp, response_id) VALUES (?, ?, ?, ?)",
+        (
+            (index % 1000, 1, (started + timedelta(seconds=index)).strftime("%Y-%m-%d %H:%M:%S.%f"), 2)
+            for index in range(rows)
+        )
+    )
+    connection.commit()
+    connection.close()
+
+
+def timed(run: Callable[[], object]) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="number of log entries to generate")
+    parser.add_argument("--page", type=int, default=10_000, help="deep page number to compare against page 1")
+    parser.add_argument("--limit", type=int, default=10, help="page size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        print(f"seeding {args.rows} rows ...")
+        seed(path, args.rows)
+        engine = create_engine(f"sqlite:///{path}")
+
+        with Session(engine) as db:  # type: ignore[attr-defined]
+            def offset_page(page: int) -> Callable[[], object]:
+                query = paginate_logs(select(Log), (page - 1) * args.limit, args.limit, None)
+                return lambda: db.scalars(query).all()
+
+            def keyset_page(page: int) -> Callable[[], object]:
+                cursor: Optional[Tuple[datetime, int]] = None
+                if page > 1:
+                    # The cursor a client would have received with the previous page.
+                    previous = db.scalars(
+                        paginate_logs(select(Log), (page - 1) * args.limit - 1, 1, None)
+                    ).one()
+                    cursor = (previous.timestamp, previous.id)
+                query = paginate_logs(select(Log), 0, args.limit, cursor)
+                return lambda: db.scalars(query).all()
+
+            for name, make_page in (("offset", offset_page), ("keyset", keyset_page)):
+                first = timed(make_page(1))
+                deep = timed(make_page(args.page))
+                print(
+                    f"{name:<7} page 1 {first * 1000:8.3f} ms | "
+                    f"page {args.page} {deep * 1000:8.3f} ms | x{deep / first:.1f}"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
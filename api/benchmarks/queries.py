@@ -0,0 +1,242 @@
+"""
+Times every query shape the routers issue, at several dataset sizes.
+
+For each size in `--sizes`, creates a dataset with `api.benchmarks.dataset` (kept in `--data-dir`, so
+the slow large ones are generated once) and sends one request of each shape below through the
+application, against a small scratch dataset with the same partitions. The SQL statements each request
+issues are recorded from the engine events and then run `--repeat` times straight on the dataset of
+that size, each inside a transaction that is rolled back, so the dataset never changes and nothing but
+the database is timed. Because the statements come from the routers themselves, changes to
+`filter_logs`, pagination or the schema show up without touching this script.
+
+Prints, per shape and size, the median time of all of its statements together and how many
+statements it issues; a statement that runs longer than `--timeout` is given up and shown as
+`timeout`. `--verbose` prints every statement. `--output` saves the results as JSON.
+
+Usage:
+    python -m api.benchmarks.queries --sizes 10000,1000000,10000000 --data-dir ./bench-data --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from api import models
+from api.benchmarks.dataset import DEFAULT_END, create_dataset
+from api.main import app
+from api.routers.utils import encode_cursor
+from api.storage import storage_profile
+
+USERS = 100_000
+SCRATCH_ROWS = 2000
+
+
+class Shape(NamedTuple):
+    name: str
+    method: str
+    url: str
+    body: Optional[Any] = None
+
+
+# `{heavy}` is the user with the most logs, `{tail}` one with a single log; the cursors and dates
+# point to the middle of the data, the week starts a month before its end.
+SHAPES = (
+    Shape("read_logs first page", "GET", "/logs/?limit=10"),
+    Shape("read_logs deep skip", "GET", "/logs/?skip=5000&limit=10"),
+    Shape("read_logs cursor", "GET", "/logs/?limit=10&cursor={cursor}"),
+    Shape("read_logs one week", "GET", "/logs/?limit=10&start_date={week_start}&end_date={week_end}"),
+    Shape("read_logs columns", "GET", "/logs/?limit=100&fields=id,timestamp&layout=columns"),
+    Shape("read_logs search", "GET", "/logs/?limit=10&q=moscow"),
+    Shape("read_logs command", "GET", "/logs/?limit=10&command=/start"),
+    Shape("read_logs command prefix", "GET", "/logs/?limit=10&command_prefix=/weather"),
+    Shape("read_logs rare prefix", "GET", "/logs/?limit=10&command_prefix=/settings"),
+    Shape("read_logs user set", "GET", "/logs/?limit=10&user_ids={heavy},{tail}"),
+    Shape("read_logs exclude users", "GET", "/logs/?limit=10&exclude_user_ids={heavy}"),
+    Shape("read_logs newest", "GET", "/logs/?limit=10&order=desc"),
+    Shape("read_user_logs heavy", "GET", "/logs/{heavy}?limit=10"),
+    Shape("read_user_logs tail", "GET", "/logs/{tail}?limit=10"),
+    Shape("read_user_logs cursor", "GET", "/logs/{heavy}?limit=10&cursor={heavy_cursor}"),
+    Shape("read_user_logs one week", "GET", "/logs/{heavy}?limit=10&start_date={week_start}&end_date={week_end}"),
+    Shape("read_user_logs search", "GET", "/logs/{heavy}?limit=10&q=weather"),
+    Shape("log_stats commands", "GET", "/logs/stats?group_by=command&granularity=day"),
+    Shape("log_stats user hours", "GET", "/logs/stats?group_by=user&granularity=hour&per_bucket=true&key={heavy}"),
+    Shape("export_logs user", "GET", "/logs/export?user_id={heavy}&start_date={week_start}&end_date={week_end}"),
+    Shape("add_logs", "POST", "/logs/", {"user_id": 1, "command": "/weather Moscow", "response": "Benchmark"}),
+    Shape(
+        "add_logs_batch", "POST", "/logs/batch",
+        [{"user_id": user_id, "command": f"/weather City{user_id}", "response": "Benchmark"} for user_id in range(100)]
+    ),
+)
+
+
+class Statement(NamedTuple):
+    sql: str
+    parameters: Any
+    executemany: bool
+
+
+def dataset_path(data_dir: str, rows: int) -> str:
+    path = os.path.join(data_dir, f"logs-{rows}.db")
+    if not os.path.exists(path):
+        print(f"generating {rows} rows into {path} ...")
+        create_dataset(path + ".tmp", rows, users=USERS)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def placeholders(path: str) -> Dict[str, str]:
+    """Values for the `{...}` fields of the shape URLs, taken from the dataset."""
+    connection = sqlite3.connect(path)
+    try:
+        tables = [name for name, in connection.execute("SELECT name FROM sqlite_master WHERE name GLOB 'logs_[0-9]*_[0-9][0-9]'")]
+        logs = " UNION ALL ".join(f"SELECT id, user_id, timestamp FROM {name}" for name in [*tables, "logs"])
+        count = connection.execute(f"SELECT count(*) FROM ({logs})").fetchone()[0]
+        middle = connection.execute(f"SELECT timestamp, id FROM ({logs}) ORDER BY timestamp, id LIMIT 1 OFFSET ?", (count // 2,)).fetchone()
+        heavy = connection.execute(f"SELECT user_id FROM ({logs}) GROUP BY user_id ORDER BY count(*) DESC LIMIT 1").fetchone()[0]
+        tail = connection.execute(f"SELECT user_id FROM ({logs}) GROUP BY user_id HAVING count(*) = 1 LIMIT 1").fetchone()
+        heavy_middle = connection.execute(
+            f"SELECT timestamp, id FROM ({logs}) WHERE user_id = ? ORDER BY timestamp, id LIMIT 1 OFFSET "
+            f"(SELECT count(*) / 2 FROM ({logs}) WHERE user_id = ?)", (heavy, heavy)
+        ).fetchone()
+    finally:
+        connection.close()
+
+    def cursor(row: Sequence[Any]) -> str:
+        return encode_cursor(datetime.fromisoformat(row[0]), row[1])
+
+    return {
+        "cursor": cursor(middle),
+        "heavy": str(heavy),
+        "heavy_cursor": cursor(heavy_middle),
+        "tail": str(tail[0] if tail else heavy),
+        "week_start": f"{DEFAULT_END - timedelta(days=30):%Y-%m-%dT%H:%M:%S}",
+        "week_end": f"{DEFAULT_END - timedelta(days=23):%Y-%m-%dT%H:%M:%S}",
+    }
+
+
+async def record_statements(scratch: str, values: Dict[str, str]) -> Dict[str, List[Statement]]:
+    """
+    Send one request per shape through the application and collect the SQL it issues.
+
+    The requests run against `scratch`, a small dataset with the same months and so the same
+    partitions: the SQL only depends on the request and the partitions, recording stays fast whatever
+    the size under test, and the write shapes do not change the dataset that is timed.
+    """
+    models.DATABASE_URL = f"sqlite:///{scratch}"
+    engine = models.get_async_engine()
+    recorded: List[Statement] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        # Batched "insertmanyvalues" inserts report `executemany` but run as single statements.
+        recorded.append(Statement(statement, parameters, isinstance(parameters, list)))
+
+    statements = {}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for shape in SHAPES:
+                recorded.clear()
+                response = await client.request(shape.method, shape.url.format(**values), json=shape.body)
+                response.raise_for_status()
+                statements[shape.name] = list(recorded)
+    finally:
+        await models.dispose_engines()
+    return statements
+
+
+def time_statement(connection: sqlite3.Connection, statement: Statement, repeat: int, timeout: float) -> Optional[float]:
+    """Median seconds of `statement` over `repeat` runs, each rolled back; None if a run exceeds `timeout`."""
+    samples = []
+    for _ in range(repeat):
+        connection.execute("BEGIN")
+        started = time.perf_counter()
+        deadline = started + timeout
+        connection.set_progress_handler(lambda: time.perf_counter() > deadline, 10_000)
+        try:
+            if statement.executemany:
+                connection.executemany(statement.sql, statement.parameters)
+            else:
+                connection.execute(statement.sql, statement.parameters).fetchall()
+        except sqlite3.OperationalError as e:
+            if "interrupted" not in str(e):
+                raise
+            return None
+        finally:
+            connection.set_progress_handler(None, 0)
+            connection.execute("ROLLBACK")
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def time_shapes(
+        path: str,
+        statements: Dict[str, List[Statement]],
+        repeat: int,
+        timeout: float,
+        verbose: bool
+) -> Dict[str, Dict[str, Any]]:
+    """Per shape, the number of statements and the sum of their medians in ms, None if any timed out."""
+    connection = sqlite3.connect(path, isolation_level=None)
+    for name, value in storage_profile.pragmas().items():
+        connection.execute(f"PRAGMA {name} = {value}")
+    results = {}
+    try:
+        for shape, shape_statements in statements.items():
+            medians = [time_statement(connection, statement, repeat, timeout) for statement in shape_statements]
+            timed = [median for median in medians if median is not None]
+            total = sum(timed) * 1000 if len(timed) == len(medians) else None
+            results[shape] = {"statements": len(medians), "median_ms": total}
+            if verbose:
+                for statement, median in zip(shape_statements, medians):
+                    print(f"    {shape:<26} {format_ms(median and median * 1000)}  {' '.join(statement.sql.split())[:120]}")
+    finally:
+        connection.close()
+    return results
+
+
+def format_ms(value: Optional[float]) -> str:
+    return f"{value:10.3f} ms" if value is not None else f"{'timeout':>13}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,1000000,10000000", help="comma-separated dataset sizes in rows")
+    parser.add_argument("--data-dir", default="bench-data", help="directory that keeps the generated datasets")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per statement")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds after which a statement is given up")
+    parser.add_argument("--verbose", action="store_true", help="print the time of every statement")
+    parser.add_argument("--output", help="save the results as JSON to this file")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results: Dict[int, Dict[str, Dict[str, Any]]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        scratch = os.path.join(directory, "scratch.db")
+        create_dataset(scratch, SCRATCH_ROWS, users=USERS)
+        for rows in sizes:
+            path = dataset_path(args.data_dir, rows)
+            statements = asyncio.run(record_statements(scratch, placeholders(path)))
+            print(f"timing {rows} rows ...")
+            results[rows] = time_shapes(path, statements, args.repeat, args.timeout, args.verbose)
+
+    print(f"{'shape':<26} " + " ".join(f"{rows:>16,d}" for rows in sizes))
+    for shape in SHAPES:
+        cells = [results[rows][shape.name] for rows in sizes]
+        print(f"{shape.name:<26} " + " ".join(f"{format_ms(cell['median_ms'])} ({cell['statements']:>2})" for cell in cells))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({str(rows): result for rows, result in results.items()}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
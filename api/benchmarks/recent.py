@@ -0,0 +1,123 @@
+"""
+Compares reading recent pages from the database and from the in-memory buffer of recent logs.
+
+Builds a temporary SQLite database with `--rows` log entries, primes a buffer of `--size` logs from it
+and requests pages of `/logs/` and `/logs/{user_id}` that start at a cursor inside the buffer, through
+the application with the buffer disabled and enabled. Prints the median and p99 latency per request and
+the hit rate of the buffer.
+
+Usage:
+    python -m api.benchmarks.recent --rows 1000000 --size 10000 --requests 500 --limit 10
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, List
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.main import app
+from api.models import Base, get_db, get_read_db, get_user_read_db
+from api.recent import RecentLogs, get_recent_logs
+from api.routers.utils import encode_cursor
+
+USERS = 1000
+
+
+def seed(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    started = datetime(2024, 1, 1)
+    connection = sqlite3.connect(path)
+    connection.executemany("INSERT INTO log_texts (id, text) VALUES (?, ?)", [(1, "/start"), (2, "Benchmark")])
+    connection.executemany(
+        "INSERT INTO logs (user_id, command_id, timestamp, response_id) VALUES (?, ?, ?, ?)",
+        (
+            (index % USERS, 1, (started + timedelta(seconds=index)).strftime("%Y-%m-%d %H:%M:%S.%f"), 2)
+            for index in range(rows)
+        )
+    )
+    connection.commit()
+    connection.close()
+
+
+async def measure(client: AsyncClient, urls: List[str]) -> List[float]:
+    latencies = []
+    for url in urls:
+        started = time.perf_counter()
+        response = await client.get(url)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    print(
+        f"{name:<24} p50 {statistics.median(ordered) * 1000:7.3f} ms | "
+        f"p99 {ordered[int(len(ordered) * 0.99) - 1] * 1000:7.3f} ms"
+    )
+
+
+async def run(path: str, size: int, requests: int, limit: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    recent = RecentLogs(size=size)
+    await recent.prime(session_factory)
+
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        async with session_factory() as db:
+            yield db
+
+    for dependency in (get_db, get_read_db, get_user_read_db):
+        app.dependency_overrides[dependency] = override_get_db
+    app.dependency_overrides[get_recent_logs] = lambda: recent
+
+    # The oldest buffered log: every page after it is inside the buffer.
+    floor = recent.floor
+    assert floor is not None, "the dataset is empty"
+    cursor = encode_cursor(*floor)
+    urls = {
+        "/logs/": [f"/logs/?limit={limit}&cursor={cursor}"] * requests,
+        "/logs/{user_id}": [f"/logs/{index % USERS}?limit={limit}&cursor={cursor}" for index in range(requests)],
+    }
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for route, route_urls in urls.items():
+                for enabled in (False, True):
+                    recent.enabled = enabled
+                    await measure(client, route_urls[:10])
+                    report(f"{route} {'buffer' if enabled else 'database'}", await measure(client, route_urls))
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    stats = recent.stats()
+    print(f"buffer {stats.entries} logs of {stats.users} users | hits {stats.hits}, misses {stats.misses}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of log entries to generate")
+    parser.add_argument("--size", type=int, default=10_000, help="number of recent logs held in memory")
+    parser.add_argument("--requests", type=int, default=500, help="requests per route and mode")
+    parser.add_argument("--limit", type=int, default=10, help="page size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        print(f"seeding {args.rows} rows ...")
+        seed(path, args.rows)
+        asyncio.run(run(path, args.size, args.requests, args.limit))
+
+
+if __name__ == "__main__":
+    main()
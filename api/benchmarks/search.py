@@ -0,0 +1,96 @@
+"""
+Compares full-text search through the FTS5 index with a `LIKE` scan on a large logs table.
+
+Builds a temporary SQLite database with `--rows` log entries, then times the `q` search used by the
+read endpoints against the `LIKE` fallback used on databases without FTS5, for a rare and a common term.
+A common term is the worst case for the index: every match is ranked before the first page is
+returned, while the unranked scan stops as soon as it has filled the page.
+
+Usage:
+    python -m api.benchmarks.search --rows 2000000 --limit 100
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from api.models import Base, Log
+from api.routers.utils import paginate_logs, search_logs
+
+REPEATS = 5
+CITIES = ["Moscow", "Paris", "Berlin", "London", "Madrid", "Rome", "Vienna", "Prague", "Oslo", "Kazan"]
+
+
+def seed(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    texts = [f"/weather {city}" for city in CITIES] + ["Error: weather service unavailable"]
+    texts += [f"{temperature}°C" for temperature in range(-10, 30)]
+    ids = {text: text_id for text_id, text in enumerate(texts, start=1)}
+
+    started = datetime(2024, 1, 1)
+    connection = sqlite3.connect(path)
+    # Texts first: the full-text index triggers look them up when the logs are inserted.
+    connection.executemany("INSERT INTO log_texts (id, text) VALUES (?, ?)", ((ids[text], text) for text in texts))
+    connection.executemany(
+        "INSERT INTO logs (user_id, command_id, timestamp, response_id) VALUES (?, ?, ?, ?)",
+        (
+            (
+                index % 1000,
+                ids[f"/weather {CITIES[index % len(CITIES)]}"],
+                (started + timedelta(seconds=index)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+                # One log in ten thousand is an error.
+                ids["Error: weather service unavailable" if index % 10_000 == 0 else f"{index % 40 - 10}°C"]
+            )
+            for index in range(rows)
+        )
+    )
+    connection.commit()
+    connection.close()
+
+
+def timed(run: Callable[[], object]) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="number of log entries to generate")
+    parser.add_argument("--limit", type=int, default=100, help="page size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        print(f"seeding {args.rows} rows ...")
+        seed(path, args.rows)
+        engine = create_engine(f"sqlite:///{path}")
+
+        with Session(engine) as db:  # type: ignore[attr-defined]
+            for q in ("service unavailable", "Moscow"):
+                results = {}
+                for name, dialect in (("fts", "sqlite"), ("like", "postgresql")):
+                    query = paginate_logs(search_logs(select(Log), q, dialect), 0, args.limit, None)
+                    results[name] = timed(lambda: db.scalars(query).all())
+                print(
+                    f"q={q!r:<22} fts {results['fts'] * 1000:9.3f} ms | "
+                    f"like {results['like'] * 1000:9.3f} ms | x{results['like'] / results['fts']:.2f}"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures how fast a new api process becomes useful.
+
+Imports `api.main` in fresh interpreters and reports the median import time, then starts uvicorn
+`--runs` times against a temporary SQLite database and reports the time from spawning the process to
+the first answered `GET /logs/` request, which includes creating the schema in the lifespan and
+opening the first connection. This is the delay a new worker adds when the service scales out.
+
+Usage:
+    python -m api.benchmarks.startup --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import api.main; print(time.perf_counter() - started)"
+POLL_INTERVAL = 0.005
+START_TIMEOUT = 60
+
+
+def free_port() -> int:
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        return listener.getsockname()[1]
+
+
+def import_time(env: Dict[str, str]) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=env, check=True, capture_output=True, text=True)
+    return float(output.stdout)
+
+
+def first_request_time(env: Dict[str, str]) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/logs/?limit=1"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+    try:
+        while time.perf_counter() - started < START_TIMEOUT:
+            try:
+                with urllib.request.urlopen(url) as response:
+                    response.read()
+                return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before answering")
+                time.sleep(POLL_INTERVAL)
+        raise RuntimeError(f"no answer within {START_TIMEOUT} s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(name: str, samples: List[float]) -> None:
+    print(f"{name:<14} median {statistics.median(samples) * 1000:8.1f} ms | max {max(samples) * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh processes per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}", "DATABASE_READ_URLS": ""}
+        report("import", [import_time(env) for _ in range(args.runs)])
+        print(f"database created by import: {os.path.exists(os.path.join(directory, 'bench.db'))}")
+        report("first request", [first_request_time(env) for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compares SQLite storage profiles under a mixed read/write load.
+
+For each profile, builds a temporary SQLite database with `--rows` log entries and runs `--writers`
+tasks that insert single logs next to `--readers` tasks that read pages of one user's logs, for
+`--seconds` seconds, each task in its own session. Prints the throughput, the median and p99 latency
+of reads and writes and the number of operations that failed with "database is locked".
+
+Profiles:
+    default  SQLite as the driver sets it up: rollback journal, synchronous=FULL, no pool
+    env      the profile configured through the DATABASE_* variables (WAL, synchronous=NORMAL, ...)
+
+Usage:
+    python -m api.benchmarks.storage --rows 100000 --writers 4 --readers 8 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from api.models import Base
+from api.storage import DEFAULT_PROFILE, StorageProfile, apply_storage_profile, read_storage_settings, storage_profile
+
+USERS = 1000
+
+PROFILES = {"default": DEFAULT_PROFILE, "env": storage_profile}
+
+INSERT = text("INSERT INTO logs (user_id, command_id, timestamp, response_id) VALUES (:user_id, 1, :timestamp, 2)")
+PAGE = text(
+    "SELECT id, user_id, command_id, timestamp, response_id FROM logs "
+    "WHERE user_id = :user_id ORDER BY timestamp, id LIMIT 10"
+)
+
+
+def seed(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    started = datetime(2024, 1, 1)
+    connection = sqlite3.connect(path)
+    connection.executemany("INSERT INTO log_texts (id, text) VALUES (?, ?)", [(1, "/start"), (2, "Benchmark")])
+    connection.executemany(
+        "INSERT INTO logs (user_id, command_id, timestamp, response_id) VALUES (?, ?, ?, ?)",
+        (
+            (index % USERS, 1, (started + timedelta(seconds=index)).strftime("%Y-%m-%d %H:%M:%S.%f"), 2)
+            for index in range(rows)
+        )
+    )
+    connection.commit()
+    connection.close()
+
+
+async def worker(engine: AsyncEngine, write: bool, deadline: float, latencies: List[float], errors: Dict[str, int]) -> None:
+    index = 0
+    while time.perf_counter() < deadline:
+        index += 1
+        started = time.perf_counter()
+        try:
+            async with engine.begin() as connection:
+                if write:
+                    await connection.execute(INSERT, {"user_id": index % USERS, "timestamp": datetime.utcnow()})
+                else:
+                    (await connection.execute(PAGE, {"user_id": index % USERS})).all()
+        except OperationalError as e:
+            errors["locked" if "locked" in str(e) else "other"] += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+def report(name: str, latencies: List[float], seconds: float) -> None:
+    if not latencies:
+        print(f"  {name:<6} no operation completed")
+        return
+    ordered = sorted(latencies)
+    print(
+        f"  {name:<6} {len(ordered) / seconds:9.1f} ops/s | p50 {statistics.median(ordered) * 1000:7.3f} ms | "
+        f"p99 {ordered[max(int(len(ordered) * 0.99) - 1, 0)] * 1000:8.3f} ms"
+    )
+
+
+async def run(path: str, profile: StorageProfile, writers: int, readers: int, seconds: float) -> None:
+    url = f"sqlite+aiosqlite:///{path}"
+    engine = create_async_engine(url, **profile.engine_options(url))
+    apply_storage_profile(engine.sync_engine, profile)
+    settings = await read_storage_settings(engine)
+    print("  " + ", ".join(f"{name}={value}" for name, value in settings.items() if name != "url"))
+
+    reads: List[float] = []
+    writes: List[float] = []
+    errors = {"locked": 0, "other": 0}
+    deadline = time.perf_counter() + seconds
+    try:
+        await asyncio.gather(
+            *(worker(engine, True, deadline, writes, errors) for _ in range(writers)),
+            *(worker(engine, False, deadline, reads, errors) for _ in range(readers))
+        )
+    finally:
+        await engine.dispose()
+    report("reads", reads, seconds)
+    report("writes", writes, seconds)
+    print(f"  errors: {errors['locked']} locked, {errors['other']} other")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="number of log entries to generate")
+    parser.add_argument("--writers", type=int, default=4, help="concurrent writing tasks")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent reading tasks")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of the load per profile")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma-separated profiles to compare")
+    args = parser.parse_args()
+
+    for name in args.profiles.split(","):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.db")
+            print(f"{name}: seeding {args.rows} rows ...")
+            seed(path, args.rows)
+            asyncio.run(run(path, PROFILES[name], args.writers, args.readers, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compares storing log texts inline with storing them once in `log_texts`.
+
+Builds a SQLite database with `--rows` log entries in the layout used before the text dictionary, with
+`command` and `response` stored in every row, and a copy converted by `init_schema`. Prints the size of
+both files after VACUUM and the time to read a page of one user's logs and to scan every log, with the
+texts resolved to strings in both cases.
+Pages are read through the index and resolve few ids, so they profit from the smaller rows; a full
+scan resolves two ids per row and is the worst case for the dictionary.
+
+Usage:
+    python -m api.benchmarks.texts --rows 1000000 --limit 100
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import create_engine
+
+from api.models import init_schema
+
+REPEATS = 5
+CITIES = ["Moscow", "Paris", "Berlin", "London", "Madrid", "Rome", "Vienna", "Prague", "Oslo", "Kazan"]
+BOT_RESPONSES = [
+    ("/start", "This bot was created as a test for the BobrAi company."),
+    ("/help", "Unknown command"),
+    ("/weather", "City not specified"),
+]
+
+INLINE_PAGE = "SELECT id, user_id, command, timestamp, response FROM logs WHERE user_id = ? ORDER BY timestamp, id LIMIT ?"
+INTERNED_PAGE = (
+    "SELECT id, user_id, (SELECT text FROM log_texts WHERE id = command_id), timestamp, "
+    "(SELECT text FROM log_texts WHERE id = response_id) FROM logs WHERE user_id = ? ORDER BY timestamp, id LIMIT ?"
+)
+INLINE_SCAN = "SELECT id, user_id, command, timestamp, response FROM logs"
+INTERNED_SCAN = (
+    "SELECT id, user_id, (SELECT text FROM log_texts WHERE id = command_id), timestamp, "
+    "(SELECT text FROM log_texts WHERE id = response_id) FROM logs"
+)
+
+
+def seed(path: str, rows: int) -> None:
+    """Create a database in the layout that predates `log_texts`."""
+    started = datetime(2024, 1, 1)
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE logs (id INTEGER PRIMARY KEY, user_id INTEGER, command VARCHAR, "
+        "timestamp DATETIME, response VARCHAR)"
+    )
+    connection.execute("CREATE INDEX ix_logs_timestamp ON logs (timestamp)")
+    connection.execute("CREATE INDEX ix_logs_user_id_timestamp ON logs (user_id, timestamp)")
+
+    def log(index: int) -> tuple:
+        if index % 4:
+            city = CITIES[index % len(CITIES)]
+            command, response = f"/weather {city}", f"Weather in {city}: {index % 40 - 10}°C, wind {index % 12} m/s"
+        else:
+            command, response = BOT_RESPONSES[index // 4 % len(BOT_RESPONSES)]
+        return index % 1000, command, (started + timedelta(seconds=index)).strftime("%Y-%m-%d %H:%M:%S.%f"), response
+
+    connection.executemany(
+        "INSERT INTO logs (user_id, command, timestamp, response) VALUES (?, ?, ?, ?)",
+        (log(index) for index in range(rows))
+    )
+    connection.execute("CREATE VIRTUAL TABLE logs_fts USING fts5(command, response, content='logs', content_rowid='id')")
+    connection.execute("INSERT INTO logs_fts(logs_fts) VALUES ('rebuild')")
+    connection.commit()
+    connection.close()
+
+
+def vacuumed_size(path: str) -> int:
+    connection = sqlite3.connect(path)
+    connection.execute("VACUUM")
+    connection.close()
+    return os.path.getsize(path)
+
+
+def timed(run: Callable[[], object]) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of log entries to generate")
+    parser.add_argument("--limit", type=int, default=100, help="page size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        inline = os.path.join(directory, "inline.db")
+        interned = os.path.join(directory, "interned.db")
+        print(f"seeding {args.rows} rows ...")
+        seed(inline, args.rows)
+        shutil.copyfile(inline, interned)
+
+        started = time.perf_counter()
+        engine = create_engine(f"sqlite:///{interned}")
+        init_schema(engine)
+        engine.dispose()
+        print(f"migration {time.perf_counter() - started:9.3f} s")
+
+        sizes = {name: vacuumed_size(path) for name, path in (("inline", inline), ("interned", interned))}
+        print(
+            f"file size  inline {sizes['inline'] / 2 ** 20:9.1f} MiB | "
+            f"interned {sizes['interned'] / 2 ** 20:9.1f} MiB | x{sizes['inline'] / sizes['interned']:.2f}"
+        )
+
+        for name, queries in (("page", (INLINE_PAGE, INTERNED_PAGE)), ("scan", (INLINE_SCAN, INTERNED_SCAN))):
+            params = (7, args.limit) if name == "page" else ()
+            results = {}
+            for layout, path, query in (("inline", inline, queries[0]), ("interned", interned, queries[1])):
+                connection = sqlite3.connect(path)
+                results[layout] = timed(lambda: connection.execute(query, params).fetchall())
+                connection.close()
+            print(
+                f"{name:<10} inline {results['inline'] * 1000:9.3f} ms | "
+                f"interned {results['interned'] * 1000:9.3f} ms | x{results['inline'] / results['interned']:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
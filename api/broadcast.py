@@ -0,0 +1,97 @@
+import asyncio
+import os
+from typing import Any, AsyncGenerator, Iterable, Mapping, Optional, Set
+
+from api.schemas import LogResponse, LogStreamStats
+
+LOG_STREAM_BUFFER_SIZE: int = int(os.getenv("LOG_STREAM_BUFFER_SIZE", "1000"))
+LOG_STREAM_KEEPALIVE: float = float(os.getenv("LOG_STREAM_KEEPALIVE", "15"))
+
+DROPPED_EVENT = "event: dropped\ndata: subscriber fell behind\n\n"
+KEEPALIVE_EVENT = ": keepalive\n\n"
+
+
+class Subscription:
+    """One `/logs/stream` client: a bounded queue of encoded events, only for `user_id` if given."""
+
+    def __init__(self, user_id: Optional[int], max_size: int) -> None:
+        self.user_id = user_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_size)
+        self.dropped = False
+
+    async def events(self, keepalive: float) -> AsyncGenerator[str, None]:
+        """
+        Server-Sent Events for this client, with a comment line after `keepalive` idle seconds.
+
+        A dropped subscription still delivers the events queued before it overflowed and then ends with
+        a `dropped` event, so the client can resume from the last id it received with `GET /logs/`.
+        """
+        while True:
+            if self.dropped and self.queue.empty():
+                yield DROPPED_EVENT
+                return
+            try:
+                yield await asyncio.wait_for(self.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE_EVENT
+
+
+class LogBroadcaster:
+    """
+    In-process fan-out of newly written logs to `/logs/stream` clients.
+
+    `publish` never waits: every log is encoded at most once, only if a subscription wants it, and
+    offered to the queue of each matching subscription. A subscription whose queue is full is dropped,
+    so a slow client cannot hold up the write path.
+    """
+
+    def __init__(self, buffer_size: int, keepalive: float) -> None:
+        self.buffer_size = buffer_size
+        self.keepalive = keepalive
+        self.subscriptions: Set[Subscription] = set()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(user_id, self.buffer_size)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def publish(self, logs: Iterable[Mapping[str, Any]]) -> None:
+        """Offer committed logs, given as mappings with the fields of `LogResponse`, to the subscribers."""
+        for log in logs:
+            self.published += 1
+            event = None
+            for subscription in list(self.subscriptions):
+                if subscription.user_id is not None and subscription.user_id != log["user_id"]:
+                    continue
+                if event is None:
+                    event = f"id: {log['id']}\ndata: {LogResponse.model_validate(log).model_dump_json()}\n\n"
+                try:
+                    subscription.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    subscription.dropped = True
+                    self.subscriptions.discard(subscription)
+                    self.dropped += 1
+                    continue
+                self.delivered += 1
+
+    def stats(self) -> LogStreamStats:
+        return LogStreamStats(
+            subscribers=len(self.subscriptions),
+            buffer_size=self.buffer_size,
+            published=self.published,
+            delivered=self.delivered,
+            dropped=self.dropped
+        )
+
+
+log_broadcaster = LogBroadcaster(buffer_size=LOG_STREAM_BUFFER_SIZE, keepalive=LOG_STREAM_KEEPALIVE)
+
+
+def get_log_broadcaster() -> LogBroadcaster:
+    return log_broadcaster
@@ -0,0 +1,166 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional, Set, Tuple
+
+from fastapi import Response
+
+from api.routers.utils import NEXT_CURSOR_HEADER, Validator, set_validator
+from api.schemas import CacheStats
+
+LOG_CACHE_ENABLED: bool = os.getenv("LOG_CACHE_ENABLED", "false").lower() == "true"
+LOG_CACHE_TTL: float = float(os.getenv("LOG_CACHE_TTL", "5"))
+LOG_CACHE_MAX_ENTRIES: int = int(os.getenv("LOG_CACHE_MAX_ENTRIES", "10000"))
+LOG_CACHE_MAX_BYTES: int = int(os.getenv("LOG_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# (user_id, *page and filter parameters)
+CacheKey = Tuple[Hashable, ...]
+
+
+class CachedPage(NamedTuple):
+    body: bytes
+    next_cursor: Optional[str]
+    validator: Validator
+
+
+class LogCache(ABC):
+    """
+    Cache of serialized `/logs/{user_id}` pages.
+
+    Keys start with the user id so that a write can drop every page of that user. Methods are async
+    so that a shared backend can replace the in-process implementation.
+    """
+
+    enabled: bool
+
+    @abstractmethod
+    async def get(self, key: CacheKey) -> Optional[CachedPage]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: CacheKey, page: CachedPage, started: float) -> None:
+        """
+        Store a page read from the database.
+
+        `started` is the `time.monotonic()` value taken before the read; the page is dropped if the
+        user was invalidated since then, so a slow read cannot cache data older than a write.
+        """
+
+    @abstractmethod
+    async def invalidate_user(self, user_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> CacheStats:
+        ...
+
+
+class _Entry(NamedTuple):
+    page: CachedPage
+    expires_at: float
+
+
+class InMemoryLogCache(LogCache):
+    """LRU cache with a TTL, bounded by entry count and total body size."""
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int, enabled: bool = True) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._user_keys: Dict[Hashable, Set[CacheKey]] = {}
+        self._invalidated_at: OrderedDict[Hashable, float] = OrderedDict()
+        self._forgotten_until = 0.0
+        self._bytes = 0
+
+    async def get(self, key: CacheKey) -> Optional[CachedPage]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.page
+
+    async def set(self, key: CacheKey, page: CachedPage, started: float) -> None:
+        user_id = key[0]
+        if started <= max(self._invalidated_at.get(user_id, 0.0), self._forgotten_until):
+            return
+        if len(page.body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(page, time.monotonic() + self.ttl)
+        self._user_keys.setdefault(user_id, set()).add(key)
+        self._bytes += len(page.body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def invalidate_user(self, user_id: int) -> None:
+        self._invalidated_at[user_id] = time.monotonic()
+        self._invalidated_at.move_to_end(user_id)
+        if len(self._invalidated_at) > self.max_entries:
+            # Reads that started before the oldest forgotten invalidation are no longer cacheable.
+            _, forgotten = self._invalidated_at.popitem(last=False)
+            self._forgotten_until = max(self._forgotten_until, forgotten)
+        keys = self._user_keys.get(user_id)
+        if not keys:
+            return
+        self.invalidations += 1
+        for key in list(keys):
+            self._remove(key)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            enabled=self.enabled,
+            entries=len(self._entries),
+            bytes=self._bytes,
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            invalidations=self.invalidations
+        )
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.page.body)
+        keys = self._user_keys[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._user_keys[key[0]]
+
+
+def page_response(page: CachedPage) -> Response:
+    response = Response(page.body, media_type="application/json")
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    set_validator(response, page.validator)
+    return response
+
+
+log_cache = InMemoryLogCache(
+    ttl=LOG_CACHE_TTL,
+    max_entries=LOG_CACHE_MAX_ENTRIES,
+    max_bytes=LOG_CACHE_MAX_BYTES,
+    enabled=LOG_CACHE_ENABLED
+)
+
+
+def get_log_cache() -> LogCache:
+    return log_cache
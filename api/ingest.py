@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import suppress
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.broadcast import LogBroadcaster, log_broadcaster
+from api.cache import LogCache, log_cache
+from api.models import AsyncSessionLocal, ReadRouter, insert_log_rows, read_router
+from api.recent import RecentLogs, recent_logs
+from api.rollups import update_rollups
+from api.schemas import IngestStats
+
+LOG_INGEST_MODE: str = os.getenv("LOG_INGEST_MODE", "direct")
+LOG_INGEST_QUEUE_SIZE: int = int(os.getenv("LOG_INGEST_QUEUE_SIZE", "10000"))
+LOG_INGEST_BATCH_SIZE: int = int(os.getenv("LOG_INGEST_BATCH_SIZE", "500"))
+LOG_INGEST_FLUSH_INTERVAL: float = float(os.getenv("LOG_INGEST_FLUSH_INTERVAL", "0.05"))
+
+
+async def announce_logs(
+        created: List[Dict[str, Any]],
+        reads: Optional[ReadRouter],
+        cache: Optional[LogCache],
+        recent: Optional[RecentLogs],
+        broadcaster: Optional[LogBroadcaster]
+) -> None:
+    """
+    Bring the read side up to date with `created`, logs that were just committed.
+
+    Pins their users to the primary, drops their cached pages, adds them to the recent window and
+    publishes them to the stream. The logs are stored by then, so a failure is logged instead of
+    failing the write.
+    """
+    try:
+        user_ids = {log["user_id"] for log in created}
+        if reads is not None:
+            reads.pin(user_ids)
+        if cache is not None:
+            for user_id in user_ids:
+                await cache.invalidate_user(user_id)
+        if recent is not None:
+            recent.add(created)
+        if broadcaster is not None:
+            broadcaster.publish(created)
+    except Exception:
+        logging.exception("Failed to announce %d new log entries", len(created))
+
+
+class IngestBuffer:
+    """
+    Write-behind buffer for log entries.
+
+    Accepted rows wait in a bounded in-process queue. A background task drains the queue and writes
+    the rows with one multi-row insert and one commit per group, flushing as soon as `batch_size`
+    rows are waiting or `flush_interval` seconds after the first row of a group arrived.
+    """
+
+    def __init__(
+            self,
+            session_factory: Callable[[], AsyncSession],
+            max_size: int,
+            batch_size: int,
+            flush_interval: float,
+            enabled: bool = True,
+            cache: Optional[LogCache] = None,
+            broadcaster: Optional[LogBroadcaster] = None,
+            reads: Optional[ReadRouter] = None,
+            recent: Optional[RecentLogs] = None
+    ) -> None:
+        self.session_factory = session_factory
+        self.cache = cache
+        self.broadcaster = broadcaster
+        self.reads = reads
+        self.recent = recent
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self.queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=max_size)
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.flush_seconds_last = 0.0
+        self._pending: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task[None]] = None
+        self._flushing: Optional[asyncio.Future[None]] = None
+
+    def put(self, row: Dict[str, Any]) -> bool:
+        """Queue a row for writing. Returns False when the queue is full."""
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        return True
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write everything that is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+        await self.drain()
+
+    async def run(self) -> None:
+        while True:
+            await self._collect()
+            self._flushing = asyncio.ensure_future(self.flush(self._take_pending()))
+            # Shielded so that shutdown waits for an in-flight group instead of abandoning it.
+            await asyncio.shield(self._flushing)
+
+    async def drain(self) -> None:
+        while self._pending or not self.queue.empty():
+            while len(self._pending) < self.batch_size and not self.queue.empty():
+                self._pending.append(self.queue.get_nowait())
+            await self.flush(self._take_pending())
+
+    async def flush(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        started = time.perf_counter()
+        try:
+            async with self.session_factory() as db:
+                ids = await insert_log_rows(db, rows)
+                await update_rollups(db, rows)
+                await db.commit()
+        except Exception:
+            self.failed_rows += len(rows)
+            logging.exception("Failed to flush %d buffered log entries", len(rows))
+            return
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.flushed_rows += len(rows)
+        self.flush_seconds_total += elapsed
+        self.flush_seconds_last = elapsed
+        self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+        created = [{"id": log_id, **row} for log_id, row in zip(ids, rows)]
+        await announce_logs(created, self.reads, self.cache, self.recent, self.broadcaster)
+
+    def stats(self) -> IngestStats:
+        return IngestStats(
+            enabled=self.enabled,
+            queue_depth=self.queue.qsize() + len(self._pending),
+            queue_capacity=self.queue.maxsize,
+            accepted=self.accepted,
+            rejected=self.rejected,
+            flushed_rows=self.flushed_rows,
+            failed_rows=self.failed_rows,
+            flushes=self.flushes,
+            flush_seconds_last=self.flush_seconds_last,
+            flush_seconds_max=self.flush_seconds_max,
+            flush_seconds_avg=self.flush_seconds_total / self.flushes if self.flushes else 0.0
+        )
+
+    async def _collect(self) -> None:
+        self._pending.append(await self.queue.get())
+        deadline = time.monotonic() + self.flush_interval
+        while len(self._pending) < self.batch_size:
+            try:
+                self._pending.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return
+            try:
+                self._pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                return
+
+    def _take_pending(self) -> List[Dict[str, Any]]:
+        rows, self._pending = self._pending, []
+        return rows
+
+
+ingest_buffer = IngestBuffer(
+    AsyncSessionLocal,
+    max_size=LOG_INGEST_QUEUE_SIZE,
+    batch_size=LOG_INGEST_BATCH_SIZE,
+    flush_interval=LOG_INGEST_FLUSH_INTERVAL,
+    enabled=LOG_INGEST_MODE == "buffered",
+    cache=log_cache,
+    broadcaster=log_broadcaster,
+    reads=read_router,
+    recent=recent_logs
+)
+
+
+def get_ingest_buffer() -> IngestBuffer:
+    return ingest_buffer
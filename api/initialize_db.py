@@ -1,9 +1,19 @@
-from models import Base, engine
+from dotenv import load_dotenv
+
+if __name__ == "__main__":
+    # `api.models` reads DATABASE_URL when it is imported.
+    load_dotenv()
+
+from api.models import get_engine, init_schema
 
 
 def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
+    engine = get_engine()
+    try:
+        init_schema(engine)
+    finally:
+        engine.dispose()
 
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
@@ -1,13 +1,70 @@
-from typing import Dict
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from dotenv import load_dotenv
+
+# The application entry point: the `api` modules read their settings from the environment as they
+# are imported below, so `.env` is loaded first and only here.
+load_dotenv()
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from api.ingest import ingest_buffer
+from api.maintenance import ActivityMiddleware, maintenance_scheduler
+from api.models import (
+    DATABASE_INIT_SCHEMA,
+    AsyncSessionLocal,
+    ReadSessionLocals,
+    dispose_engines,
+    get_async_engine,
+    init_async_schema
+)
+from api.recent import recent_logs
 from api.routers.logs.add_logs import router as add_logs_router
+from api.routers.logs.add_logs_batch import router as add_logs_batch_router
+from api.routers.logs.cache_stats import router as cache_stats_router
+from api.routers.logs.export_logs import router as export_logs_router
+from api.routers.logs.ingest_stats import router as ingest_stats_router
+from api.routers.logs.log_stats import router as log_stats_router
 from api.routers.logs.read_logs import router as read_logs_router
 from api.routers.logs.read_user_logs import router as read_user_logs_router
+from api.routers.logs.recent_stats import router as recent_stats_router
+from api.routers.logs.slow_queries import router as slow_queries_router
+from api.routers.logs.stream_logs import router as stream_logs_router
+from api.routers.logs.stream_stats import router as stream_stats_router
+from api.routers.metrics import router as metrics_router
+from api.routers.utils import NEXT_CURSOR_HEADER, QUERY_WARNING_HEADER
+from api.storage import read_storage_settings
+
+# uvicorn only configures its own loggers and leaves the root one at WARNING; the startup report
+# goes through its error logger so that it is printed next to uvicorn's own startup messages.
+logger = logging.getLogger("uvicorn.error")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Nothing connects to the database at import time; the engines are created here or by the first request.
+    if DATABASE_INIT_SCHEMA:
+        await init_async_schema(get_async_engine())
+    for factory in (AsyncSessionLocal, *ReadSessionLocals):
+        logger.info("Storage settings: %s", await read_storage_settings(get_async_engine(factory.database_url)))
+    if recent_logs.enabled:
+        await recent_logs.prime(AsyncSessionLocal)
+    if ingest_buffer.enabled:
+        await ingest_buffer.start()
+    if maintenance_scheduler.enabled:
+        await maintenance_scheduler.start()
+    try:
+        yield
+    finally:
+        await maintenance_scheduler.stop()
+        await ingest_buffer.stop()
+        await dispose_engines()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,11 +72,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, QUERY_WARNING_HEADER, "ETag"],
 )
+app.add_middleware(ActivityMiddleware, scheduler=maintenance_scheduler)
 
 app.include_router(read_logs_router)
 app.include_router(add_logs_router)
+app.include_router(add_logs_batch_router)
+app.include_router(ingest_stats_router)
+app.include_router(export_logs_router)
+app.include_router(cache_stats_router)
+app.include_router(log_stats_router)
+app.include_router(stream_logs_router)
+app.include_router(stream_stats_router)
+app.include_router(recent_stats_router)
+app.include_router(slow_queries_router)
 app.include_router(read_user_logs_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+if __name__ == "__main__":
+    # A manual run reads the same retention, archive and database settings as the api.
+    load_dotenv()
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.archive import LOG_ARCHIVE_AFTER_DAYS, LogArchive, archive_partitions, log_archive
+from api.models import dispose_engines, get_async_engine
+from api.partitions import Partition, drop_expired_partitions, drop_partition, drop_rollups, rotate_partitions
+from api.recent import RecentLogs, recent_logs
+
+LOG_MAINTENANCE_ENABLED: bool = os.getenv("LOG_MAINTENANCE_ENABLED", "false").lower() == "true"
+LOG_MAINTENANCE_INTERVAL: float = float(os.getenv("LOG_MAINTENANCE_INTERVAL", "3600"))
+LOG_MAINTENANCE_IDLE: float = float(os.getenv("LOG_MAINTENANCE_IDLE", "60"))
+LOG_RETENTION_DAYS: int = int(os.getenv("LOG_RETENTION_DAYS", "0"))
+LOG_VACUUM_FREE_RATIO: float = float(os.getenv("LOG_VACUUM_FREE_RATIO", "0.25"))
+
+# Runs inside the api process, where uvicorn only sets up its own loggers.
+logger = logging.getLogger("uvicorn.error")
+
+
+class MaintenanceResult(NamedTuple):
+    rotated: List[str]
+    archived: List[str]
+    dropped: List[str]
+    analyzed: bool
+    vacuumed: bool
+
+
+async def maintain(
+        engine: AsyncEngine,
+        now: datetime,
+        retention_days: int,
+        vacuum_free_ratio: float,
+        archive: Optional[LogArchive] = None,
+        archive_after_days: int = 0
+) -> MaintenanceResult:
+    """
+    Run one maintenance pass over the log storage.
+
+    Moves closed months out of `logs` into their partitions, moves partitions older than
+    `archive_after_days` into the archive (0 keeps them in the database), drops partitions and
+    archived months older than `retention_days` (0 keeps everything), refreshes planner statistics
+    if partitions changed and, on SQLite, runs VACUUM once at least `vacuum_free_ratio` of the file
+    is free pages.
+    """
+    async with engine.begin() as connection:
+        rotated = await connection.run_sync(rotate_partitions, now)
+
+    archived = []
+    if archive is not None and archive_after_days > 0:
+        # Segments are written outside the write transaction; only dropping the partitions takes the lock.
+        async with engine.connect() as connection:
+            archived = await connection.run_sync(archive_partitions, archive, now, archive_after_days)
+        async with engine.begin() as connection:
+            for name in archived:
+                await connection.run_sync(drop_partition, Partition.named(name))
+
+    dropped = []
+    if retention_days > 0:
+        async with engine.begin() as connection:
+            dropped = await connection.run_sync(drop_expired_partitions, now, retention_days)
+            if archive is not None:
+                expired = archive.drop_expired(now - timedelta(days=retention_days))
+                await connection.run_sync(drop_rollups, expired)
+                dropped += expired
+
+    analyzed = vacuumed = False
+    async with engine.connect() as connection:
+        # ANALYZE and VACUUM cannot run inside a transaction.
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        if rotated or archived or dropped:
+            await connection.exec_driver_sql("ANALYZE")
+            analyzed = True
+        if connection.dialect.name == "sqlite":
+            free_pages = (await connection.exec_driver_sql("PRAGMA freelist_count")).scalar()
+            total_pages = (await connection.exec_driver_sql("PRAGMA page_count")).scalar()
+            if total_pages and free_pages / total_pages >= vacuum_free_ratio:
+                await connection.exec_driver_sql("VACUUM")
+                vacuumed = True
+    return MaintenanceResult(rotated, archived, dropped, analyzed, vacuumed)
+
+
+class MaintenanceScheduler:
+    """
+    Background task that runs `maintain` at most once per `interval` seconds, and only once no
+    request has arrived for `idle` seconds, so that VACUUM and partition moves do not compete
+    with traffic. Without an `engine` it maintains the primary database.
+    """
+
+    def __init__(
+            self,
+            engine: Optional[AsyncEngine],
+            interval: float,
+            idle: float,
+            retention_days: int,
+            vacuum_free_ratio: float,
+            archive: Optional[LogArchive] = None,
+            archive_after_days: int = 0,
+            enabled: bool = True,
+            recent: Optional[RecentLogs] = None
+    ) -> None:
+        self.engine = engine
+        self.recent = recent
+        self.archive = archive
+        self.archive_after_days = archive_after_days
+        self.interval = interval
+        self.idle = idle
+        self.retention_days = retention_days
+        self.vacuum_free_ratio = vacuum_free_ratio
+        self.enabled = enabled
+        self.last_activity = time.monotonic()
+        self.last_run: Optional[float] = None
+        self.runs = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task[None]] = None
+        self._running: Optional[asyncio.Future[Optional[MaintenanceResult]]] = None
+
+    def touch(self) -> None:
+        """Record request activity; maintenance waits until the service has been idle for a while."""
+        self.last_activity = time.monotonic()
+
+    def is_due(self) -> bool:
+        now = time.monotonic()
+        if now - self.last_activity < self.idle:
+            return False
+        return self.last_run is None or now - self.last_run >= self.interval
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._running is not None:
+            await self._running
+            self._running = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle, self.interval))
+            if self.is_due():
+                self._running = asyncio.ensure_future(self.run_once())
+                # Shielded so that shutdown waits for a running VACUUM instead of abandoning it.
+                await asyncio.shield(self._running)
+
+    async def run_once(self, now: Optional[datetime] = None) -> Optional[MaintenanceResult]:
+        self.last_run = time.monotonic()
+        now = now or datetime.utcnow()
+        try:
+            result = await maintain(
+                self.engine or get_async_engine(),
+                now,
+                self.retention_days,
+                self.vacuum_free_ratio,
+                self.archive,
+                self.archive_after_days
+            )
+        except Exception:
+            self.failures += 1
+            logger.exception("Log storage maintenance failed")
+            return None
+        self.runs += 1
+        if result.dropped and self.recent is not None:
+            self.recent.discard_before(now - timedelta(days=self.retention_days))
+        logger.info(
+            "Log storage maintenance: rotated %s, archived %s, dropped %s, analyzed %s, vacuumed %s",
+            result.rotated, result.archived, result.dropped, result.analyzed, result.vacuumed
+        )
+        return result
+
+
+class ActivityMiddleware:
+    """Report every HTTP request to the maintenance scheduler."""
+
+    def __init__(self, app: ASGIApp, scheduler: MaintenanceScheduler) -> None:
+        self.app = app
+        self.scheduler = scheduler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            self.scheduler.touch()
+        await self.app(scope, receive, send)
+
+
+maintenance_scheduler = MaintenanceScheduler(
+    None,
+    interval=LOG_MAINTENANCE_INTERVAL,
+    idle=LOG_MAINTENANCE_IDLE,
+    retention_days=LOG_RETENTION_DAYS,
+    vacuum_free_ratio=LOG_VACUUM_FREE_RATIO,
+    archive=log_archive,
+    archive_after_days=LOG_ARCHIVE_AFTER_DAYS,
+    enabled=LOG_MAINTENANCE_ENABLED,
+    recent=recent_logs
+)
+
+
+async def main() -> None:
+    await maintenance_scheduler.run_once()
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    asyncio.run(main())
@@ -0,0 +1,270 @@
+import os
+import time
+from bisect import bisect_left
+from contextlib import suppress
+from contextvars import ContextVar
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Coroutine, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import Engine, event  # type: ignore[attr-defined]
+
+METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+# Endpoint whose request is being handled; queries outside a request, such as ingest flushes, are `background`.
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+Labels = Tuple[str, ...]
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str]) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.label_names, labels)} {format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram:
+    """
+    Histogram with fixed upper bounds.
+
+    `observe` increments a single bucket; the cumulative counts of the exposition format are only
+    summed up when the metrics are rendered.
+    """
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str], buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self.series: Dict[Labels, List[float]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, labels: Labels) -> int:
+        series = self.series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        bounds = [*(format_value(bound) for bound in self.buckets), "+Inf"]
+        for labels, series in self.series.items():
+            cumulative = 0.0
+            for bound, count in zip(bounds, series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{format_labels(self.label_names, labels, le)} {int(cumulative)}"
+            yield f"{self.name}_sum{format_labels(self.label_names, labels)} {format_value(series[-1])}"
+            yield f"{self.name}_count{format_labels(self.label_names, labels)} {int(cumulative)}"
+
+
+class Metrics:
+    """
+    In-process metrics of the api, rendered in the Prometheus text format at `GET /metrics`.
+
+    Requests are measured by `MetricsRoute`, database work by the engine events installed with
+    `instrument_engine`. Every update is a dictionary lookup and a few additions on the event loop,
+    so the metrics can stay enabled in production.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.requests = Counter(
+            "api_requests_total", "Requests handled, by endpoint, method and status.", ("route", "method", "status")
+        )
+        self.in_flight = Gauge("api_requests_in_flight", "Requests currently being handled, by endpoint.", ("route",))
+        self.request_seconds = Histogram(
+            "api_request_duration_seconds", "Time to produce the response, by endpoint.", ("route",), LATENCY_BUCKETS
+        )
+        self.response_bytes = Histogram(
+            "api_response_size_bytes", "Size of the response body, by endpoint.", ("route",), SIZE_BUCKETS
+        )
+        self.rows = Histogram("api_rows_returned", "Log entries returned per read, by endpoint.", ("route",), ROW_BUCKETS)
+        self.query_seconds = Histogram(
+            "db_query_duration_seconds", "Database statement time, by endpoint and statement type.",
+            ("route", "operation"), LATENCY_BUCKETS
+        )
+        self.checkout_seconds = Histogram(
+            "db_connection_checkout_seconds", "Time to get a connection from the pool, by endpoint.", ("route",),
+            LATENCY_BUCKETS
+        )
+        self.query_errors = Counter("db_query_errors_total", "Failed database statements, by endpoint.", ("route",))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (
+                self.requests, self.in_flight, self.request_seconds, self.response_bytes, self.rows,
+                self.query_seconds, self.checkout_seconds, self.query_errors
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def record_rows(count: int) -> None:
+    """Record how many log entries the current endpoint returns."""
+    if metrics.enabled:
+        metrics.rows.observe((current_route.get(),), count)
+
+
+def statement_operation(statement: str) -> str:
+    """First keyword of a statement, e.g. `SELECT`; keeps the label set small whatever the query."""
+    keyword = statement.lstrip().split(None, 1)[0] if statement.strip() else ""
+    return keyword.upper() if keyword.isalpha() else "OTHER"
+
+
+def instrument_engine(engine: Engine, registry: Optional[Metrics] = None) -> None:
+    """
+    Time the statements of `engine` and the wait for its connections.
+
+    Statement times come from the `before_cursor_execute`/`after_cursor_execute` events. The pool has
+    no event before a checkout, so the wait is timed around `Engine.raw_connection`, which every new
+    `Connection` calls to check one out.
+    """
+    recorder = registry or metrics
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_query(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        started = conn.info["query_started"].pop()
+        if recorder.enabled:
+            recorder.query_seconds.observe(
+                (current_route.get(), statement_operation(statement)), time.perf_counter() - started
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def failed_query(context: Any) -> None:
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+        if recorder.enabled:
+            recorder.query_errors.inc((current_route.get(),))
+
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection() -> Any:
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            if recorder.enabled:
+                recorder.checkout_seconds.observe((current_route.get(),), time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection  # type: ignore[method-assign]
+
+
+class MetricsRoute(APIRoute):
+    """
+    `APIRoute` that measures its requests under the name of the endpoint, e.g. `read_user_logs`.
+
+    Also makes the endpoint name available to the database events while the request runs, including
+    while a streaming response is being sent.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        route = self.name
+        labels = (route,)
+
+        async def measured_handler(request: Request) -> Response:
+            registry = metrics
+            if not registry.enabled:
+                return await handler(request)
+            token = current_route.set(route)
+            registry.in_flight.inc(labels)
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                if isinstance(response, StreamingResponse):
+                    response.body_iterator = measured_body(response.body_iterator, route, registry)
+                else:
+                    registry.response_bytes.observe(labels, len(response.body))
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            except RequestValidationError:
+                status = 422
+                raise
+            finally:
+                registry.in_flight.dec(labels)
+                registry.request_seconds.observe(labels, time.perf_counter() - started)
+                registry.requests.inc((route, request.method, str(status)))
+                current_route.reset(token)
+
+        return measured_handler
+
+
+async def measured_body(body: AsyncIterable[Any], route: str, registry: Metrics) -> AsyncIterator[Any]:
+    """Pass a streaming body through, attributing its queries to `route` and recording its size at the end."""
+    size = 0
+    token = current_route.set(route)
+    try:
+        async for chunk in body:
+            size += len(chunk)
+            yield chunk
+    finally:
+        # A generator closed after a disconnect may be finalized in another context.
+        with suppress(ValueError):
+            current_route.reset(token)
+        registry.response_bytes.observe((route,), size)
+
+
+metrics = Metrics(enabled=METRICS_ENABLED)
+
+
+def get_metrics() -> Metrics:
+    return metrics
@@ -1,39 +1,543 @@
+import importlib
 import os
-from typing import Generator
+import re
+import time
+import weakref
+from collections import OrderedDict
+from itertools import cycle
+from typing import Any, AsyncGenerator, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, cast
 
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
-from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
+from fastapi import Depends
+from sqlalchemy import (  # type: ignore[attr-defined]
+    create_engine,
+    column,
+    func,
+    insert,
+    select,
+    table,
+    union,
+    Column,
+    Connection,
+    Integer,
+    String,
+    DateTime,
+    DDL,
+    Engine,
+    Index,
+    event,
+    inspect,
+    make_url
+)
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import column_property, DeclarativeBase
 from datetime import datetime
 
-load_dotenv()
+from api.metrics import instrument_engine
+from api.slow_queries import slow_query_log, watch_slow_queries
+from api.storage import apply_storage_profile, storage_profile
+
 DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./logs.db")
+DATABASE_READ_URLS: List[str] = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "2"))
+LOG_TEXT_CACHE_SIZE: int = int(os.getenv("LOG_TEXT_CACHE_SIZE", "10000"))
+DATABASE_INIT_SCHEMA: bool = os.getenv("DATABASE_INIT_SCHEMA", "true").lower() == "true"
+
+INTERN_CHUNK_SIZE = 500
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    Translate a database URL to one that uses an async driver.
+
+    URLs that already name a driver (for example `sqlite+aiosqlite://`) are returned unchanged.
+    """
+    url = make_url(database_url)
+    if "+" in url.drivername or url.drivername not in ASYNC_DRIVERS:
+        return database_url
+    return url.set(drivername=ASYNC_DRIVERS[url.drivername]).render_as_string(hide_password=False)
+
+
+def upsert_dialect(dialect_name: str) -> Any:
+    """
+    Module whose `insert` supports `ON CONFLICT` for the dialect, `postgresql` or else `sqlite`.
+
+    Imported on first use: loading every dialect package up front slows down the start of each worker.
+    """
+    return importlib.import_module(f"sqlalchemy.dialects.{'postgresql' if dialect_name == 'postgresql' else 'sqlite'}")
+
+
+# Async engines by URL. Created on first use, so importing the api does not connect to any database.
+async_engines: Dict[str, AsyncEngine] = {}
+
+
+def get_engine() -> Engine:
+    """New synchronous engine of the primary database, for command line tools; the caller disposes it."""
+    engine = create_engine(DATABASE_URL, **storage_profile.engine_options(DATABASE_URL))
+    apply_storage_profile(engine, storage_profile)
+    return engine
+
 
+def get_async_engine(database_url: Optional[str] = None) -> AsyncEngine:
+    """Shared async engine of `database_url`, the primary database by default."""
+    url = get_async_database_url(database_url or DATABASE_URL)
+    engine = async_engines.get(url)
+    if engine is None:
+        engine = async_engines[url] = create_async_engine(url, **storage_profile.engine_options(url))
+        apply_storage_profile(engine.sync_engine, storage_profile)
+        instrument_engine(engine.sync_engine)
+        if slow_query_log.enabled:
+            watch_slow_queries(engine.sync_engine)
+    return engine
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async def dispose_engines() -> None:
+    """Close the pools of every engine created so far; the next session creates its engine again."""
+    engines = list(async_engines.values())
+    async_engines.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
+class SessionFactory:
+    """Opens sessions on one database, creating its engine with the first session."""
+
+    def __init__(self, database_url: Optional[str] = None) -> None:
+        self.database_url = database_url
+
+    def __call__(self) -> AsyncSession:
+        return AsyncSession(bind=get_async_engine(self.database_url), autoflush=False, expire_on_commit=False)
+
+
+AsyncSessionLocal = SessionFactory()
+
+# Replicas of the primary database for read endpoints; without any, reads use the primary.
+ReadSessionLocals = [SessionFactory(url) for url in DATABASE_READ_URLS]
 
 
 class Base(DeclarativeBase):
     pass
 
 
+class LogText(Base):
+    """Distinct command and response strings; log rows refer to them by id."""
+    __tablename__ = "log_texts"
+
+    id = Column(Integer, primary_key=True)
+    text = Column(String, nullable=False, unique=True)
+
+
+def text_of(text_id: Any) -> Any:
+    """SQL expression for the string that the `log_texts` id in `text_id` stands for."""
+    return select(LogText.text).where(LogText.id == text_id).scalar_subquery()  # type: ignore[arg-type, attr-defined]
+
+
 class Log(Base):
+    """
+    One logged bot interaction.
+
+    `command` and `response` are stored once in `log_texts` and referenced by id. Both are read back
+    as plain strings and can be passed to the constructor; `intern_log_texts` resolves them to ids
+    when the row is inserted.
+    """
     __tablename__ = "logs"
+    __table_args__ = (
+        Index("ix_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_logs_command_id_timestamp", "command_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, index=True)
-    command = Column(String)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    response = Column(String)
+    user_id = Column(Integer)
+    command_id = Column(Integer)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    response_id = Column(Integer)
+
+    command = column_property(text_of(command_id))
+    response = column_property(text_of(response_id))
+
+
+def text_sql(column_name: str) -> str:
+    return f"(SELECT text FROM log_texts WHERE id = {column_name})"
+
+
+def fts_ddl(name: str) -> str:
+    """DDL of the SQLite FTS5 index over the command and response texts of log table `name`."""
+    return f"CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5(command, response, content='')"
+
+
+# SQLite FTS5 index over the texts of `logs`, kept in sync by triggers on `logs`. The index keeps no
+# copy of the texts (`content=''`); the triggers look them up in `log_texts`.
+LOGS_FTS_DDL = [
+    fts_ddl("logs"),
+    "CREATE TRIGGER logs_fts_insert AFTER INSERT ON logs BEGIN "
+    f"INSERT INTO logs_fts(rowid, command, response) "
+    f"VALUES (new.id, {text_sql('new.command_id')}, {text_sql('new.response_id')}); END",
+    "CREATE TRIGGER logs_fts_delete AFTER DELETE ON logs BEGIN "
+    f"INSERT INTO logs_fts(logs_fts, rowid, command, response) "
+    f"VALUES ('delete', old.id, {text_sql('old.command_id')}, {text_sql('old.response_id')}); END",
+    "CREATE TRIGGER logs_fts_update AFTER UPDATE ON logs BEGIN "
+    f"INSERT INTO logs_fts(logs_fts, rowid, command, response) "
+    f"VALUES ('delete', old.id, {text_sql('old.command_id')}, {text_sql('old.response_id')}); "
+    f"INSERT INTO logs_fts(rowid, command, response) "
+    f"VALUES (new.id, {text_sql('new.command_id')}, {text_sql('new.response_id')}); END",
+]
+LOGS_FTS_TRIGGERS = ["logs_fts_insert", "logs_fts_delete", "logs_fts_update"]
+
+for statement in LOGS_FTS_DDL:
+    event.listen(Log.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))  # type: ignore[arg-type]
+
+
+class LogRollup(Base):
+    """Pre-aggregated log counts per time bucket for one dimension (total, command or user)."""
+    __tablename__ = "log_rollups"
+    __table_args__ = (
+        Index("ix_log_rollups_key", "granularity", "dimension", "key", "bucket"),
+    )
+
+    granularity = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class LogTextCache:
+    """
+    In-memory map from interned strings to their `log_texts` ids for one database, so that writes
+    of known commands and responses need no lookup. Least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+
+    def get(self, text: str) -> Optional[int]:
+        text_id = self._ids.get(text)
+        if text_id is not None:
+            self._ids.move_to_end(text)
+        return text_id
+
+    def update(self, ids: Mapping[str, int]) -> None:
+        self._ids.update(ids)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+# One cache per engine: ids are only meaningful within the database they were assigned in.
+text_caches: "weakref.WeakKeyDictionary[Engine, LogTextCache]" = weakref.WeakKeyDictionary()
+
+# Ids looked up or assigned by the open transaction of a connection, kept in `Connection.info` under this
+# key. They reach the shared cache only when the transaction commits; after a rollback the rows they
+# point to may not exist.
+PENDING_TEXTS = "pending_log_texts"
+
+
+def get_text_cache(bind: Engine) -> LogTextCache:
+    cache = text_caches.get(bind)
+    if cache is None:
+        cache = text_caches[bind] = LogTextCache(LOG_TEXT_CACHE_SIZE)
+    return cache
+
+
+@event.listens_for(Engine, "commit")
+def publish_log_texts(connection: Connection) -> None:
+    pending = connection.info.pop(PENDING_TEXTS, None)
+    if pending:
+        get_text_cache(connection.engine).update(pending)
+
 
+@event.listens_for(Engine, "rollback")
+@event.listens_for(Engine, "rollback_savepoint")
+def discard_log_texts(connection: Connection, *args: Any) -> None:
+    connection.info.pop(PENDING_TEXTS, None)
 
-Base.metadata.create_all(bind=engine)
 
+def intern_texts(connection: Connection, texts: Iterable[str]) -> Dict[str, int]:
+    """Map each of `texts` to its `log_texts` id, adding the strings that are not stored yet."""
+    cache = get_text_cache(connection.engine)
+    pending = connection.info.setdefault(PENDING_TEXTS, {})
+    ids: Dict[str, int] = {}
+    missing: List[str] = []
+    for text in set(texts):
+        text_id = pending.get(text)
+        if text_id is None:
+            text_id = cache.get(text)
+        if text_id is None:
+            missing.append(text)
+        else:
+            ids[text] = text_id
 
-def get_db() -> Generator[Session, None, None]:
-    db: Session = SessionLocal()
-    try:
+    dialect = upsert_dialect(connection.dialect.name)
+    for start in range(0, len(missing), INTERN_CHUNK_SIZE):
+        chunk = missing[start:start + INTERN_CHUNK_SIZE]
+        connection.execute(
+            dialect.insert(LogText).on_conflict_do_nothing(index_elements=[LogText.text]),
+            [{"text": text} for text in chunk]
+        )
+        found = dict(connection.execute(
+            select(LogText.text, LogText.id).where(LogText.text.in_(chunk))  # type: ignore[arg-type]
+        ).all())
+        pending.update(found)
+        ids.update(found)
+    return ids
+
+
+def intern_logs(connection: Connection, logs: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows for a bulk insert into `logs`: `logs` with `command` and `response` replaced by their ids."""
+    logs = list(logs)
+    ids = intern_texts(connection, [log[key] for log in logs for key in ("command", "response")])
+    return [
+        {
+            **{key: value for key, value in log.items() if key not in ("command", "response")},
+            "command_id": ids[log["command"]],
+            "response_id": ids[log["response"]]
+        }
+        for log in logs
+    ]
+
+
+async def intern_log_rows(db: AsyncSession, logs: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    return await db.run_sync(lambda session: intern_logs(session.connection(), logs))
+
+
+def insert_logs(connection: Connection, logs: Iterable[Mapping[str, Any]]) -> List[int]:
+    """
+    Bulk insert `logs` and return their new ids, in the order of `logs`.
+
+    SQLite cannot promise the order of `RETURNING` rows, so SQLAlchemy would fall back to one
+    `INSERT` per row to match ids to rows. Instead the rows go out as one `executemany` without
+    `RETURNING`: SQLite gives each row `max(id) + 1`, and the transaction holds the write lock
+    from the first row on, so the batch gets the contiguous range that ends at the new `max(id)`.
+    """
+    rows = intern_logs(connection, logs)
+    if not rows:
+        return []
+    table = Log.__table__
+    if connection.dialect.name != "sqlite":
+        return list(connection.scalars(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),  # type: ignore[call-arg]
+            rows
+        ))
+    connection.execute(insert(table), rows)
+    last_id = connection.scalar(select(func.max(Log.id)))
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+async def insert_log_rows(db: AsyncSession, logs: Iterable[Mapping[str, Any]]) -> List[int]:
+    return await db.run_sync(lambda session: insert_logs(session.connection(), logs))
+
+
+@event.listens_for(Log, "before_insert")
+def intern_log_texts(mapper: Any, connection: Connection, target: Log) -> None:
+    """Resolve the `command` and `response` strings of a new `Log` to `log_texts` ids."""
+    # The stubs only know the class-level `column_property`; on an instance both read as strings.
+    command, response = cast(Tuple[Optional[str], Optional[str]], (target.command, target.response))
+    ids = intern_texts(connection, [text for text in (command, response) if text is not None])
+    if command is not None:
+        target.command_id = ids[command]
+    if response is not None:
+        target.response_id = ids[response]
+
+
+def fill_fts(connection: Connection, name: str) -> None:
+    """Index the texts of every row of log table `name` in its full-text index."""
+    source = table(name, column("id"), column("command_id"), column("response_id"))
+    fts = table(f"{name}_fts", column("rowid"), column("command"), column("response"))
+    connection.execute(fts.insert().from_select(
+        ["rowid", "command", "response"],
+        select(source.c.id, text_of(source.c.command_id), text_of(source.c.response_id))  # type: ignore[arg-type]
+    ))
+
+
+def intern_log_tables(connection: Connection) -> List[str]:
+    """
+    Move the texts of log tables created before `log_texts` into the dictionary.
+
+    Covers `logs` and its monthly partitions: every distinct `command` and `response` is added to
+    `log_texts`, the rows get `command_id` and `response_id`, and the string columns are dropped.
+    SQLite full-text indexes are rebuilt without a copy of the texts. Returns the converted tables.
+    The freed pages are returned to the file system by the next VACUUM.
+    """
+    inspector = inspect(connection)
+    names = [
+        name for name in inspector.get_table_names()
+        if {"user_id", "command", "response"} <= {column["name"] for column in inspector.get_columns(name)}
+    ]
+    converted = []
+    for name in names:
+        if connection.dialect.name == "sqlite":
+            if name == "logs":
+                for trigger in LOGS_FTS_TRIGGERS:
+                    connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {name}_fts")
+
+        logs = table(name, column("command"), column("response"))
+        texts = union(  # type: ignore[attr-defined]
+            select(logs.c.command.label("text")), select(logs.c.response.label("text"))  # type: ignore[arg-type]
+        ).subquery()
+        dialect = upsert_dialect(connection.dialect.name)
+        connection.execute(
+            dialect.insert(LogText)
+            .from_select(["text"], select(texts.c.text).where(texts.c.text.is_not(None)))
+            .on_conflict_do_nothing(index_elements=[LogText.text])
+        )
+        connection.exec_driver_sql(f"ALTER TABLE {name} ADD COLUMN command_id INTEGER")
+        connection.exec_driver_sql(f"ALTER TABLE {name} ADD COLUMN response_id INTEGER")
+        connection.exec_driver_sql(
+            f"UPDATE {name} SET "
+            f"command_id = (SELECT id FROM log_texts WHERE text = {name}.command), "
+            f"response_id = (SELECT id FROM log_texts WHERE text = {name}.response)"
+        )
+        connection.exec_driver_sql(f"ALTER TABLE {name} DROP COLUMN command")
+        connection.exec_driver_sql(f"ALTER TABLE {name} DROP COLUMN response")
+
+        if connection.dialect.name == "sqlite" and name != "logs":
+            connection.exec_driver_sql(fts_ddl(name))
+            fill_fts(connection, name)
+        converted.append(name)
+    return converted
+
+
+# Indexes replaced by newer ones; dropped from existing databases by `init_schema`.
+OBSOLETE_INDEXES = ["ix_logs_user_id"]
+
+# Monthly partitions of `logs`, see `api.partitions`; matched by name because they are not in `Base.metadata`.
+PARTITION_TABLE_PATTERN = re.compile(r"logs_\d{4}_\d{2}")
+
+
+def index_partition_commands(connection: Connection) -> None:
+    """Create the `(command_id, timestamp)` index on partitions rotated out before it existed."""
+    for name in inspect(connection).get_table_names():
+        if PARTITION_TABLE_PATTERN.fullmatch(name):
+            connection.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{name}_command_id_timestamp ON {name} (command_id, timestamp)"
+            )
+
+
+def create_schema(connection: Connection) -> None:
+    """
+    Create missing tables and bring the indexes of an existing database up to date.
+
+    `create_all` only creates indexes together with a new table, so indexes added to the model later
+    are created here explicitly. Safe to run repeatedly.
+    """
+    Base.metadata.create_all(bind=connection)
+    # Tables from before `log_texts` get their `command_id` column here, which a new index may cover.
+    intern_log_tables(connection)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+    index_partition_commands(connection)
+    for name in OBSOLETE_INDEXES:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    if connection.dialect.name == "sqlite" and not inspect(connection).has_table("logs_fts"):
+        # Databases created before full-text search or before `log_texts`: build the index
+        # from the existing rows.
+        for statement in LOGS_FTS_DDL:
+            connection.exec_driver_sql(statement)
+        fill_fts(connection, "logs")
+
+
+def init_schema(bind: Engine) -> None:
+    """Run `create_schema` in one transaction."""
+    with bind.begin() as connection:
+        create_schema(connection)
+
+
+async def init_async_schema(engine: AsyncEngine) -> None:
+    """`init_schema` over an async engine, as run when the api starts."""
+    async with engine.begin() as connection:
+        await connection.run_sync(create_schema)
+
+
+class ReadRouter:
+    """
+    Picks the database that a read endpoint queries.
+
+    Reads go to the replicas in turn. A user whose logs were written less than `pin_seconds` ago is
+    pinned to the primary, so reading the logs of that user right after a write sees the write even
+    while the replicas lag behind.
+    """
+
+    def __init__(
+            self,
+            primary: Callable[[], AsyncSession],
+            replicas: Sequence[Callable[[], AsyncSession]],
+            pin_seconds: float
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas
+        self.pin_seconds = pin_seconds
+        self._replicas = cycle(replicas)
+        # user_id -> monotonic time until which reads of that user go to the primary, oldest first.
+        self._pins: "OrderedDict[int, float]" = OrderedDict()
+
+    def pin(self, user_ids: Iterable[int]) -> None:
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        for user_id in user_ids:
+            self._pins[user_id] = now + self.pin_seconds
+            self._pins.move_to_end(user_id)
+        while self._pins and next(iter(self._pins.values())) <= now:
+            self._pins.popitem(last=False)
+
+    def is_pinned(self, user_id: int) -> bool:
+        return self._pins.get(user_id, 0.0) > time.monotonic()
+
+    def session_factory(self, user_id: Optional[int] = None) -> Callable[[], AsyncSession]:
+        if not self.replicas or (user_id is not None and self.is_pinned(user_id)):
+            return self.primary
+        return next(self._replicas)
+
+
+read_router = ReadRouter(AsyncSessionLocal, ReadSessionLocals, READ_YOUR_WRITES_SECONDS)
+
+
+def get_read_router() -> ReadRouter:
+    return read_router
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session on the primary database, for endpoints that write."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_read_db(reads: ReadRouter = Depends(get_read_router)) -> AsyncGenerator[AsyncSession, None]:
+    """Session on a replica, for read endpoints that are not limited to one user."""
+    async with reads.session_factory()() as db:
+        yield db
+
+
+async def get_user_read_db(
+        user_id: int,
+        reads: ReadRouter = Depends(get_read_router)
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for reading the logs of `user_id`: a replica, or the primary right after a write of that user."""
+    async with reads.session_factory(user_id)() as db:
+        yield db
+
+
+def get_session_factory() -> Callable[[], AsyncSession]:
+    """
+    Dependency for endpoints that must open their own session, such as streaming responses,
+    which keep reading after the request's dependencies have been closed.
+    """
+    return AsyncSessionLocal
+
+
+def get_read_session_factory(
+        user_id: Optional[int] = None,
+        reads: ReadRouter = Depends(get_read_router)
+) -> Callable[[], AsyncSession]:
+    """Like `get_session_factory`, for streaming reads; routed like `get_user_read_db` when `user_id` is given."""
+    return reads.session_factory(user_id)
@@ -0,0 +1,211 @@
+import re
+from datetime import datetime, timedelta
+from typing import Any, List, NamedTuple, Optional
+
+from sqlalchemy import (  # type: ignore[attr-defined]
+    Column,
+    Connection,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    Table,
+    TableClause,
+    and_,
+    column,
+    delete,
+    func,
+    inspect,
+    select,
+    table,
+    union_all
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from api.models import Log, LogRollup, fts_ddl
+from api.routers.utils import logs_fts, match_logs
+
+PARTITION_PATTERN = re.compile(r"logs_(\d{4})_(\d{2})")
+
+# Closed partitions are created on demand and never part of `Base.metadata`.
+partition_metadata = MetaData()
+
+
+def month_start(timestamp: datetime) -> datetime:
+    return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(month: datetime) -> datetime:
+    return month_start(month + timedelta(days=32))
+
+
+class Partition(NamedTuple):
+    """One closed month of logs, stored in its own `logs_YYYY_MM` table."""
+    name: str
+    start: datetime
+    end: datetime
+
+    @classmethod
+    def for_month(cls, month: datetime) -> "Partition":
+        start = month_start(month)
+        return cls(f"logs_{start:%Y_%m}", start, next_month(start))
+
+    @classmethod
+    def from_name(cls, name: str) -> Optional["Partition"]:
+        match = PARTITION_PATTERN.fullmatch(name)
+        return cls.for_month(datetime(int(match[1]), int(match[2]), 1)) if match else None
+
+    @classmethod
+    def named(cls, name: str) -> "Partition":
+        """Like `from_name`, for a name known to belong to a partition, such as one listed by the database."""
+        partition = cls.from_name(name)
+        if partition is None:
+            raise ValueError(f"Not a log partition: {name}")
+        return partition
+
+    @property
+    def table(self) -> Table:
+        existing = partition_metadata.tables.get(self.name)
+        if existing is not None:
+            return existing
+        return Table(
+            self.name,
+            partition_metadata,
+            Column("id", Integer, primary_key=True),
+            Column("user_id", Integer),
+            Column("command_id", Integer),
+            Column("timestamp", DateTime),
+            Column("response_id", Integer),
+            Index(f"ix_{self.name}_user_id_timestamp", "user_id", "timestamp"),
+            Index(f"ix_{self.name}_command_id_timestamp", "command_id", "timestamp"),
+            Index(f"ix_{self.name}_timestamp", "timestamp"),
+        )
+
+    @property
+    def fts(self) -> TableClause:
+        return table(f"{self.name}_fts", column("rowid"), column("rank"))
+
+
+def list_partitions(
+        connection: Connection,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+) -> List[Partition]:
+    """Closed partitions, oldest first, skipping the ones entirely outside `start_date`..`end_date`."""
+    partitions = []
+    for name in inspect(connection).get_table_names():
+        partition = Partition.from_name(name)
+        if partition is None:
+            continue
+        if start_date and partition.end <= start_date:
+            continue
+        if end_date and partition.start > end_date:
+            continue
+        partitions.append(partition)
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+async def read_partitions(
+        db: AsyncSession,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+) -> List[Partition]:
+    return await db.run_sync(lambda session: list_partitions(session.connection(), start_date, end_date))
+
+
+def log_source(partitions: List[Partition], search: str, dialect: str) -> Any:
+    """
+    Entity to read logs from: `Log` itself, or an alias of `Log` over a UNION ALL of `partitions`
+    and the hot `logs` table.
+
+    Filters and ordering applied to the alias are pushed down into every branch, so each table is
+    read through its own indexes. With `search`, each branch is matched against its own full-text
+    index and carries a `rank` column that `search_logs` orders by.
+    """
+    if not partitions:
+        return Log
+    sources = [(partition.table, partition.fts) for partition in partitions] + [(Log.__table__, logs_fts)]
+    branches = []
+    for source, fts in sources:
+        branch = select(*source.c)
+        if search:
+            branch = match_logs(branch, search, dialect, source, fts)
+            if dialect == "sqlite":
+                branch = branch.add_columns(fts.c.rank)  # type: ignore[attr-defined]
+        branches.append(branch)
+    return aliased(Log, union_all(*branches).subquery("logs"))  # type: ignore[attr-defined]
+
+
+def create_partition(connection: Connection, partition: Partition) -> None:
+    partition.table.create(connection, checkfirst=True)
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(fts_ddl(partition.name))
+
+
+def rotate_partitions(connection: Connection, now: datetime) -> List[str]:
+    """
+    Move logs of closed months out of the hot `logs` table into their monthly partitions.
+
+    Writes always go to `logs`; this keeps it down to the current month, so its indexes stay small.
+    The newest row is left in place, because SQLite hands out `max(id) + 1` as the next id and ids
+    must stay unique across partitions. Returns the names of the partitions that received rows.
+    """
+    boundary = month_start(now)
+    max_id = connection.scalar(select(func.max(Log.id)))
+    if max_id is None:
+        return []
+    oldest = connection.scalar(
+        select(func.min(Log.timestamp)).where(Log.timestamp < boundary, Log.id < max_id)  # type: ignore[call-arg]
+    )
+    if oldest is None:
+        return []
+
+    rotated = []
+    month = month_start(oldest)
+    while month < boundary:
+        partition = Partition.for_month(month)
+        moved = and_(Log.timestamp >= partition.start, Log.timestamp < partition.end, Log.id < max_id)
+        if connection.scalar(select(Log.id).where(moved).limit(1)) is not None:  # type: ignore[arg-type]
+            create_partition(connection, partition)
+            rows = select(*Log.__table__.c).where(moved)
+            connection.execute(partition.table.insert().from_select(Log.__table__.c.keys(), rows))
+            if connection.dialect.name == "sqlite":
+                fts = table(partition.fts.name, column("rowid"), column("command"), column("response"))
+                connection.execute(fts.insert().from_select(
+                    ["rowid", "command", "response"],
+                    select(Log.id, Log.command, Log.response).where(moved)  # type: ignore[arg-type]
+                ))
+            connection.execute(delete(Log.__table__).where(moved))
+            rotated.append(partition.name)
+        month = partition.end
+    return rotated
+
+
+def drop_partition(connection: Connection, partition: Partition) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {partition.fts.name}")
+    partition.table.drop(connection, checkfirst=True)
+    partition_metadata.remove(partition.table)
+
+
+def drop_rollups(connection: Connection, partitions: List[str]) -> None:
+    """Remove the rollup counters of the dropped `partitions` and of every month before them."""
+    if partitions:
+        end = max(Partition.named(name).end for name in partitions)
+        connection.execute(delete(LogRollup.__table__).where(LogRollup.bucket < end))
+
+
+def drop_expired_partitions(connection: Connection, now: datetime, retention_days: int) -> List[str]:
+    """
+    Drop every partition whose month ended more than `retention_days` ago.
+
+    A partition goes away with one `DROP TABLE`, whatever its size. Rollup counters of the dropped
+    months are removed too, so `/logs/stats` keeps matching the stored logs.
+    """
+    cutoff = now - timedelta(days=retention_days)
+    expired = [partition.name for partition in list_partitions(connection) if partition.end <= cutoff]
+    for name in expired:
+        drop_partition(connection, Partition.named(name))
+    drop_rollups(connection, expired)
+    return expired
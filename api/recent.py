@@ -0,0 +1,224 @@
+import hashlib
+import os
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import Log
+from api.routers.utils import Validator, log_columns
+from api.schemas import RecentLogsStats
+
+LOG_RECENT_ENABLED: bool = os.getenv("LOG_RECENT_ENABLED", "false").lower() == "true"
+LOG_RECENT_SIZE: int = int(os.getenv("LOG_RECENT_SIZE", "10000"))
+
+# Position of a log in the `(timestamp, id)` order of every page.
+Position = Tuple[datetime, int]
+
+
+class RecentLog(NamedTuple):
+    id: int
+    user_id: int
+    command: str
+    timestamp: datetime
+    response: str
+
+
+def log_position(log: RecentLog) -> Position:
+    return log.timestamp, log.id
+
+
+def naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Drop the time zone the way the database comparison does, so both see the same wall-clock time."""
+    return value.replace(tzinfo=None) if value is not None else None
+
+
+class RecentLogs:
+    """
+    Bounded in-process buffer of the newest logs, with one queue per user, in `(timestamp, id)` order.
+
+    Holds every log at or after the position of its oldest entry, the floor: it is primed with the newest
+    rows of `logs` and then fed with each log this process commits, so the oldest entries are evicted
+    once `size` is reached. A page can be answered from the buffer only when the page cannot reach below
+    the floor: an oldest-first page that starts after a cursor at or past the floor or at a `start_date`
+    later than the floor, or a newest-first page that fills up before the floor; anything else is a miss
+    and is read from the database. Correct only while this process writes every
+    log, like the invalidation of `api.cache`.
+    """
+
+    def __init__(self, size: int, enabled: bool = True) -> None:
+        self.size = size
+        self.enabled = enabled
+        self.ready = False
+        self.hits = 0
+        self.misses = 0
+        self._logs: Deque[RecentLog] = deque()
+        self._user_logs: Dict[int, Deque[RecentLog]] = {}
+
+    @property
+    def floor(self) -> Optional[Position]:
+        return log_position(self._logs[0]) if self._logs else None
+
+    async def prime(self, session_factory: Callable[[], AsyncSession]) -> None:
+        """Load the newest `size` rows of `logs`; until then the buffer ignores writes and answers nothing."""
+        query = select(*log_columns(Log)).order_by(Log.timestamp.desc(), Log.id.desc()).limit(self.size)
+        async with session_factory() as db:
+            rows = (await db.execute(query)).all()
+        self.load(RecentLog(*row) for row in reversed(rows))
+
+    def load(self, logs: Iterable[RecentLog]) -> None:
+        """Replace the contents with `logs`, the newest logs in storage, oldest first."""
+        self._logs.clear()
+        self._user_logs.clear()
+        self.ready = True
+        for log in logs:
+            self._insert(log)
+        while len(self._logs) > self.size:
+            self._evict()
+
+    def add(self, logs: Iterable[Mapping[str, Any]]) -> None:
+        """Add committed logs, given as mappings with the fields of `LogResponse`."""
+        if not self.ready:
+            return
+        for log in logs:
+            entry = RecentLog(log["id"], log["user_id"], log["command"], log["timestamp"], log["response"])
+            floor = self.floor
+            # Older than the floor means it is outside every page the buffer answers.
+            if floor is not None and log_position(entry) < floor:
+                continue
+            self._insert(entry)
+            if len(self._logs) > self.size:
+                self._evict()
+
+    def discard_before(self, timestamp: datetime) -> None:
+        """Forget logs older than `timestamp`, e.g. after retention dropped them from the database."""
+        while self._logs and self._logs[0].timestamp < timestamp:
+            self._evict()
+
+    def page(
+            self,
+            user_id: Optional[int],
+            start_date: Optional[datetime],
+            end_date: Optional[datetime],
+            cursor: Optional[Position],
+            skip: int,
+            limit: int,
+            descending: bool = False
+    ) -> Optional[List[RecentLog]]:
+        """
+        The page `paginate_logs` would read from the database, or None if the buffer cannot tell.
+        """
+        start_date, end_date = naive(start_date), naive(end_date)
+        floor = self.floor
+        page = None
+        if floor is not None and skip >= 0 and limit > 0:
+            logs = self._logs if user_id is None else self._user_logs.get(user_id, deque())
+            read = self._newest_first if descending else self._oldest_first
+            page = read(logs, floor, start_date, end_date, cursor, skip, limit)
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return page
+
+    @staticmethod
+    def _oldest_first(
+            logs: Deque[RecentLog],
+            floor: Position,
+            start_date: Optional[datetime],
+            end_date: Optional[datetime],
+            cursor: Optional[Position],
+            skip: int,
+            limit: int
+    ) -> Optional[List[RecentLog]]:
+        if not ((cursor is not None and cursor >= floor) or (start_date is not None and start_date > floor[0])):
+            return None
+        start = 0
+        if cursor is not None:
+            start = bisect_right(logs, cursor, key=log_position)
+        if start_date is not None:
+            start = max(start, bisect_left(logs, start_date, key=lambda log: log.timestamp))
+        page: List[RecentLog] = []
+        for log in islice(logs, start + skip, None):
+            if len(page) == limit or (end_date is not None and log.timestamp > end_date):
+                break
+            page.append(log)
+        return page
+
+    @staticmethod
+    def _newest_first(
+            logs: Deque[RecentLog],
+            floor: Position,
+            start_date: Optional[datetime],
+            end_date: Optional[datetime],
+            cursor: Optional[Position],
+            skip: int,
+            limit: int
+    ) -> Optional[List[RecentLog]]:
+        # Walks back from the tail, so the page is answered when it fills up inside the buffer or
+        # stops at a `start_date` later than the floor.
+        stop = len(logs)
+        if cursor is not None:
+            stop = bisect_left(logs, cursor, key=log_position)
+        if end_date is not None:
+            stop = min(stop, bisect_right(logs, end_date, key=lambda log: log.timestamp))
+        start = 0
+        if start_date is not None:
+            start = bisect_left(logs, start_date, key=lambda log: log.timestamp)
+        if stop - start < skip + limit and not (start_date is not None and start_date > floor[0]):
+            return None
+        end = stop - skip
+        return list(reversed(list(islice(logs, max(start, end - limit), end)))) if end > start else []
+
+    def stats(self) -> RecentLogsStats:
+        requests = self.hits + self.misses
+        return RecentLogsStats(
+            enabled=self.enabled,
+            entries=len(self._logs),
+            users=len(self._user_logs),
+            max_entries=self.size,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / requests if requests else 0.0
+        )
+
+    def _insert(self, log: RecentLog) -> None:
+        for logs in (self._logs, self._user_logs.setdefault(log.user_id, deque())):
+            if not logs or log_position(logs[-1]) < log_position(log):
+                logs.append(log)
+            else:
+                insort(logs, log, key=log_position)
+
+    def _evict(self) -> None:
+        oldest = self._logs.popleft()
+        user_logs = self._user_logs[oldest.user_id]
+        user_logs.popleft()
+        if not user_logs:
+            del self._user_logs[oldest.user_id]
+
+
+def recent_validator(params: Tuple[Hashable, ...], logs: List[RecentLog]) -> Validator:
+    """
+    `ETag`/`Last-Modified` pair for a page answered from the buffer.
+
+    Unlike `read_validator` it only sees the page itself, so it covers the ids on the page; logs never
+    change once written, so the same ids mean the same body.
+    """
+    digest = hashlib.sha1(repr(("recent", params, [log.id for log in logs])).encode()).hexdigest()[:20]
+    last_modified = None
+    if logs:
+        newest = max(log.timestamp for log in logs)
+        last_modified = format_datetime(newest.replace(tzinfo=timezone.utc), usegmt=True)
+    return Validator(f'W/"{digest}"', last_modified)
+
+
+recent_logs = RecentLogs(size=LOG_RECENT_SIZE, enabled=LOG_RECENT_ENABLED)
+
+
+def get_recent_logs() -> RecentLogs:
+    return recent_logs
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import sys
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from dotenv import load_dotenv
+
+if __name__ == "__main__":
+    # Run as a command rather than imported by the api: take the database settings from `.env`.
+    load_dotenv()
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+
+from api.archive import LogArchive, log_archive, read_live_prefixes
+from api.models import AsyncSessionLocal, LogRollup, upsert_dialect
+from api.partitions import log_source, read_partitions
+
+GRANULARITIES = ("hour", "day")
+DIMENSIONS = ("total", "command", "user")
+REBUILD_CHUNK_SIZE = 10000
+
+RollupKey = Tuple[str, str, datetime, str]
+
+
+def command_name(command: str) -> str:
+    """Reduce a command to its name, e.g. `/weather Moscow` -> `/weather`; plain text maps to ``."""
+    name = command.split(maxsplit=1)[0] if command.strip() else ""
+    return name if name.startswith("/") else ""
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def count_rollups(logs: Iterable[Mapping[str, Any]], counts: "Counter[RollupKey]") -> None:
+    for log in logs:
+        keys = {"total": "", "command": command_name(log["command"]), "user": str(log["user_id"])}
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(log["timestamp"], granularity)
+            for dimension in DIMENSIONS:
+                counts[(granularity, dimension, bucket, keys[dimension])] += 1
+
+
+def rollup_rows(counts: "Counter[RollupKey]") -> List[Dict[str, Any]]:
+    return [
+        {"granularity": granularity, "dimension": dimension, "bucket": bucket, "key": key, "count": count}
+        for (granularity, dimension, bucket, key), count in counts.items()
+    ]
+
+
+async def update_rollups(db: AsyncSession, logs: Iterable[Mapping[str, Any]]) -> None:
+    """
+    Add new logs to the rollup counters inside the caller's transaction.
+
+    Each log touches one counter per granularity and dimension; counters are incremented with an
+    upsert, so the cost does not depend on the number of logs already stored.
+    """
+    counts: Counter[RollupKey] = Counter()
+    count_rollups(logs, counts)
+    if not counts:
+        return
+    dialect = upsert_dialect(db.bind.dialect.name)
+    statement = dialect.insert(LogRollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=[LogRollup.granularity, LogRollup.dimension, LogRollup.bucket, LogRollup.key],
+        set_={"count": LogRollup.count + statement.excluded.count}
+    )
+    await db.execute(statement, rollup_rows(counts))
+
+
+async def rebuild_rollups(db: AsyncSession, archive: LogArchive = log_archive) -> int:
+    """
+    Recompute every rollup counter from the `logs` table, its partitions and the archive.
+    Returns the number of logs counted.
+    """
+    counts: Counter[RollupKey] = Counter()
+    total = 0
+    partitions = await read_partitions(db)
+    segments = archive.matching(await read_live_prefixes(db, archive, partitions), None, None, None)
+    archived = archive.iter_rows(segments, None, None, None, None)
+    while chunk := await asyncio.to_thread(list, islice(archived, REBUILD_CHUNK_SIZE)):
+        count_rollups((log._asdict() for log in chunk), counts)
+        total += len(chunk)
+
+    source = log_source(partitions, "", db.bind.dialect.name)
+    query = select(source.user_id, source.command, source.timestamp).execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    result: AsyncResult[Any] = await db.stream(query)
+    async for rows in result.partitions():
+        count_rollups((row._mapping for row in rows), counts)
+        total += len(rows)
+    await db.execute(delete(LogRollup.__table__))
+    rollups = rollup_rows(counts)
+    for start in range(0, len(rollups), REBUILD_CHUNK_SIZE):
+        await db.execute(LogRollup.__table__.insert(), rollups[start:start + REBUILD_CHUNK_SIZE])
+    await db.commit()
+    return total
+
+
+async def main() -> None:
+    async with AsyncSessionLocal() as db:
+        total = await rebuild_rollups(db)
+    logging.info("Rebuilt log rollups from %d logs", total)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    asyncio.run(main())
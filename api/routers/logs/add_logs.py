@@ -1,16 +1,32 @@
 from datetime import datetime
+from typing import Union
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import get_db, Log
-from api.schemas import LogResponse, LogCreate
+from api.broadcast import LogBroadcaster, get_log_broadcaster
+from api.cache import LogCache, get_log_cache
+from api.ingest import IngestBuffer, announce_logs, get_ingest_buffer
+from api.metrics import MetricsRoute
+from api.models import get_db, get_read_router, Log, ReadRouter
+from api.recent import RecentLogs, get_recent_logs
+from api.rollups import update_rollups
+from api.schemas import LogAccepted, LogResponse, LogCreate
 
-router = APIRouter(prefix="/logs", tags=["logs"])
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
 
 
-@router.post("/", response_model=LogResponse)
-async def add_logs(log: LogCreate, db: Session = Depends(get_db)) -> LogResponse:
+@router.post("/", response_model=LogResponse, responses={202: {"model": LogAccepted}, 429: {}})
+async def add_logs(
+        log: LogCreate,
+        db: AsyncSession = Depends(get_db),
+        buffer: IngestBuffer = Depends(get_ingest_buffer),
+        cache: LogCache = Depends(get_log_cache),
+        broadcaster: LogBroadcaster = Depends(get_log_broadcaster),
+        reads: ReadRouter = Depends(get_read_router),
+        recent: RecentLogs = Depends(get_recent_logs)
+) -> Union[LogResponse, JSONResponse]:
     """
        Create a new log entry.
 
@@ -31,6 +47,9 @@ async def add_logs(log: LogCreate, db: Session = Depends(get_db)) -> LogResponse
 
        **Database Operations:**
          - Adds the new log entry to the database with the current UTC time as `timestamp`.
+         - Increments the hourly and daily rollup counters in the same transaction.
+         - With `LOG_INGEST_MODE=buffered` the entry is queued instead and written later by a background
+           group commit.
 
        **Response:**
          - Returns the created log entry as a JSON object.
@@ -44,7 +63,20 @@ async def add_logs(log: LogCreate, db: Session = Depends(get_db)) -> LogResponse
                  "timestamp": "2024-04-27T12:34:56Z"
              }
              ```
+         - In buffered mode returns 202 with the current queue depth, or 429 if the queue is full.
        """
+    if buffer.enabled:
+        accepted = buffer.put({
+            "user_id": log.user_id,
+            "command": log.command,
+            "timestamp": datetime.utcnow(),
+            "response": log.response
+        })
+        if not accepted:
+            raise HTTPException(status_code=429, detail="Too Many Requests")
+        content = LogAccepted(detail="Accepted", queue_depth=buffer.queue.qsize())
+        return JSONResponse(status_code=202, content=content.model_dump())
+
     log_entry = Log(
         user_id=log.user_id,
         command=log.command,
@@ -53,9 +85,16 @@ async def add_logs(log: LogCreate, db: Session = Depends(get_db)) -> LogResponse
     )
     try:
         db.add(log_entry)
-        db.commit()
-        db.refresh(log_entry)
-        return LogResponse.model_validate(log_entry)
+        await update_rollups(db, [{
+            "user_id": log_entry.user_id,
+            "command": log_entry.command,
+            "timestamp": log_entry.timestamp
+        }])
+        await db.commit()
+        await db.refresh(log_entry)
+        created = LogResponse.model_validate(log_entry)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
+    await announce_logs([created.model_dump()], reads, cache, recent, broadcaster)
+    return created
@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.broadcast import LogBroadcaster, get_log_broadcaster
+from api.cache import LogCache, get_log_cache
+from api.ingest import announce_logs
+from api.metrics import MetricsRoute
+from api.models import get_db, get_read_router, insert_log_rows, ReadRouter
+from api.recent import RecentLogs, get_recent_logs
+from api.rollups import update_rollups
+from api.schemas import LogBatchError, LogBatchResponse, LogCreate
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+MAX_BATCH_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def parse_batch(body: bytes, content_type: str) -> List[Tuple[int, Any, str]]:
+    """
+    Split a request body into `(index, item, error)` triples.
+
+    A JSON body must be an array of objects. An NDJSON body holds one object per line;
+    a line that is not valid JSON becomes an item error instead of failing the whole batch.
+    """
+    if content_type.startswith(NDJSON_MEDIA_TYPE):
+        items: List[Tuple[int, Any, str]] = []
+        lines = [line for line in body.splitlines() if line.strip()]
+        for index, line in enumerate(lines):
+            try:
+                items.append((index, json.loads(line), ""))
+            except ValueError:
+                items.append((index, None, "Invalid JSON"))
+        return items
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid JSON")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=422, detail="Expected a JSON array of log entries")
+    return [(index, item, "") for index, item in enumerate(payload)]
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+@router.post("/batch", response_model=LogBatchResponse)
+async def add_logs_batch(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        cache: LogCache = Depends(get_log_cache),
+        broadcaster: LogBroadcaster = Depends(get_log_broadcaster),
+        reads: ReadRouter = Depends(get_read_router),
+        recent: RecentLogs = Depends(get_recent_logs)
+) -> LogBatchResponse:
+    """
+    Create many log entries at once.
+
+    This endpoint accepts a batch of log entries and inserts every valid one with a single multi-row
+    `INSERT` inside one transaction. Invalid items are reported back instead of failing the batch.
+
+    **Request:**
+      - **Method:** POST
+      - **URL:** /logs/batch
+      - **Body:** JSON array of objects with `user_id`, `command`, and `response` fields,
+        or NDJSON (one object per line) when sent with `Content-Type: application/x-ndjson`.
+        At most 1000 items are accepted per request.
+        - **Example:**
+          ```json
+          [
+              {"user_id": 123, "command": "/start", "response": "This bot was created as a test for the BobrAi company."},
+              {"user_id": 456, "command": "/weather", "response": "City not specified"}
+          ]
+          ```
+
+    **Database Operations:**
+      - Inserts all valid entries with one statement, using the current UTC time as `timestamp`.
+      - Increments the hourly and daily rollup counters in the same transaction.
+      - Commits once for the whole batch.
+
+    **Response:**
+      - Returns the ids assigned to the inserted entries in submission order and the rejected items.
+        - **Example:**
+          ```json
+          {
+              "ids": [1, 2],
+              "errors": [{"index": 2, "error": "response: Field required"}]
+          }
+          ```
+      - Returns 413 if the batch holds more than 1000 items.
+    """
+    items = parse_batch(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE} items")
+
+    timestamp = datetime.utcnow()
+    rows: List[Dict[str, Any]] = []
+    errors: List[LogBatchError] = []
+    for index, item, error in items:
+        if error:
+            errors.append(LogBatchError(index=index, error=error))
+            continue
+        try:
+            log = LogCreate.model_validate(item)
+        except ValidationError as e:
+            errors.append(LogBatchError(index=index, error=format_validation_error(e)))
+            continue
+        rows.append({
+            "user_id": log.user_id,
+            "command": log.command,
+            "timestamp": timestamp,
+            "response": log.response
+        })
+
+    if not rows:
+        return LogBatchResponse(ids=[], errors=errors)
+
+    try:
+        ids = await insert_log_rows(db, rows)
+        await update_rollups(db, rows)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    await announce_logs([{"id": log_id, **row} for log_id, row in zip(ids, rows)], reads, cache, recent, broadcaster)
+    return LogBatchResponse(ids=ids, errors=errors)
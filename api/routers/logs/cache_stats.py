@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+
+from api.cache import LogCache, get_log_cache
+from api.metrics import MetricsRoute
+from api.schemas import CacheStats
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+
+@router.get("/cache/stats", response_model=CacheStats)
+async def read_cache_stats(cache: LogCache = Depends(get_log_cache)) -> CacheStats:
+    """
+    Retrieve metrics of the `/logs/{user_id}` page cache.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /logs/cache/stats
+
+    **Response:**
+      - Returns the number and total size of cached pages, their limits and the hit, miss, eviction,
+        expiration and invalidation counters.
+        - **Example:**
+          ```json
+          {
+              "enabled": true,
+              "entries": 312,
+              "bytes": 804352,
+              "max_entries": 10000,
+              "max_bytes": 67108864,
+              "hits": 9120,
+              "misses": 1480,
+              "evictions": 0,
+              "expirations": 1150,
+              "invalidations": 96
+          }
+          ```
+    """
+    return cache.stats()
@@ -0,0 +1,166 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Literal, Optional, Sequence, Tuple, Union
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, Select, select  # type: ignore[attr-defined]
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.archive import ArchivedLog, LogArchive, get_log_archive, read_live_prefixes
+from api.metrics import MetricsRoute
+from api.models import get_read_session_factory
+from api.partitions import log_source, read_partitions
+from api.routers.utils import filter_logs, log_columns
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_COLUMNS = ("id", "user_id", "command", "timestamp", "response")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def encode_ndjson(rows: Sequence[Union[Row, ArchivedLog]]) -> str:
+    return "".join(
+        json.dumps({
+            "id": row.id,
+            "user_id": row.user_id,
+            "command": row.command,
+            "timestamp": row.timestamp.isoformat(),
+            "response": row.response
+        }) + "\n"
+        for row in rows
+    )
+
+
+def encode_csv(rows: Sequence[Union[Row, ArchivedLog]]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows((row.id, row.user_id, row.command, row.timestamp.isoformat(), row.response) for row in rows)
+    return buffer.getvalue()
+
+
+def csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue()
+
+
+async def export_query(
+        db: AsyncSession,
+        archive: LogArchive,
+        user_id: Optional[int],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+) -> Tuple[Iterator[ArchivedLog], Select]:
+    """Archived logs matching the filters, followed by the query for the ones still in the database."""
+    partitions = await read_partitions(db, start_date, end_date)
+    source = log_source(partitions, "", db.bind.dialect.name)
+    query = select(*log_columns(source))
+    if user_id is not None:
+        query = query.where(source.user_id == user_id)
+    query = filter_logs(query, start_date, end_date, source).order_by(source.timestamp, source.id)
+    segments = archive.matching(await read_live_prefixes(db, archive, partitions), user_id, start_date, end_date)
+    return archive.iter_rows(segments, user_id, start_date, end_date, None), query
+
+
+async def stream_rows(
+        session_factory: Callable[[], AsyncSession],
+        make_query: Callable[[AsyncSession], Awaitable[Tuple[Iterator[ArchivedLog], Select]]],
+        format: str,
+        compress: bool
+) -> AsyncIterator[bytes]:
+    """
+    Yield the encoded export one fetched chunk at a time.
+
+    Rows are read with `yield_per`, so at most `EXPORT_CHUNK_SIZE` rows are held in memory.
+    """
+    encode = encode_csv if format == "csv" else encode_ndjson
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def pack(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    try:
+        async with session_factory() as db:
+            if format == "csv":
+                yield pack(csv_header())
+            archived, query = await make_query(db)
+            while chunk := await asyncio.to_thread(list, islice(archived, EXPORT_CHUNK_SIZE)):
+                yield pack(encode(chunk))
+            result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            async for rows in result.partitions():
+                yield pack(encode(rows))
+    except Exception:
+        logging.exception("Log export failed")
+        raise
+    if compressor:
+        yield compressor.flush()
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_logs(
+        format: Literal["ndjson", "csv"] = "ndjson",
+        user_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        compress: bool = False,
+        session_factory: Callable[[], AsyncSession] = Depends(get_read_session_factory),
+        archive: LogArchive = Depends(get_log_archive)
+) -> StreamingResponse:
+    """
+    Export log entries as a stream.
+
+    This endpoint streams every log entry that matches the filters as NDJSON or CSV. Rows are fetched
+    from the database in chunks and written out as they arrive, so memory use does not depend on the
+    size of the result.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /logs/export
+      - **Query Parameters:**
+        - **format** (`ndjson` or `csv`, optional, default=`ndjson`): Output format.
+        - **user_id** (integer, optional): Export only the logs of this user.
+        - **start_date** (ISO 8601 datetime, optional): Filter logs created after this date and time.
+        - **end_date** (ISO 8601 datetime, optional): Filter logs created before this date and time.
+        - **compress** (boolean, optional, default=false): Return a gzip file instead of plain text.
+      - **Example:**
+        ```
+        GET /logs/export?format=csv&start_date=2024-04-27T00:00:00Z&end_date=2024-04-28T00:00:00Z&compress=true
+        ```
+
+    **Database Operations:**
+      - Queries the `logs` table and the monthly partitions overlapping the date range, optionally
+        filtering by `user_id`, `start_date` and `end_date`.
+      - Streams the matching archived logs first, opening only the segments whose sidecar index matches.
+      - Orders logs by `timestamp` and `id` and reads them 1000 rows at a time.
+      - Runs on a read replica when `DATABASE_READ_URLS` is configured; with `user_id`, on the primary
+        for `READ_YOUR_WRITES_SECONDS` after a log of that user was written.
+
+    **Response:**
+      - NDJSON: one JSON object per line with the same fields as `GET /logs/`.
+        - **Example:**
+          ```
+          {"id": 1, "user_id": 123, "command": "/start", "timestamp": "2024-04-27T12:34:56", "response": "This bot was created as a test for the BobrAi company."}
+          ```
+      - CSV: a header row `id,user_id,command,timestamp,response` followed by one row per log entry.
+    """
+    make_query = partial(export_query, archive=archive, user_id=user_id, start_date=start_date, end_date=end_date)
+    filename = f"logs.{format}"
+    media_type = MEDIA_TYPES[format]
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        stream_rows(session_factory, make_query, format, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
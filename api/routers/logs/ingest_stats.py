@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+
+from api.ingest import IngestBuffer, get_ingest_buffer
+from api.metrics import MetricsRoute
+from api.schemas import IngestStats
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+
+@router.get("/ingest/stats", response_model=IngestStats)
+async def read_ingest_stats(buffer: IngestBuffer = Depends(get_ingest_buffer)) -> IngestStats:
+    """
+    Retrieve write-behind buffer metrics.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /logs/ingest/stats
+
+    **Response:**
+      - Returns the current queue depth and capacity, accepted/rejected/flushed counters and
+        group commit latency (last, max and average, in seconds).
+        - **Example:**
+          ```json
+          {
+              "enabled": true,
+              "queue_depth": 12,
+              "queue_capacity": 10000,
+              "accepted": 5120,
+              "rejected": 0,
+              "flushed_rows": 5108,
+              "failed_rows": 0,
+              "flushes": 37,
+              "flush_seconds_last": 0.004,
+              "flush_seconds_max": 0.019,
+              "flush_seconds_avg": 0.006
+          }
+          ```
+    """
+    return buffer.stats()
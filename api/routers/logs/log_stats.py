@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.metrics import MetricsRoute
+from api.models import get_read_db, LogRollup
+from api.rollups import bucket_start
+from api.schemas import LogStat
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+
+@router.get("/stats", response_model=List[LogStat])
+async def read_log_stats(
+        group_by: Literal["total", "command", "user"] = "command",
+        granularity: Literal["hour", "day"] = "day",
+        per_bucket: bool = False,
+        key: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 100,
+        db: AsyncSession = Depends(get_read_db)
+) -> List[LogStat]:
+    """
+    Retrieve aggregated log counts.
+
+    This endpoint answers count queries from rollup tables that are updated together with every write,
+    so its cost depends on the number of buckets and keys requested, not on the number of stored logs.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /logs/stats
+      - **Query Parameters:**
+        - **group_by** (`total`, `command` or `user`, optional, default=`command`): Dimension to count by.
+          Commands are grouped by name (`/weather Moscow` counts as `/weather`); plain text counts under `""`.
+        - **granularity** (`hour` or `day`, optional, default=`day`): Bucket size.
+        - **per_bucket** (boolean, optional, default=false): Return one row per bucket and key instead of
+          totals per key over the whole range.
+        - **key** (string, optional): Only count this command name or user id.
+        - **start_date** (ISO 8601 datetime, optional): Count buckets from the one containing this time.
+        - **end_date** (ISO 8601 datetime, optional): Count buckets starting at or before this time.
+        - **limit** (integer, optional, default=100): Maximum number of rows to return.
+      - **Example:**
+        ```
+        GET /logs/stats?group_by=command&granularity=day&start_date=2024-04-01T00:00:00Z
+        ```
+
+    **Database Operations:**
+      - Reads the `log_rollups` rows of the requested granularity, dimension and bucket range.
+      - Sums them per key, or returns them per bucket with `per_bucket=true`.
+      - Runs on a read replica when `DATABASE_READ_URLS` is configured.
+
+    **Response:**
+      - Totals are ordered by count, highest first; per-bucket rows by bucket and key.
+        - **Example:**
+          ```json
+          [
+              {"key": "/weather", "bucket": null, "count": 1520},
+              {"key": "/start", "bucket": null, "count": 311}
+          ]
+          ```
+    """
+    try:
+        conditions = [LogRollup.granularity == granularity, LogRollup.dimension == group_by]
+        if key is not None:
+            conditions.append(LogRollup.key == key)
+        if start_date:
+            conditions.append(LogRollup.bucket >= bucket_start(start_date, granularity))
+        if end_date:
+            conditions.append(LogRollup.bucket <= end_date)
+
+        if per_bucket:
+            query = (
+                select(LogRollup.key, LogRollup.bucket, LogRollup.count)  # type: ignore[arg-type]
+                .where(*conditions)
+                .order_by(LogRollup.bucket, LogRollup.key)
+            )
+        else:
+            total = func.sum(LogRollup.count).label("count")
+            query = (
+                select(LogRollup.key, total)  # type: ignore[arg-type]
+                .where(*conditions)
+                .group_by(LogRollup.key)
+                .order_by(total.desc(), LogRollup.key)
+            )
+        rows = (await db.execute(query.limit(limit))).all()
+        return [
+            LogStat(key=row.key, bucket=row.bucket if per_bucket else None, count=row.count)
+            for row in rows
+        ]
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Internal Server Error")
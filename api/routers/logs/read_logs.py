@@ -1,28 +1,67 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, List, Literal, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import get_db, Log
-from api.routers.utils import filter_logs
+from api.archive import LogArchive, get_log_archive, read_archived_page, read_archived_tail, read_live_prefixes
+from api.metrics import MetricsRoute, record_rows
+from api.models import get_read_db
+from api.partitions import log_source, read_partitions
+from api.recent import RecentLogs, get_recent_logs, recent_validator
+from api.routers.utils import (
+    LOG_FAST_JSON,
+    LOG_FIELDS,
+    apply_log_filter,
+    check_log_filter,
+    count_logs,
+    decode_cursor,
+    filter_logs,
+    is_not_modified,
+    log_columns,
+    logs_json_response,
+    not_modified_response,
+    paginate_logs,
+    parse_fields,
+    parse_log_filter,
+    read_validator,
+    search_logs,
+    set_next_cursor,
+    set_query_warning,
+    set_validator
+)
 from api.schemas import LogResponse
 
-router = APIRouter(prefix="/logs", tags=["logs"])
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
 
 
 @router.get("/", response_model=List[LogResponse])
 async def read_logs(
+        response: Response,
         skip: int = 0,
         limit: int = 10,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        db: Session = Depends(get_db)
-) -> List[LogResponse]:
+        cursor: Optional[str] = None,
+        q: Optional[str] = None,
+        fields: Optional[str] = None,
+        layout: Literal["rows", "columns"] = "rows",
+        command: Optional[str] = None,
+        command_prefix: Optional[str] = None,
+        user_ids: Optional[str] = None,
+        exclude_user_ids: Optional[str] = None,
+        order: Literal["asc", "desc"] = "asc",
+        if_none_match: Optional[str] = Header(default=None),
+        if_modified_since: Optional[str] = Header(default=None),
+        db: AsyncSession = Depends(get_read_db),
+        archive: LogArchive = Depends(get_log_archive),
+        recent: RecentLogs = Depends(get_recent_logs)
+) -> Union[List[LogResponse], Response]:
     """
     Retrieve log entries.
 
-    This endpoint retrieves a list of log entries from the database. It supports pagination through `skip` and `limit` parameters and allows filtering logs within a specific date range using `start_date` and `end_date`.
+    This endpoint retrieves a list of log entries from the database. It supports pagination through `skip` and `limit` parameters and allows filtering logs within a specific date range using `start_date` and `end_date`, by command and by user.
 
     **Request:**
       - **Method:** GET
@@ -32,17 +71,55 @@ async def read_logs(
         - **limit** (integer, optional, default=10): Maximum number of records to return.
         - **start_date** (ISO 8601 datetime, optional): Filter logs created after this date and time.
         - **end_date** (ISO 8601 datetime, optional): Filter logs created before this date and time.
+        - **cursor** (string, optional): Opaque position returned in the `X-Next-Cursor` header of the previous page. Continues right after that entry and stays fast on deep pages.
+        - **q** (string, optional): Full-text search; only logs whose `command` or `response` contain every word of `q` are returned, most relevant first. Pages with `skip` and `limit`; cannot be combined with `cursor`.
+        - **fields** (string, optional): Comma-separated subset of `id`, `user_id`, `command`, `timestamp` and `response`; only these fields are returned. Unknown names are answered with 422.
+        - **layout** (string, optional, default=rows): `rows` returns a list of objects; `columns` returns one object with a list of values per field.
+        - **command** (string, optional): Only logs whose command is exactly this, e.g. `/start`.
+        - **command_prefix** (string, optional): Only logs whose command starts with this, e.g. `/weather` for every forecast request. Case-sensitive.
+        - **user_ids** (string, optional): Comma-separated user ids; only logs of these users. At most `LOG_FILTER_MAX_USERS` ids.
+        - **exclude_user_ids** (string, optional): Comma-separated user ids whose logs are left out. At most `LOG_FILTER_MAX_USERS` ids.
+        - **order** (string, optional, default=asc): `asc` returns the oldest logs first, `desc` the newest first; a `cursor` continues in the same order. Cannot be combined with `q`.
+      - **Headers:**
+        - **If-None-Match** (optional): `ETag` of a previously received page; answered with 304 if unchanged.
+        - **If-Modified-Since** (optional): HTTP date; answered with 304 if no matching log is newer.
       - **Example:**
         ```
         GET /logs/?skip=0&limit=5&start_date=2024-01-01T00:00:00Z&end_date=2024-12-31T23:59:59Z
+        GET /logs/?limit=20&command_prefix=/weather&user_ids=123,456&order=desc
         ```
 
     **Database Operations:**
-      - Queries the `logs` table, optionally filtering by `start_date` and `end_date`.
-      - Applies pagination using `skip` and `limit`.
+      - Queries the `logs` table, optionally filtering by `start_date` and `end_date`. Monthly partitions
+        of older logs are read together with it when the date range reaches them.
+      - Builds the `ETag` and `Last-Modified` validators from the timestamp and id of the newest
+        matching log, read with one `ORDER BY timestamp DESC, id DESC LIMIT 1` seek through the same
+        index as the page; the matching logs are not counted. Conditional requests that still match
+        stop here.
+      - With `q`, matches logs through the `logs_fts` full-text index and orders them by relevance.
+      - `command` and `command_prefix` are resolved to `log_texts` ids, which are matched through the
+        `(command_id, timestamp)` index; `user_ids` seek the `(user_id, timestamp)` index.
+      - Orders logs by `timestamp` and `id`, newest first with `order=desc`.
+      - Runs on a read replica when `DATABASE_READ_URLS` is configured.
+      - With `fields`, selects only those columns (plus `id` and `timestamp`, which paging needs);
+        leaving out `command` and `response` skips their `log_texts` lookups.
+      - Applies pagination using `cursor` (if given), `skip` and `limit`.
+      - With `LOG_RECENT_ENABLED=true` pages that start after a `cursor` or `start_date` within the
+        newest `LOG_RECENT_SIZE` logs, and `order=desc` pages that end within them, are answered from
+        an in-memory buffer without a database query; their `ETag` covers the logs on the page.
+      - Logs moved to the archive come first: only the segments whose sidecar index matches the date
+        range (and user) are opened. Searches with `q` do not reach the archive.
       - Retrieves the filtered and paginated list of logs.
 
     **Response:**
+      - `exclude_user_ids` without `user_ids`, `command`, `command_prefix` or `q` cannot be narrowed by an
+        index: the response carries an `X-Query-Warning` header, or, with `LOG_FILTER_UNINDEXED=reject`,
+        the request is answered with 422.
+      - Every page carries `ETag` and `Last-Modified` headers. Returns 304 without a body if the
+        conditional request headers still match.
+      - With `LOG_FAST_JSON=true` rows are fetched as tuples and encoded with orjson; the body is identical.
+        Pages with `fields` or `layout=columns` are always encoded this way.
+      - When the page is full, the `X-Next-Cursor` header holds the cursor of the next page.
       - Returns a list of log entries as JSON objects.
         - **Example:**
           ```json
@@ -63,14 +140,97 @@ async def read_logs(
               }
           ]
           ```
+        - **Example** (`fields=id,timestamp&layout=columns`):
+          ```json
+          {
+              "id": [1, 2],
+              "timestamp": ["2024-04-27T12:34:56Z", "2024-04-28T09:15:30Z"]
+          }
+          ```
     """
+    position = decode_cursor(cursor) if cursor else None
+    search = q.strip() if q else ""
+    selected = parse_fields(fields)
+    log_filter = parse_log_filter(command, command_prefix, user_ids, exclude_user_ids)
+    descending = order == "desc"
+    if search and position:
+        raise HTTPException(status_code=422, detail="cursor cannot be combined with q")
+    if search and descending:
+        raise HTTPException(status_code=422, detail="order cannot be combined with q")
+    warning = check_log_filter(log_filter, search)
+    if recent.enabled and not search and not log_filter.active:
+        recent_page = recent.page(None, start_date, end_date, position, skip, limit, descending)
+        if recent_page is not None:
+            validator = recent_validator(
+                (skip, limit, start_date, end_date, cursor, selected, layout, order), recent_page
+            )
+            if is_not_modified(validator, if_none_match, if_modified_since):
+                return not_modified_response(validator)
+            record_rows(len(recent_page))
+            fast_response = logs_json_response(recent_page, selected, layout)
+            set_next_cursor(fast_response, recent_page, limit)
+            set_validator(fast_response, validator)
+            return fast_response
+
     try:
+        dialect = db.bind.dialect.name
+        partitions = await read_partitions(db, start_date, end_date)
+        source = log_source(partitions, search, dialect)
+        query = select(source)
+        query = filter_logs(query, start_date, end_date, source)
+        query = apply_log_filter(query, log_filter, dialect, source)
+        if search:
+            query = search_logs(query, search, dialect, source)
+        segments = [] if search else archive.matching(
+            await read_live_prefixes(db, archive, partitions),
+            None, start_date, end_date, log_filter, position, descending
+        )
+
+        params = (
+            skip, limit, start_date, end_date, cursor, search, selected, layout, log_filter, order,
+            tuple(partition.name for partition in partitions), tuple(segment.name for segment in segments)
+        )
+        validator = await read_validator(db, query, params, source)
+        if is_not_modified(validator, if_none_match, if_modified_since):
+            not_modified = not_modified_response(validator)
+            set_query_warning(not_modified, warning)
+            return not_modified
+
+        fast = LOG_FAST_JSON or selected != LOG_FIELDS or layout == "columns"
+        page_query = query.with_only_columns(*log_columns(source, selected)) if fast else query
+
+        async def read_rows(db_skip: int, db_limit: int) -> List[Any]:
+            rows_query = paginate_logs(page_query, db_skip, db_limit, position, source, descending)
+            return list((await db.execute(rows_query)).all() if fast else (await db.scalars(rows_query)).all())
+
+        if descending:
+            # Archived logs are the oldest, so they end the page.
+            logs = await read_rows(skip, limit)
+            if len(logs) < limit and segments:
+                archive_skip = 0 if logs else max(skip - await count_logs(db, query, position, source, True), 0)
+                logs += await read_archived_tail(
+                    archive, segments, None, start_date, end_date, position, archive_skip, limit - len(logs), log_filter
+                )
+        else:
+            archived, db_skip, db_limit = await read_archived_page(
+                archive, segments, None, start_date, end_date, position, skip, limit, log_filter
+            )
+            logs = archived + (await read_rows(db_skip, db_limit) if db_limit > 0 else [])
+        record_rows(len(logs))
 
-        query = db.query(Log)
-        query = filter_logs(query, start_date, end_date)
+        if fast:
+            fast_response = logs_json_response(logs, selected, layout)
+            if not search:
+                set_next_cursor(fast_response, logs, limit)
+            set_validator(fast_response, validator)
+            set_query_warning(fast_response, warning)
+            return fast_response
 
-        logs = query.offset(skip).limit(limit).all()
+        if not search:
+            set_next_cursor(response, logs, limit)
+        set_validator(response, validator)
+        set_query_warning(response, warning)
         return [LogResponse.model_validate(log) for log in logs]
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
\ No newline at end of file
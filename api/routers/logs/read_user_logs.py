@@ -1,25 +1,58 @@
+import time
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import get_db, Log
-from api.routers.utils import filter_logs
+from api.archive import LogArchive, get_log_archive, read_archived_page, read_live_prefixes
+from api.cache import CachedPage, LogCache, get_log_cache, page_response
+from api.metrics import MetricsRoute, record_rows
+from api.models import get_user_read_db
+from api.partitions import log_source, read_partitions
+from api.recent import RecentLogs, get_recent_logs, recent_validator
+from api.routers.utils import (
+    LOG_FAST_JSON,
+    LOG_FIELDS,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    filter_logs,
+    is_not_modified,
+    log_columns,
+    logs_json_response,
+    not_modified_response,
+    paginate_logs,
+    parse_fields,
+    read_validator,
+    search_logs,
+    set_next_cursor,
+    set_validator
+)
 from api.schemas import LogResponse
 
-router = APIRouter(prefix="/logs", tags=["logs"])
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
 
 
 @router.get("/{user_id}", response_model=List[LogResponse])
 async def read_user_logs(
         user_id: int,
+        response: Response,
         skip: int = 0,
         limit: int = 10,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        db: Session = Depends(get_db)
-) -> List[LogResponse]:
+        cursor: Optional[str] = None,
+        q: Optional[str] = None,
+        fields: Optional[str] = None,
+        layout: Literal["rows", "columns"] = "rows",
+        if_none_match: Optional[str] = Header(default=None),
+        if_modified_since: Optional[str] = Header(default=None),
+        db: AsyncSession = Depends(get_user_read_db),
+        archive: LogArchive = Depends(get_log_archive),
+        cache: LogCache = Depends(get_log_cache),
+        recent: RecentLogs = Depends(get_recent_logs)
+) -> Union[List[LogResponse], Response]:
     """
     Retrieve log entries for a specific user.
 
@@ -35,18 +68,48 @@ async def read_user_logs(
         - **limit** (integer, optional, default=10): Maximum number of records to return.
         - **start_date** (ISO 8601 datetime, optional): Filter logs created after this date and time.
         - **end_date** (ISO 8601 datetime, optional): Filter logs created before this date and time.
+        - **cursor** (string, optional): Opaque position returned in the `X-Next-Cursor` header of the previous page. Continues right after that entry and stays fast on deep pages.
+        - **q** (string, optional): Full-text search; only logs whose `command` or `response` contain every word of `q` are returned, most relevant first. Pages with `skip` and `limit`; cannot be combined with `cursor`.
+        - **fields** (string, optional): Comma-separated subset of `id`, `user_id`, `command`, `timestamp` and `response`; only these fields are returned. Unknown names are answered with 422.
+        - **layout** (string, optional, default=rows): `rows` returns a list of objects; `columns` returns one object with a list of values per field.
+      - **Headers:**
+        - **If-None-Match** (optional): `ETag` of a previously received page; answered with 304 if unchanged.
+        - **If-Modified-Since** (optional): HTTP date; answered with 304 if no matching log is newer.
       - **Example:**
         ```
         GET /logs/123?skip=0&limit=5&start_date=2024-01-01T00:00:00Z&end_date=2024-12-31T23:59:59Z
         ```
 
     **Database Operations:**
-      - Filters logs for the user with the given `user_id`.
+      - Filters logs for the user with the given `user_id`, in the `logs` table and in the monthly
+        partitions of older logs that overlap the date range.
       - Optionally filters logs within the specified `start_date` and `end_date`.
-      - Applies pagination using `skip` and `limit`.
+      - Builds the `ETag` and `Last-Modified` validators from the timestamp and id of the newest
+        matching log, read with one `ORDER BY timestamp DESC, id DESC LIMIT 1` seek through the same
+        index as the page; the matching logs are not counted. Conditional requests that still match
+        stop here.
+      - With `q`, matches logs through the `logs_fts` full-text index and orders them by relevance.
+      - Orders logs by `timestamp` and `id`.
+      - With `fields`, selects only those columns (plus `id` and `timestamp`, which paging needs);
+        leaving out `command` and `response` skips their `log_texts` lookups.
+      - Applies pagination using `cursor` (if given), `skip` and `limit`.
+      - With `LOG_RECENT_ENABLED=true` pages that start after a `cursor` or `start_date` within the
+        newest `LOG_RECENT_SIZE` logs are answered from an in-memory buffer without a database query;
+        their `ETag` covers the logs on the page.
+      - Logs moved to the archive come first: only the segments whose sidecar index matches the date
+        range (and user) are opened. Searches with `q` do not reach the archive.
       - Retrieves the filtered and paginated list of logs for the user.
+      - Runs on a read replica when `DATABASE_READ_URLS` is configured, except for `READ_YOUR_WRITES_SECONDS`
+        after a log of this user was written, when the primary is queried so the new log is included.
+      - With `LOG_CACHE_ENABLED=true` pages are served from an in-process LRU cache for up to `LOG_CACHE_TTL`
+        seconds; adding a log for the user drops that user's cached pages.
 
     **Response:**
+      - Every page carries `ETag` and `Last-Modified` headers. Returns 304 without a body if the
+        conditional request headers still match.
+      - With `LOG_FAST_JSON=true` rows are fetched as tuples and encoded with orjson; the body is identical.
+        Pages with `fields` or `layout=columns` are always encoded this way.
+      - When the page is full, the `X-Next-Cursor` header holds the cursor of the next page.
       - Returns a list of log entries for the user as JSON objects.
         - **Example:**
           ```json
@@ -67,13 +130,86 @@ async def read_user_logs(
               }
           ]
           ```
+        - **Example** (`fields=id,timestamp&layout=columns`):
+          ```json
+          {
+              "id": [1, 2],
+              "timestamp": ["2024-04-27T12:34:56Z", "2024-04-28T09:15:30Z"]
+          }
+          ```
     """
+    position = decode_cursor(cursor) if cursor else None
+    search = q.strip() if q else ""
+    selected = parse_fields(fields)
+    if search and position:
+        raise HTTPException(status_code=422, detail="cursor cannot be combined with q")
+    cache_key = (user_id, skip, limit, start_date, end_date, cursor, search, selected, layout)
+    if cache.enabled:
+        page = await cache.get(cache_key)
+        if page is not None:
+            if is_not_modified(page.validator, if_none_match, if_modified_since):
+                return not_modified_response(page.validator)
+            return page_response(page)
+
+    if recent.enabled and not search:
+        recent_page = recent.page(user_id, start_date, end_date, position, skip, limit)
+        if recent_page is not None:
+            validator = recent_validator(cache_key, recent_page)
+            if is_not_modified(validator, if_none_match, if_modified_since):
+                return not_modified_response(validator)
+            record_rows(len(recent_page))
+            fast_response = logs_json_response(recent_page, selected, layout)
+            set_next_cursor(fast_response, recent_page, limit)
+            set_validator(fast_response, validator)
+            return fast_response
+
+    started = time.monotonic()
     try:
-        query = db.query(Log).filter(Log.user_id == user_id)
-        query = filter_logs(query, start_date, end_date)
+        dialect = db.bind.dialect.name
+        partitions = await read_partitions(db, start_date, end_date)
+        source = log_source(partitions, search, dialect)
+        query = select(source).where(source.user_id == user_id)
+        query = filter_logs(query, start_date, end_date, source)
+        if search:
+            query = search_logs(query, search, dialect, source)
+        segments = [] if search else archive.matching(
+            await read_live_prefixes(db, archive, partitions), user_id, start_date, end_date, cursor=position
+        )
+
+        params = (
+            *cache_key, tuple(partition.name for partition in partitions), tuple(segment.name for segment in segments)
+        )
+        validator = await read_validator(db, query, params, source)
+        if is_not_modified(validator, if_none_match, if_modified_since):
+            return not_modified_response(validator)
+
+        archived, db_skip, db_limit = await read_archived_page(
+            archive, segments, user_id, start_date, end_date, position, skip, limit
+        )
+
+        if LOG_FAST_JSON or cache.enabled or selected != LOG_FIELDS or layout == "columns":
+            rows = archived
+            if db_limit > 0:
+                rows_query = paginate_logs(query.with_only_columns(*log_columns(source, selected)), db_skip, db_limit, position, source)
+                rows = archived + (await db.execute(rows_query)).all()
+            record_rows(len(rows))
+            fast_response = logs_json_response(rows, selected, layout)
+            if not search:
+                set_next_cursor(fast_response, rows, limit)
+            set_validator(fast_response, validator)
+            if cache.enabled:
+                page = CachedPage(fast_response.body, fast_response.headers.get(NEXT_CURSOR_HEADER), validator)
+                await cache.set(cache_key, page, started)
+            return fast_response
 
-        logs = query.offset(skip).limit(limit).all()
+        logs = archived
+        if db_limit > 0:
+            logs = archived + (await db.scalars(paginate_logs(query, db_skip, db_limit, position, source))).all()
+        record_rows(len(logs))
+        if not search:
+            set_next_cursor(response, logs, limit)
+        set_validator(response, validator)
         return [LogResponse.model_validate(log) for log in logs]
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
\ No newline at end of file
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+
+from api.metrics import MetricsRoute
+from api.recent import RecentLogs, get_recent_logs
+from api.schemas import RecentLogsStats
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+
+@router.get("/recent/stats", response_model=RecentLogsStats)
+async def read_recent_stats(recent: RecentLogs = Depends(get_recent_logs)) -> RecentLogsStats:
+    """
+    Retrieve metrics of the in-memory buffer of recent logs.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /logs/recent/stats
+
+    **Response:**
+      - Returns the number of buffered logs and users, the buffer limit and how many pages of
+        `/logs/` and `/logs/{user_id}` were answered from the buffer (hits) or the database (misses).
+        - **Example:**
+          ```json
+          {
+              "enabled": true,
+              "entries": 10000,
+              "users": 812,
+              "max_entries": 10000,
+              "hits": 9120,
+              "misses": 1480,
+              "hit_rate": 0.86
+          }
+          ```
+    """
+    return recent.stats()
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+
+from api.metrics import MetricsRoute
+from api.schemas import SlowQueries
+from api.slow_queries import SlowQueryLog, get_slow_query_log
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+
+@router.get("/slow-queries", response_model=SlowQueries)
+async def read_slow_queries(
+        limit: Optional[int] = None,
+        log: SlowQueryLog = Depends(get_slow_query_log)
+) -> SlowQueries:
+    """
+    Retrieve the database statements that ran longer than `SLOW_QUERY_THRESHOLD` seconds.
+
+    Statements are only recorded with `SLOW_QUERY_ENABLED=true`; the api keeps the last
+    `SLOW_QUERY_MAX_ENTRIES` of them in memory and also writes each one to its log.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /logs/slow-queries
+      - **Query Parameters:**
+        - **limit** (integer, optional): Maximum number of statements to return; all by default.
+
+    **Response:**
+      - Returns the settings of the recorder, the number of slow statements since startup and the
+        recorded statements, newest first, each with the endpoint that issued it, its bound
+        parameters, duration, row count and query plan.
+        - **Example:**
+          ```json
+          {
+              "enabled": true,
+              "threshold_ms": 200.0,
+              "max_entries": 100,
+              "recorded": 1,
+              "entries": [
+                  {
+                      "timestamp": "2024-06-15T12:00:00.123456",
+                      "route": "read_logs",
+                      "operation": "SELECT",
+                      "statement": "SELECT logs.id, ... FROM logs WHERE logs.timestamp >= ? ...",
+                      "parameters": "('2024-01-01 00:00:00.000000', 10, 5000)",
+                      "duration_ms": 412.7,
+                      "rows": 10,
+                      "plan": ["SCAN logs", "USE TEMP B-TREE FOR ORDER BY"]
+                  }
+              ]
+          }
+          ```
+    """
+    return log.stats(limit)
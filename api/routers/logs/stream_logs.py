@@ -0,0 +1,62 @@
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from api.broadcast import LogBroadcaster, get_log_broadcaster
+from api.metrics import MetricsRoute
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_logs(
+        user_id: Optional[int] = None,
+        broadcaster: LogBroadcaster = Depends(get_log_broadcaster)
+) -> StreamingResponse:
+    """
+    Follow new log entries as Server-Sent Events.
+
+    This endpoint keeps the connection open and pushes every log entry as soon as it is written, so
+    watching traffic does not need repeated `GET /logs/` queries. Each client has a bounded buffer;
+    a client that falls behind is disconnected instead of slowing down writes.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /logs/stream
+      - **Query Parameters:**
+        - **user_id** (integer, optional): Only push the logs of this user.
+      - **Example:**
+        ```
+        GET /logs/stream?user_id=123
+        ```
+
+    **Database Operations:**
+      - None. Entries are handed over in process by `POST /logs/`, `POST /logs/batch` and the
+        write-behind buffer once they are committed.
+
+    **Response:**
+      - A `text/event-stream` with one event per log entry. `data` holds the same JSON object as
+        `GET /logs/` and `id` the log id. A `: keepalive` comment is sent while there is no traffic.
+        - **Example:**
+          ```
+          id: 1
+          data: {"id":1,"user_id":123,"command":"/start","timestamp":"2024-04-27T12:34:56","response":"This bot was created as a test for the BobrAi company."}
+          ```
+      - A client whose buffer overflows receives the events queued so far, then a `dropped` event,
+        and the stream ends. Resume with `GET /logs/` from the last received id.
+    """
+    subscription = broadcaster.subscribe(user_id)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in subscription.events(broadcaster.keepalive):
+                yield event
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends
+
+from api.broadcast import LogBroadcaster, get_log_broadcaster
+from api.metrics import MetricsRoute
+from api.schemas import LogStreamStats
+
+router = APIRouter(prefix="/logs", tags=["logs"], route_class=MetricsRoute)
+
+
+@router.get("/stream/stats", response_model=LogStreamStats)
+async def read_stream_stats(broadcaster: LogBroadcaster = Depends(get_log_broadcaster)) -> LogStreamStats:
+    """
+    Retrieve metrics of the `/logs/stream` live tail.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /logs/stream/stats
+
+    **Response:**
+      - Returns the number of connected clients, the per-client buffer size and the published,
+        delivered and dropped counters.
+        - **Example:**
+          ```json
+          {
+              "subscribers": 2,
+              "buffer_size": 1000,
+              "published": 5120,
+              "delivered": 7300,
+              "dropped": 1
+          }
+          ```
+    """
+    return broadcaster.stats()
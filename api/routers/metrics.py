@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Response
+
+from api.metrics import PROMETHEUS_CONTENT_TYPE, Metrics, get_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=Response)
+async def read_metrics(metrics: Metrics = Depends(get_metrics)) -> Response:
+    """
+    Retrieve the metrics of the api in the Prometheus text format, for scraping.
+
+    **Request:**
+      - **Method:** GET
+      - **URL:** /metrics
+
+    **Response:**
+      - Returns, per endpoint, request counts by status, requests in flight and histograms of
+        request duration, response size and log entries returned; and, per endpoint and statement
+        type, histograms of database statement time and connection checkout wait. Queries run
+        outside a request, e.g. by the ingest buffer, are labelled `route="background"`.
+        - **Example:**
+          ```text
+          # HELP api_request_duration_seconds Time to produce the response, by endpoint.
+          # TYPE api_request_duration_seconds histogram
+          api_request_duration_seconds_bucket{route="read_logs",le="0.005"} 941
+          api_request_duration_seconds_bucket{route="read_logs",le="+Inf"} 1000
+          api_request_duration_seconds_sum{route="read_logs"} 2.31
+          api_request_duration_seconds_count{route="read_logs"} 1000
+          # HELP db_query_duration_seconds Database statement time, by endpoint and statement type.
+          # TYPE db_query_duration_seconds histogram
+          db_query_duration_seconds_bucket{route="read_logs",operation="SELECT",le="0.001"} 2870
+          ...
+          ```
+    """
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
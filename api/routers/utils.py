@@ -1,14 +1,375 @@
-from datetime import datetime
-from typing import Optional
+import base64
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Hashable, NamedTuple, Optional, Sequence, Tuple
 
-from sqlalchemy.orm import Query
+import orjson
+from fastapi import HTTPException, Response
+from sqlalchemy import (  # type: ignore[attr-defined]
+    Row,
+    Select,
+    and_,
+    column,
+    func,
+    inspect,
+    literal_column,
+    or_,
+    select,
+    table
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import Log
+from api.models import Log, LogText, text_of
+from api.schemas import LogResponse
 
+LOG_FAST_JSON: bool = os.getenv("LOG_FAST_JSON", "false").lower() == "true"
+LOG_FILTER_MAX_USERS: int = int(os.getenv("LOG_FILTER_MAX_USERS", "100"))
+LOG_FILTER_UNINDEXED: str = os.getenv("LOG_FILTER_UNINDEXED", "warn").lower()
 
-def filter_logs(query: Query, start_date: Optional[datetime], end_date: Optional[datetime]) -> Query:
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+QUERY_WARNING_HEADER = "X-Query-Warning"
+
+LOG_FIELDS: Tuple[str, ...] = tuple(LogResponse.model_fields)
+
+# Paging reads the position of the last row, so these are selected whatever `fields` asks for.
+PAGING_FIELDS = ("id", "timestamp")
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Fields named in a comma-separated `fields` parameter, in `LogResponse` order; all of them if not given."""
+    if not fields:
+        return LOG_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(LOG_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(status_code=422, detail=f"fields must be a comma-separated subset of {', '.join(LOG_FIELDS)}")
+    return tuple(field for field in LOG_FIELDS if field in requested)
+
+
+def log_columns(source: Any = Log, fields: Sequence[str] = LOG_FIELDS) -> Tuple[Any, ...]:
+    """
+    Columns for `fields` plus the ones paging needs, in the order of the fields of `LogResponse`.
+
+    Leaving out `command` and `response` also leaves their `log_texts` lookups out of the query.
+    """
+    return tuple(getattr(source, field) for field in LOG_FIELDS if field in fields or field in PAGING_FIELDS)
+
+# FTS5 index created next to the `logs` table on SQLite, see `api.models.LOGS_FTS_DDL`.
+logs_fts = table("logs_fts", column("rowid"), column("rank"))
+
+
+def filter_logs(
+        query: Select,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        source: Any = Log
+) -> Select:
     if start_date:
-        query = query.filter(Log.timestamp >= start_date)
+        query = query.where(source.timestamp >= start_date)
     if end_date:
-        query = query.filter(Log.timestamp <= end_date)
+        query = query.where(source.timestamp <= end_date)
     return query
+
+
+class LogFilter(NamedTuple):
+    """Filters of a log read besides the date range and search; see `parse_log_filter`."""
+    command: Optional[str] = None
+    command_prefix: Optional[str] = None
+    user_ids: Tuple[int, ...] = ()
+    exclude_user_ids: Tuple[int, ...] = ()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.command or self.command_prefix or self.user_ids or self.exclude_user_ids)
+
+    def matches(self, log: Any) -> bool:
+        """Whether a log read outside the database, e.g. from the archive, passes the filters."""
+        if self.command is not None and log.command != self.command:
+            return False
+        if self.command_prefix is not None and not log.command.startswith(self.command_prefix):
+            return False
+        if self.user_ids and log.user_id not in self.user_ids:
+            return False
+        return log.user_id not in self.exclude_user_ids
+
+
+NO_FILTER = LogFilter()
+
+
+def parse_user_ids(value: Optional[str], name: str) -> Tuple[int, ...]:
+    """Distinct ids of a comma-separated list parameter, sorted; at most `LOG_FILTER_MAX_USERS` of them."""
+    if not value:
+        return ()
+    try:
+        user_ids = {int(part) for part in value.split(",") if part.strip()}
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must be a comma-separated list of user ids")
+    if len(user_ids) > LOG_FILTER_MAX_USERS:
+        raise HTTPException(status_code=422, detail=f"{name} accepts at most {LOG_FILTER_MAX_USERS} user ids")
+    return tuple(sorted(user_ids))
+
+
+def parse_log_filter(
+        command: Optional[str],
+        command_prefix: Optional[str],
+        user_ids: Optional[str],
+        exclude_user_ids: Optional[str]
+) -> LogFilter:
+    return LogFilter(
+        command=command or None,
+        command_prefix=command_prefix or None,
+        user_ids=parse_user_ids(user_ids, "user_ids"),
+        exclude_user_ids=parse_user_ids(exclude_user_ids, "exclude_user_ids")
+    )
+
+
+def prefix_condition(text: Any, prefix: str, dialect: str) -> Any:
+    """
+    Condition for `text` starting with `prefix`.
+
+    On SQLite this is the range `prefix <= text < prefix with its last character incremented`, which
+    the unique index of `log_texts.text` answers (`LIKE` is case-insensitive there and skips the index).
+    Other databases compare with their own collation, so they use `LIKE 'prefix%'`.
+    """
+    if dialect != "sqlite" or ord(prefix[-1]) == 0x10FFFF:
+        return text.startswith(prefix, autoescape=True)
+    return and_(text >= prefix, text < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+def apply_log_filter(query: Select, log_filter: LogFilter, dialect: str, source: Any = Log) -> Select:
+    """
+    Add the conditions of `log_filter` to a log query.
+
+    Commands are resolved to their `log_texts` ids in a subquery, so rows are matched by
+    `command_id` through the `(command_id, timestamp)` index; an exact `command` is a single id,
+    which the index also returns in timestamp order. `user_ids` seek the `(user_id, timestamp)` index.
+    """
+    if log_filter.command is not None:
+        query = query.where(
+            source.command_id == select(LogText.id).where(  # type: ignore[arg-type, attr-defined]
+                LogText.text == log_filter.command
+            ).scalar_subquery()
+        )
+    if log_filter.command_prefix is not None:
+        query = query.where(source.command_id.in_(
+            select(LogText.id)  # type: ignore[arg-type]
+            .where(prefix_condition(LogText.text, log_filter.command_prefix, dialect))
+        ))
+    if log_filter.user_ids:
+        query = query.where(source.user_id.in_(log_filter.user_ids))
+    if log_filter.exclude_user_ids:
+        query = query.where(source.user_id.not_in(log_filter.exclude_user_ids))
+    return query
+
+
+def unindexed_filter(log_filter: LogFilter, search: str) -> Optional[str]:
+    """
+    Why a page with these filters may have to scan logs without an index narrowing them, or None.
+
+    `exclude_user_ids` cannot be answered from an index. Without `user_ids`, a command or `q` to
+    narrow the rows first, the database walks the timestamp index and discards excluded logs until
+    the page is full, which reads every log in the date range when the excluded users wrote most of them.
+    """
+    narrowed = log_filter.user_ids or log_filter.command or log_filter.command_prefix or search
+    if log_filter.exclude_user_ids and not narrowed:
+        return "exclude_user_ids without user_ids, command, command_prefix or q may scan every log in the date range"
+    return None
+
+
+def check_log_filter(log_filter: LogFilter, search: str) -> Optional[str]:
+    """
+    Guard against filters that force an unindexed scan.
+
+    With `LOG_FILTER_UNINDEXED=reject` such filters are answered with 422; otherwise the reason is
+    returned for the `X-Query-Warning` header of the response.
+    """
+    reason = unindexed_filter(log_filter, search)
+    if reason and LOG_FILTER_UNINDEXED == "reject":
+        raise HTTPException(status_code=422, detail=f"Filter needs an unindexed scan: {reason}")
+    return reason
+
+
+def set_query_warning(response: Response, warning: Optional[str]) -> None:
+    if warning:
+        response.headers[QUERY_WARNING_HEADER] = warning
+
+
+def fts_query(q: str) -> str:
+    """Quote every term so that user input is matched literally, e.g. `/weather error` -> `"/weather" "error"`."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def match_logs(query: Select, q: str, dialect: str, logs_table: Any = Log.__table__, fts: Any = logs_fts) -> Select:
+    """
+    Keep only rows of `logs_table` whose `command` or `response` contains every term of `q`.
+
+    On SQLite the match is answered by the FTS5 index `fts`, whose `rank` (bm25) is then available to
+    order by. The index drives the join: `rank` is cheap while FTS5 walks its matches, but costs a
+    fresh full-text query per row when logs found through another index, such as `user_id`, are looked
+    up in it one by one. `+ 0` keeps the planner from doing that. Other databases fall back to a
+    `LIKE` scan without ranking.
+    """
+    if dialect == "sqlite":
+        return (
+            query.join(fts, fts.c.rowid + 0 == logs_table.c.id)
+            .where(literal_column(fts.name).op("MATCH")(fts_query(q)))
+        )
+    for term in q.split():
+        query = query.where(or_(
+            text_of(logs_table.c.command_id).contains(term, autoescape=True),
+            text_of(logs_table.c.response_id).contains(term, autoescape=True)
+        ))
+    return query
+
+
+def search_logs(query: Select, q: str, dialect: str, source: Any = Log) -> Select:
+    """
+    Keep only logs matching `q`, most relevant first where the database can rank them.
+
+    For a partitioned source (see `api.partitions.log_source`) every branch is already matched
+    against its own index, so only the ordering by the combined `rank` column is added here.
+    """
+    if source is not Log:
+        rank = inspect(source).selectable.c.get("rank")
+        return query if rank is None else query.order_by(rank)
+    query = match_logs(query, q, dialect)
+    return query.order_by(logs_fts.c.rank) if dialect == "sqlite" else query
+
+
+def encode_cursor(timestamp: datetime, log_id: int) -> str:
+    payload = json.dumps([timestamp.isoformat(), log_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, log_id = json.loads(payload)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+
+def paginate_logs(
+        query: Select,
+        skip: int,
+        limit: Optional[int],
+        cursor: Optional[Tuple[datetime, int]],
+        source: Any = Log,
+        descending: bool = False
+) -> Select:
+    """
+    Order logs by `(timestamp, id)`, after any ordering already on the query, and cut out one page.
+
+    With a decoded `cursor` the page starts right after that position, so the database seeks
+    through the timestamp index instead of reading and discarding `skip` rows. `descending` pages
+    from the newest log back, and the cursor then continues with older logs.
+    """
+    if descending:
+        query = query.order_by(source.timestamp.desc(), source.id.desc())
+    else:
+        query = query.order_by(source.timestamp, source.id)
+    if cursor:
+        timestamp, log_id = cursor
+        if descending:
+            query = query.where(
+                source.timestamp <= timestamp,
+                or_(source.timestamp < timestamp, and_(source.timestamp == timestamp, source.id < log_id))
+            )
+        else:
+            query = query.where(
+                source.timestamp >= timestamp,
+                or_(source.timestamp > timestamp, and_(source.timestamp == timestamp, source.id > log_id))
+            )
+    return query.offset(skip).limit(limit)
+
+
+async def count_logs(
+        db: AsyncSession,
+        query: Select,
+        cursor: Optional[Tuple[datetime, int]],
+        source: Any = Log,
+        descending: bool = False
+) -> int:
+    """Number of logs of a filtered query from `cursor` on, i.e. what its pages can hold in total."""
+    counted = paginate_logs(query, 0, None, cursor, source, descending).order_by(None)
+    return await db.scalar(counted.with_only_columns(func.count(source.id)))
+
+
+def set_next_cursor(response: Response, logs: Sequence[Any], limit: int) -> None:
+    if logs and len(logs) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(logs[-1].timestamp, logs[-1].id)
+
+
+def logs_json_response(rows: Sequence[Row], fields: Sequence[str] = LOG_FIELDS, layout: str = "rows") -> Response:
+    """
+    Serialize rows selected with `log_columns()` straight to JSON bytes.
+
+    With all fields and the `rows` layout this produces the same bytes as a `List[LogResponse]`
+    response model without building a Pydantic object per row or validating the list a second time.
+    The `columns` layout holds one list per field instead of one object per log.
+    """
+    if layout == "columns":
+        content: Any = {field: [getattr(row, field) for row in rows] for field in fields}
+    elif tuple(fields) == LOG_FIELDS:
+        content = [row._asdict() for row in rows]
+    else:
+        content = [{field: getattr(row, field) for field in fields} for row in rows]
+    return Response(orjson.dumps(content), media_type="application/json")
+
+
+class Validator(NamedTuple):
+    etag: str
+    last_modified: Optional[str]
+
+
+async def read_validator(
+        db: AsyncSession,
+        query: Select,
+        params: Tuple[Hashable, ...],
+        source: Any = Log
+) -> Validator:
+    """
+    Build the `ETag`/`Last-Modified` pair for a filtered log query.
+
+    Uses the position of the newest log matching the filters, read with one seek through the same
+    indexes that serve `order=desc` pages instead of counting the matching rows. Logs are append-only
+    and stamped on insert, so every write to a page moves that position; `params` must name the
+    partitions and segments read, as dropping or archiving one removes old logs instead.
+    """
+    newest = paginate_logs(
+        query.order_by(None).with_only_columns(source.timestamp, source.id), 0, 1, None, source, descending=True
+    )
+    max_timestamp, max_id = (await db.execute(newest)).one_or_none() or (None, None)
+    digest = hashlib.sha1(repr((params, max_id, max_timestamp)).encode()).hexdigest()[:20]
+    last_modified = None
+    if max_timestamp is not None:
+        last_modified = format_datetime(max_timestamp.replace(tzinfo=timezone.utc), usegmt=True)
+    return Validator(f'W/"{digest}"', last_modified)
+
+
+def is_not_modified(validator: Validator, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or validator.etag.removeprefix("W/") in tags
+    if if_modified_since is not None and validator.last_modified is not None:
+        try:
+            return parsedate_to_datetime(validator.last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def set_validator(response: Response, validator: Validator) -> None:
+    response.headers["ETag"] = validator.etag
+    if validator.last_modified is not None:
+        response.headers["Last-Modified"] = validator.last_modified
+
+
+def not_modified_response(validator: Validator) -> Response:
+    response = Response(status_code=304)
+    set_validator(response, validator)
+    return response
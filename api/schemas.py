@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
+from typing import List, Optional
 
 
 class LogCreate(BaseModel):
@@ -16,3 +17,88 @@ class LogResponse(BaseModel):
     response: str = Field(description="Telegram bot response")
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class LogBatchError(BaseModel):
+    index: int = Field(description="Position of the rejected item in the submitted batch")
+    error: str = Field(description="Reason the item was rejected")
+
+
+class LogBatchResponse(BaseModel):
+    ids: List[int] = Field(description="Identifiers assigned to the inserted log entries, in submission order")
+    errors: List[LogBatchError] = Field(description="Items that were rejected and not inserted")
+
+
+class LogAccepted(BaseModel):
+    detail: str = Field(description="Acceptance status of the log entry")
+    queue_depth: int = Field(description="Number of log entries waiting to be written, including this one")
+
+
+class IngestStats(BaseModel):
+    enabled: bool = Field(description="Whether POST /logs/ writes through the buffer")
+    queue_depth: int = Field(description="Log entries accepted but not written yet")
+    queue_capacity: int = Field(description="Maximum number of queued log entries before requests are rejected")
+    accepted: int = Field(description="Log entries accepted into the buffer")
+    rejected: int = Field(description="Log entries rejected because the buffer was full")
+    flushed_rows: int = Field(description="Log entries written to the database")
+    failed_rows: int = Field(description="Log entries lost because their flush failed")
+    flushes: int = Field(description="Number of successful group commits")
+    flush_seconds_last: float = Field(description="Duration of the most recent group commit in seconds")
+    flush_seconds_max: float = Field(description="Longest group commit in seconds")
+    flush_seconds_avg: float = Field(description="Average group commit duration in seconds")
+
+
+class CacheStats(BaseModel):
+    enabled: bool = Field(description="Whether GET /logs/{user_id} is served through the cache")
+    entries: int = Field(description="Number of cached pages")
+    bytes: int = Field(description="Total size of the cached response bodies in bytes")
+    max_entries: int = Field(description="Maximum number of cached pages")
+    max_bytes: int = Field(description="Maximum total size of the cached response bodies in bytes")
+    hits: int = Field(description="Requests answered from the cache")
+    misses: int = Field(description="Requests that had to query the database")
+    evictions: int = Field(description="Pages dropped to stay within the size limits")
+    expirations: int = Field(description="Pages dropped because their TTL ran out")
+    invalidations: int = Field(description="Writes that dropped cached pages of their user")
+
+
+class LogStat(BaseModel):
+    key: str = Field(description="Command name, user id, or an empty string for `group_by=total`")
+    bucket: Optional[datetime] = Field(description="Start of the hour or day bucket, or null for range totals")
+    count: int = Field(description="Number of log entries")
+
+
+class LogStreamStats(BaseModel):
+    subscribers: int = Field(description="Clients currently connected to GET /logs/stream")
+    buffer_size: int = Field(description="Maximum number of undelivered log entries per client")
+    published: int = Field(description="Log entries offered to the stream since startup")
+    delivered: int = Field(description="Log entries queued for a client, counted once per client")
+    dropped: int = Field(description="Clients disconnected because they fell behind")
+
+
+class RecentLogsStats(BaseModel):
+    enabled: bool = Field(description="Whether log reads are answered from the buffer of recent logs")
+    entries: int = Field(description="Log entries currently held in the buffer")
+    users: int = Field(description="Users with at least one log entry in the buffer")
+    max_entries: int = Field(description="Maximum number of log entries held before the oldest are evicted")
+    hits: int = Field(description="Pages answered from the buffer without a database query")
+    misses: int = Field(description="Pages that reached below the buffer and were read from the database")
+    hit_rate: float = Field(description="Share of pages answered from the buffer")
+
+
+class SlowQuery(BaseModel):
+    timestamp: datetime = Field(description="When the statement finished, in UTC")
+    route: str = Field(description="Endpoint that issued the statement, or `background` outside a request")
+    operation: str = Field(description="First keyword of the statement, e.g. SELECT")
+    statement: str = Field(description="SQL sent to the database")
+    parameters: str = Field(description="Bound parameters, shortened if long")
+    duration_ms: float = Field(description="Time the statement took, including fetching its rows")
+    rows: Optional[int] = Field(description="Rows returned or affected, or null if the driver does not report them")
+    plan: Optional[List[str]] = Field(description="Query plan, one line per step, or null if it was not captured")
+
+
+class SlowQueries(BaseModel):
+    enabled: bool = Field(description="Whether slow statements are recorded")
+    threshold_ms: float = Field(description="Statements running at least this long are recorded")
+    max_entries: int = Field(description="Maximum number of statements kept before the oldest are evicted")
+    recorded: int = Field(description="Slow statements recorded since startup, including evicted ones")
+    entries: List[SlowQuery] = Field(description="Recorded statements, newest first")
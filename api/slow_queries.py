@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import Engine, event  # type: ignore[attr-defined]
+
+from api.metrics import current_route, statement_operation
+from api.schemas import SlowQueries, SlowQuery
+
+SLOW_QUERY_ENABLED: bool = os.getenv("SLOW_QUERY_ENABLED", "false").lower() == "true"
+SLOW_QUERY_THRESHOLD: float = float(os.getenv("SLOW_QUERY_THRESHOLD", "0.2"))
+SLOW_QUERY_MAX_ENTRIES: int = int(os.getenv("SLOW_QUERY_MAX_ENTRIES", "100"))
+SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+
+# Bound parameters are kept as their repr, cut to this many characters; batches can be huge.
+MAX_PARAMETERS_LENGTH = 1000
+# Statements that EXPLAIN accepts; the plan of a DDL or PRAGMA statement says nothing.
+EXPLAINED_OPERATIONS = frozenset({"SELECT", "WITH", "INSERT", "UPDATE", "DELETE"})
+# The plan and row count are read inside this savepoint of the transaction that ran the statement.
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+
+def format_parameters(parameters: Any) -> str:
+    text = repr(parameters)
+    return text if len(text) <= MAX_PARAMETERS_LENGTH else text[:MAX_PARAMETERS_LENGTH - 3] + "..."
+
+
+def row_count(cursor: Any) -> Optional[int]:
+    """Rows the statement affected, None if the driver does not report them, as for a `SELECT`."""
+    return cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+
+
+def fetch_in_savepoint(conn: Any, statement: str, parameters: Any) -> List[Any]:
+    """
+    Rows of `statement`, run on a cursor of its own on the connection that just ran a slow statement.
+
+    The connection is still inside the transaction of the request. The statement runs in a savepoint
+    that is rolled back if it fails, because on PostgreSQL a failed statement aborts the whole
+    transaction and the request would fail on its next statement.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(statement, parameters)
+            return cursor.fetchall()
+        except Exception:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            raise
+        finally:
+            cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    finally:
+        cursor.close()
+
+
+def count_rows(conn: Any, statement: str, parameters: Any) -> int:
+    """Rows returned by the `SELECT` in `statement`; DBAPI cursors only count the rows of writes."""
+    return fetch_in_savepoint(conn, f"SELECT count(*) FROM ({statement}) AS slow_query", parameters)[0][0]
+
+
+def explain(conn: Any, statement: str, parameters: Any) -> List[str]:
+    """
+    Plan of `statement`, one line per step, read on the connection that just ran it.
+
+    SQLite answers `EXPLAIN QUERY PLAN` with `(id, parent, notused, detail)` rows, which are indented
+    by depth like the sqlite3 shell does; other databases answer `EXPLAIN` with one line per row.
+    """
+    sqlite = conn.dialect.name == "sqlite"
+    rows = fetch_in_savepoint(conn, ("EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN ") + statement, parameters)
+    if not sqlite:
+        return [" ".join(str(value) for value in row) for row in rows]
+    depths: Dict[int, int] = {0: -1}
+    lines = []
+    for step, parent, _, detail in rows:
+        depths[step] = depths.get(parent, -1) + 1
+        lines.append("  " * depths[step] + detail)
+    return lines
+
+
+class SlowQueryLog:
+    """
+    Bounded in-process log of the database statements that ran longer than `threshold` seconds.
+
+    Filled by the engine events installed with `watch_slow_queries`. Each entry keeps the endpoint that
+    issued the statement, its bound parameters, duration, row count and, when `explain` is set, the
+    query plan. The plan, and the row count of a `SELECT`, are read right after the statement in a
+    savepoint of its transaction, so they add statements only for slow queries. Entries are also written
+    to the log as one JSON object per line. Once `max_entries` is reached the oldest entries are evicted;
+    `recorded` keeps counting.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, explain: bool = True, enabled: bool = True) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.explain = explain
+        self.enabled = enabled
+        self.recorded = 0
+        self._entries: Deque[SlowQuery] = deque(maxlen=max_entries)
+
+    def record(self, entry: SlowQuery) -> None:
+        self._entries.append(entry)
+        self.recorded += 1
+        logging.warning("Slow query: %s", json.dumps(entry.model_dump(mode="json")))
+
+    def entries(self, limit: Optional[int] = None) -> List[SlowQuery]:
+        """Newest first."""
+        return list(islice(reversed(self._entries), limit))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self, limit: Optional[int] = None) -> SlowQueries:
+        return SlowQueries(
+            enabled=self.enabled,
+            threshold_ms=self.threshold * 1000,
+            max_entries=self.max_entries,
+            recorded=self.recorded,
+            entries=self.entries(limit)
+        )
+
+
+def watch_slow_queries(engine: Engine, log: Optional[SlowQueryLog] = None) -> None:
+    """
+    Record the statements of `engine` that run longer than the threshold of `log`.
+
+    Statements are timed from `before_cursor_execute` to `after_cursor_execute`; with the async
+    drivers that includes fetching the rows. Only statements over the threshold pay for more than the
+    two clock readings.
+    """
+    recorder = log or slow_query_log
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_query(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        duration = time.perf_counter() - conn.info["slow_query_started"].pop()
+        if not recorder.enabled or duration < recorder.threshold:
+            return
+        operation = statement_operation(statement)
+        # Batched "insertmanyvalues" inserts report `executemany` but run as single statements.
+        batch = isinstance(parameters, list)
+        plan = None
+        rows = None if batch else row_count(cursor)
+        if recorder.explain and not batch and operation in EXPLAINED_OPERATIONS:
+            try:
+                plan = explain(conn, statement, parameters)
+                if rows is None and operation == "SELECT":
+                    rows = count_rows(conn, statement, parameters)
+            except Exception as e:
+                logging.warning("Could not explain slow query: %s", e)
+        recorder.record(SlowQuery(
+            timestamp=datetime.utcnow(),
+            route=current_route.get(),
+            operation=operation,
+            statement=statement,
+            parameters=format_parameters(parameters),
+            duration_ms=duration * 1000,
+            rows=rows,
+            plan=plan
+        ))
+
+    @event.listens_for(engine, "handle_error")
+    def failed_query(context: Any) -> None:
+        stack = context.connection.info.get("slow_query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+slow_query_log = SlowQueryLog(
+    threshold=SLOW_QUERY_THRESHOLD,
+    max_entries=SLOW_QUERY_MAX_ENTRIES,
+    explain=SLOW_QUERY_EXPLAIN,
+    enabled=SLOW_QUERY_ENABLED
+)
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    return slow_query_log
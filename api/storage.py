@@ -0,0 +1,110 @@
+import os
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import Engine, event, make_url, text  # type: ignore[attr-defined]
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # type: ignore[attr-defined]
+
+JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+SYNCHRONOUS_LEVELS = ("off", "normal", "full", "extra")
+
+# Pragmas read back by `read_storage_settings`, in the order they are applied.
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+
+
+def optional_int(value: str) -> Optional[int]:
+    return int(value) if value.strip() else None
+
+
+def choice(name: str, value: str, choices: tuple) -> Optional[str]:
+    """`value` lower-cased if it is one of `choices`, None if empty; pragma values are spliced into SQL."""
+    value = value.strip().lower()
+    if not value:
+        return None
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+class StorageProfile(NamedTuple):
+    """
+    Connection settings of an engine.
+
+    The SQLite pragmas are run on every new connection; a setting that is None keeps the SQLite
+    default. The pool settings apply to every database except in-memory SQLite, which shares one
+    connection; None keeps the pool SQLAlchemy picks for the driver.
+    """
+    journal_mode: Optional[str] = None
+    synchronous: Optional[str] = None
+    mmap_size: Optional[int] = None
+    cache_size: Optional[int] = None
+    busy_timeout: Optional[int] = None
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_recycle: Optional[int] = None
+
+    def pragmas(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in SQLITE_PRAGMAS if getattr(self, name) is not None}
+
+    def engine_options(self, database_url: str) -> Dict[str, Any]:
+        """Keyword arguments of `create_engine`/`create_async_engine` for `database_url`."""
+        url = make_url(database_url)
+        if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+            return {}
+        options = {"pool_size": self.pool_size, "max_overflow": self.max_overflow, "pool_recycle": self.pool_recycle}
+        options = {name: value for name, value in options.items() if value is not None}
+        # aiosqlite opens a new connection per checkout unless asked for a pool; with one, the
+        # pragmas run once per connection and its page cache and memory map outlive the session.
+        if options and url.drivername == "sqlite+aiosqlite":
+            options["poolclass"] = AsyncAdaptedQueuePool
+        return options
+
+
+def profile_from_env() -> StorageProfile:
+    return StorageProfile(
+        journal_mode=choice("DATABASE_JOURNAL_MODE", os.getenv("DATABASE_JOURNAL_MODE", "wal"), JOURNAL_MODES),
+        synchronous=choice("DATABASE_SYNCHRONOUS", os.getenv("DATABASE_SYNCHRONOUS", "normal"), SYNCHRONOUS_LEVELS),
+        mmap_size=optional_int(os.getenv("DATABASE_MMAP_SIZE", "268435456")),
+        cache_size=optional_int(os.getenv("DATABASE_CACHE_SIZE", "-65536")),
+        busy_timeout=optional_int(os.getenv("DATABASE_BUSY_TIMEOUT", "5000")),
+        pool_size=optional_int(os.getenv("DATABASE_POOL_SIZE", "5")),
+        max_overflow=optional_int(os.getenv("DATABASE_MAX_OVERFLOW", "10")),
+        pool_recycle=optional_int(os.getenv("DATABASE_POOL_RECYCLE", "-1")),
+    )
+
+
+# SQLite as the driver sets it up: rollback journal, full fsyncs, the 5 s timeout of `sqlite3` and the default pool.
+DEFAULT_PROFILE = StorageProfile()
+
+
+def apply_storage_profile(engine: Engine, profile: StorageProfile) -> None:
+    """Run the pragmas of `profile` on every new connection of a SQLite `engine`."""
+    pragmas = profile.pragmas()
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+
+async def read_storage_settings(engine: AsyncEngine) -> Dict[str, Any]:
+    """Settings in effect on a connection of `engine`, as reported by the database and the pool."""
+    settings: Dict[str, Any] = {
+        "url": engine.url.render_as_string(hide_password=True),  # type: ignore[attr-defined]
+        "pool": type(engine.pool).__name__,
+        "pool_size": getattr(engine.pool, "size", lambda: None)(),
+    }
+    if engine.dialect.name == "sqlite":
+        async with engine.connect() as connection:
+            for name in SQLITE_PRAGMAS:
+                settings[name] = (await connection.execute(text(f"PRAGMA {name}"))).scalar()
+    return settings
+
+
+storage_profile = profile_from_env()
@@ -1,61 +1,63 @@
-from typing import Generator
+from typing import AsyncGenerator
 from unittest.mock import patch
 
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
+from api.cache import log_cache
 from api.main import app
-from api.models import Base, get_db
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
-TestingSessionLocal = sessionmaker(
-    autocommit=False, autoflush=False, bind=engine
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
 )
 
-Base.metadata.create_all(bind=engine)
-
 
 @pytest.fixture(scope="function")
-def db_session() -> Generator[Session, None, None]:
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
-    try:
-        yield session
-    finally:
-        session.close()
-        transaction.rollback()
-        connection.close()
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
 
 
 @pytest.fixture(scope="function")
-def client(db_session: Session) -> Generator[TestClient, None, None]:
-    def override_get_db() -> Generator[Session, None, None]:
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
         try:
             yield db_session
         finally:
             pass
 
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         yield c
     app.dependency_overrides.clear()
 
 
-def test_add_logs_success(client: TestClient) -> None:
+async def test_add_logs_success(client: AsyncClient) -> None:
     log_data = {
         "user_id": 1,
         "command": "/test",
         "response": "Test response"
     }
 
-    response = client.post("/logs/", json=log_data)
+    response = await client.post("/logs/", json=log_data)
     assert response.status_code == 200
     data = response.json()
     assert data["user_id"] == log_data["user_id"]
@@ -65,14 +67,14 @@ def test_add_logs_success(client: TestClient) -> None:
     assert "timestamp" in data
 
 
-def test_add_logs_missing_fields(client: TestClient) -> None:
+async def test_add_logs_missing_fields(client: AsyncClient) -> None:
     log_data = {
         "user_id": 1,
         "command": "/test"
         # no "response" field
     }
 
-    response = client.post("/logs/", json=log_data)
+    response = await client.post("/logs/", json=log_data)
     assert response.status_code == 422  # Unprocessable Entity
     data = response.json()
     assert data["detail"][0]["loc"] == ["body", "response"]
@@ -80,14 +82,14 @@ def test_add_logs_missing_fields(client: TestClient) -> None:
     assert data["detail"][0]["type"] == "missing"
 
 
-def test_add_logs_invalid_data(client: TestClient) -> None:
+async def test_add_logs_invalid_data(client: AsyncClient) -> None:
     log_data = {
         "user_id": "not_an_integer",
         "command": "/test",
         "response": "Test response"
     }
 
-    response = client.post("/logs/", json=log_data)
+    response = await client.post("/logs/", json=log_data)
     assert response.status_code == 422
     data = response.json()
     assert data["detail"][0]["loc"] == ["body", "user_id"]
@@ -95,7 +97,7 @@ def test_add_logs_invalid_data(client: TestClient) -> None:
     assert data["detail"][0]["type"] == "int_parsing"
 
 
-def test_add_logs_db_error(client: TestClient, db_session: Session) -> None:
+async def test_add_logs_db_error(client: AsyncClient, db_session: AsyncSession) -> None:
     log_data = {
         "user_id": 1,
         "command": "/test",
@@ -103,8 +105,21 @@ def test_add_logs_db_error(client: TestClient, db_session: Session) -> None:
     }
 
     with patch.object(db_session, "commit", side_effect=Exception("DB Commit Error")):
-        response = client.post("/logs/", json=log_data)
+        response = await client.post("/logs/", json=log_data)
         assert response.status_code == 500
         data = response.json()
         assert data["detail"] == "Internal Server Error"
 
+
+async def test_add_logs_side_effect_error(client: AsyncClient, db_session: AsyncSession) -> None:
+    log_data = {
+        "user_id": 1,
+        "command": "/test",
+        "response": "Test response"
+    }
+
+    with patch.object(log_cache, "invalidate_user", side_effect=Exception("Cache Error")):
+        response = await client.post("/logs/", json=log_data)
+    assert response.status_code == 200
+    assert response.json()["command"] == "/test"
+    assert (await db_session.execute(select(func.count()).select_from(Log.__table__))).scalar_one() == 1
@@ -0,0 +1,150 @@
+from typing import Any, AsyncGenerator, List
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.broadcast import log_broadcaster
+from api.main import app
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+async def test_add_logs_batch_success(client: AsyncClient, db_session: AsyncSession) -> None:
+    batch = [
+        {"user_id": 1, "command": "/start", "response": "Response 1"},
+        {"user_id": 2, "command": "/weather", "response": "Response 2"},
+    ]
+
+    response = await client.post("/logs/batch", json=batch)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["ids"]) == 2
+    assert data["errors"] == []
+    logs = (await db_session.scalars(select(Log).order_by(Log.id))).all()
+    assert [log.id for log in logs] == data["ids"]
+    assert [log.command for log in logs] == ["/start", "/weather"]
+
+
+async def test_add_logs_batch_inserts_with_one_statement(client: AsyncClient, db_session: AsyncSession) -> None:
+    await client.post("/logs/batch", json=[{"user_id": 1, "command": "/start", "response": "Hello"}])
+    batch = [{"user_id": index, "command": f"/test {index % 3}", "response": "Done"} for index in range(500)]
+    statements: List[str] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        response = await client.post("/logs/batch", json=batch)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert len([statement for statement in statements if statement.startswith("INSERT INTO logs ")]) == 1
+    ids = response.json()["ids"]
+    assert ids == list(range(2, 502))
+    logs = (await db_session.scalars(select(Log).where(Log.id.in_(ids)).order_by(Log.id))).all()
+    assert [(log.user_id, log.command) for log in logs] == [(item["user_id"], item["command"]) for item in batch]
+
+
+async def test_add_logs_batch_ndjson(client: AsyncClient) -> None:
+    body = (
+        '{"user_id": 1, "command": "/start", "response": "Response 1"}\n'
+        'not json\n'
+        '{"user_id": 3, "command": "/test", "response": "Response 3"}\n'
+    )
+
+    response = await client.post("/logs/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["ids"]) == 2
+    assert data["errors"] == [{"index": 1, "error": "Invalid JSON"}]
+
+
+async def test_add_logs_batch_item_errors(client: AsyncClient) -> None:
+    batch = [
+        {"user_id": 1, "command": "/start", "response": "Response 1"},
+        {"user_id": "not_an_integer", "command": "/test", "response": "Response 2"},
+        {"user_id": 3, "command": "/test"},
+    ]
+
+    response = await client.post("/logs/batch", json=batch)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["ids"]) == 1
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+    assert data["errors"][1]["error"] == "response: Field required"
+
+
+async def test_add_logs_batch_not_a_list(client: AsyncClient) -> None:
+    response = await client.post("/logs/batch", json={"user_id": 1, "command": "/test", "response": "Test"})
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Expected a JSON array of log entries"
+
+
+async def test_add_logs_batch_too_large(client: AsyncClient) -> None:
+    batch = [{"user_id": 1, "command": "/test", "response": "Test"}] * 1001
+
+    response = await client.post("/logs/batch", json=batch)
+    assert response.status_code == 413
+
+
+async def test_add_logs_batch_db_error(client: AsyncClient, db_session: AsyncSession) -> None:
+    batch = [{"user_id": 1, "command": "/test", "response": "Test response"}]
+
+    with patch.object(db_session, "commit", side_effect=Exception("DB Commit Error")):
+        response = await client.post("/logs/batch", json=batch)
+        assert response.status_code == 500
+        data = response.json()
+        assert data["detail"] == "Internal Server Error"
+
+
+async def test_add_logs_batch_side_effect_error(client: AsyncClient, db_session: AsyncSession) -> None:
+    batch = [{"user_id": 1, "command": "/test", "response": "Test response"}]
+
+    with patch.object(log_broadcaster, "publish", side_effect=Exception("Broadcast Error")):
+        response = await client.post("/logs/batch", json=batch)
+    assert response.status_code == 200
+    assert len(response.json()["ids"]) == 1
+    assert len((await db_session.scalars(select(Log))).all()) == 1
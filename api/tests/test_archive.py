@@ -0,0 +1,244 @@
+import json
+import os
+from datetime import datetime
+from typing import AsyncGenerator
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.archive import LogArchive, archive_partitions, get_log_archive, read_live_prefixes
+from api.main import app
+from api.maintenance import maintain
+from api.models import (
+    Base,
+    Log,
+    get_db,
+    get_session_factory,
+    intern_logs,
+    get_read_db,
+    get_user_read_db,
+    get_read_session_factory
+)
+from api.partitions import Partition, drop_partition, rotate_partitions
+from api.routers.utils import encode_cursor
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+NOW = datetime(2024, 6, 15)
+LOGS = [
+    (1, datetime(2024, 4, 10)),
+    (2, datetime(2024, 4, 20)),
+    (1, datetime(2024, 5, 5)),
+    (3, datetime(2024, 5, 25)),
+    (2, datetime(2024, 6, 1)),
+    (1, datetime(2024, 6, 10)),
+]
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+def archive(tmp_path: str) -> LogArchive:
+    return LogArchive(str(tmp_path), segment_rows=1)
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession, archive: LogArchive) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: lambda: db_session
+    app.dependency_overrides[get_read_session_factory] = lambda: lambda: db_session
+    app.dependency_overrides[get_log_archive] = lambda: archive
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def archived_logs(db_session: AsyncSession, archive: LogArchive) -> None:
+    db_session.add_all([
+        Log(user_id=user_id, command=f"/weather City{index}", timestamp=timestamp, response="Temperature: 7")
+        for index, (user_id, timestamp) in enumerate(LOGS)
+    ])
+    await db_session.commit()
+
+    def move(session) -> None:
+        connection = session.connection()
+        rotate_partitions(connection, NOW)
+        for name in archive_partitions(connection, archive, NOW, 10):
+            drop_partition(connection, Partition.named(name))
+
+    await db_session.run_sync(move)
+
+
+async def count_logs(db_session: AsyncSession) -> int:
+    return (await db_session.execute(select(func.count()).select_from(Log.__table__))).scalar_one()
+
+
+async def test_write_partition_segments(db_session: AsyncSession, archive: LogArchive, archived_logs: None) -> None:
+    segments = archive.segments()
+    assert [(segment.partition, segment.min_user_id, segment.max_user_id, segment.rows) for segment in segments] == [
+        ("logs_2024_04", 1, 1, 1),
+        ("logs_2024_04", 2, 2, 1),
+        ("logs_2024_05", 1, 1, 1),
+        ("logs_2024_05", 3, 3, 1),
+    ]
+    with open(os.path.join(archive.directory, segments[0].name + ".json")) as file:
+        sidecar = json.load(file)
+    assert sidecar["min_timestamp"] == sidecar["max_timestamp"] == "2024-04-10T00:00:00"
+    assert sidecar["first_id"] == sidecar["last_id"] == 1
+    assert await count_logs(db_session) == 2
+
+
+async def test_read_logs_from_archive_and_database(client: AsyncClient, archived_logs: None) -> None:
+    response = await client.get("/logs/?limit=3")
+    assert response.status_code == 200
+    assert [log["timestamp"] for log in response.json()] == [t.isoformat() for _, t in LOGS[:3]]
+
+    response = await client.get(f"/logs/?limit=3&cursor={response.headers['X-Next-Cursor']}")
+    assert [log["timestamp"] for log in response.json()] == [t.isoformat() for _, t in LOGS[3:]]
+
+    response = await client.get("/logs/?skip=3&limit=2")
+    assert [log["timestamp"] for log in response.json()] == [t.isoformat() for _, t in LOGS[3:5]]
+
+
+async def test_read_user_logs_opens_matching_segments(client: AsyncClient, archive: LogArchive, archived_logs: None) -> None:
+    with patch.object(archive, "_read_segment", wraps=archive._read_segment) as read_segment:
+        response = await client.get("/logs/1")
+    assert response.status_code == 200
+    assert [log["timestamp"] for log in response.json()] == [
+        "2024-04-10T00:00:00", "2024-05-05T00:00:00", "2024-06-10T00:00:00"
+    ]
+    assert [call.args[0].name for call in read_segment.call_args_list] == [
+        segment.name for segment in archive.segments() if segment.min_user_id == 1
+    ]
+
+
+async def test_cursor_past_archive_opens_no_segment(client: AsyncClient, archive: LogArchive, archived_logs: None) -> None:
+    cursor = (await client.get("/logs/?limit=4")).headers["X-Next-Cursor"]
+
+    with patch.object(archive, "_read_segment", wraps=archive._read_segment) as read_segment:
+        response = await client.get(f"/logs/?cursor={cursor}")
+        assert [log["timestamp"] for log in response.json()] == [t.isoformat() for _, t in LOGS[4:]]
+        response = await client.get(f"/logs/1?cursor={cursor}")
+        assert [log["timestamp"] for log in response.json()] == ["2024-06-10T00:00:00"]
+    assert read_segment.call_count == 0
+
+    # Newest first, a cursor at the first log of May leaves only the April segments to read.
+    with patch.object(archive, "_read_segment", wraps=archive._read_segment) as read_segment:
+        response = await client.get(f"/logs/?order=desc&cursor={encode_cursor(LOGS[2][1], 3)}")
+    assert [log["timestamp"] for log in response.json()] == [t.isoformat() for _, t in reversed(LOGS[:2])]
+    assert {call.args[0].partition for call in read_segment.call_args_list} == {"logs_2024_04"}
+
+
+async def test_read_logs_date_range_skips_other_months(client: AsyncClient, archive: LogArchive, archived_logs: None) -> None:
+    with patch.object(archive, "_read_segment", wraps=archive._read_segment) as read_segment:
+        response = await client.get("/logs/?start_date=2024-05-01T00:00:00&end_date=2024-05-31T00:00:00")
+    assert [log["timestamp"] for log in response.json()] == ["2024-05-05T00:00:00", "2024-05-25T00:00:00"]
+    assert {call.args[0].partition for call in read_segment.call_args_list} == {"logs_2024_05"}
+
+
+async def test_archive_ignores_segments_of_live_partition(db_session: AsyncSession, archive: LogArchive) -> None:
+    db_session.add_all([Log(user_id=user_id, command="/start", timestamp=timestamp, response="Hello") for user_id, timestamp in LOGS])
+    await db_session.commit()
+
+    def write(session) -> list:
+        rotate_partitions(session.connection(), NOW)
+        return archive_partitions(session.connection(), archive, NOW, 10)
+
+    assert await db_session.run_sync(write) == ["logs_2024_04", "logs_2024_05"]
+    live = await read_live_prefixes(db_session, archive, [Partition.named("logs_2024_04")])
+    assert archive.matching(live, None, None, None) == [
+        segment for segment in archive.segments() if segment.partition == "logs_2024_05"
+    ]
+
+
+async def test_late_partition_keeps_archived_segments(
+        client: AsyncClient,
+        db_session: AsyncSession,
+        archive: LogArchive,
+        archived_logs: None
+) -> None:
+    # A late April log is rotated into a new `logs_2024_04` after April went to the archive.
+    db_session.add_all([
+        Log(user_id=3, command="/late", timestamp=datetime(2024, 4, 25), response="Late"),
+        Log(user_id=3, command="/start", timestamp=datetime(2024, 6, 12), response="Hello")
+    ])
+    await db_session.commit()
+    assert await db_session.run_sync(lambda session: rotate_partitions(session.connection(), NOW)) == ["logs_2024_04"]
+
+    response = await client.get("/logs/?end_date=2024-04-30T00:00:00")
+    assert [log["timestamp"] for log in response.json()] == [
+        "2024-04-10T00:00:00", "2024-04-20T00:00:00", "2024-04-25T00:00:00"
+    ]
+
+
+async def test_export_logs_includes_archive(client: AsyncClient, archived_logs: None) -> None:
+    response = await client.get("/logs/export")
+    assert response.status_code == 200
+    assert [json.loads(line)["timestamp"] for line in response.text.splitlines()] == [t.isoformat() for _, t in LOGS]
+
+
+async def test_drop_expired_segments(archive: LogArchive, archived_logs: None) -> None:
+    assert archive.drop_expired(datetime(2024, 5, 15)) == ["logs_2024_04"]
+    assert {segment.partition for segment in archive.segments()} == {"logs_2024_05"}
+    assert sorted(os.listdir(archive.directory)) == sorted(
+        segment.name + suffix for segment in archive.segments() for suffix in (".json", ".ndjson.gz")
+    )
+
+
+async def test_segment_listing_is_cached(archive: LogArchive, archived_logs: None) -> None:
+    segments = archive.segments()
+    with patch("api.archive.os.scandir", wraps=os.scandir) as scandir:
+        assert archive.segments() == segments
+    assert scandir.call_count == 0
+
+    # Segments removed by another process are noticed through the directory.
+    LogArchive(archive.directory, segment_rows=1).drop_expired(datetime(2024, 5, 15))
+    assert {segment.partition for segment in archive.segments()} == {"logs_2024_05"}
+
+
+async def test_maintain_archives_partitions(archive: LogArchive) -> None:
+    maintenance_engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=StaticPool)
+    async with maintenance_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(Log.__table__.insert(), await connection.run_sync(intern_logs, [
+            {"user_id": user_id, "command": "/start", "timestamp": timestamp, "response": "Hello"}
+            for user_id, timestamp in LOGS
+        ]))
+
+    result = await maintain(maintenance_engine, NOW, 0, 1.0, archive, archive_after_days=10)
+
+    assert result.rotated == ["logs_2024_04", "logs_2024_05"]
+    assert result.archived == ["logs_2024_04", "logs_2024_05"]
+    assert sum(segment.rows for segment in archive.segments()) == 4
+    await maintenance_engine.dispose()
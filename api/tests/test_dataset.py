@@ -0,0 +1,42 @@
+import os
+import sqlite3
+from collections import Counter
+from datetime import timedelta
+
+from api.benchmarks.dataset import DEFAULT_END, create_dataset, generate_logs
+
+
+def test_generated_logs_are_skewed_and_ordered() -> None:
+    logs = list(generate_logs(5000, users=1000, end=DEFAULT_END, months=3, skew=1.1, seed=1))
+
+    assert logs == list(generate_logs(5000, users=1000, end=DEFAULT_END, months=3, skew=1.1, seed=1))
+    assert all(earlier.timestamp <= later.timestamp for earlier, later in zip(logs, logs[1:]))
+    assert logs[0].timestamp >= DEFAULT_END - timedelta(days=90) and logs[-1].timestamp <= DEFAULT_END
+
+    users = Counter(log.user_id for log in logs)
+    heaviest = [count for user_id, count in users.most_common(10)]
+    # The ten heaviest users write a large share; most users write one or two logs.
+    assert sum(heaviest) > len(logs) * 0.2
+    assert sum(1 for count in users.values() if count <= 2) > len(users) / 2
+
+    commands = Counter(log.command.split(maxsplit=1)[0] for log in logs)
+    assert commands["/weather"] > commands["/start"] > 0
+    assert {"/help", "hello"} <= set(commands)
+
+
+def test_create_dataset(tmp_path: str) -> None:
+    path = os.path.join(tmp_path, "logs.db")
+    create_dataset(path, 2000, users=100, months=3)
+
+    connection = sqlite3.connect(path)
+    tables = [name for name, in connection.execute("SELECT name FROM sqlite_master WHERE name GLOB 'logs_2*_[0-9][0-9]'")]
+    counts = [connection.execute(f"SELECT count(*) FROM {name}").fetchone()[0] for name in [*tables, "logs"]]
+    total = connection.execute(
+        "SELECT sum(count) FROM log_rollups WHERE granularity = 'day' AND dimension = 'total'"
+    ).fetchone()[0]
+    matches = connection.execute("SELECT count(*) FROM logs_fts WHERE logs_fts MATCH 'weather'").fetchone()[0]
+    connection.close()
+
+    assert len(tables) >= 2
+    assert sum(counts) == total == 2000
+    assert matches > 0
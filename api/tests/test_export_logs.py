@@ -0,0 +1,108 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.main import app
+from api.models import Base, Log, get_session_factory, get_read_session_factory
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    app.dependency_overrides[get_session_factory] = lambda: lambda: db_session
+    app.dependency_overrides[get_read_session_factory] = lambda: lambda: db_session
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def setup_logs(db_session: AsyncSession) -> None:
+    now = datetime.utcnow()
+    logs = [
+        Log(user_id=1, command="/test1", timestamp=now - timedelta(days=3), response="Response 1"),
+        Log(user_id=1, command="/test2", timestamp=now - timedelta(days=2), response="Response, with comma"),
+        Log(user_id=2, command="/test3", timestamp=now - timedelta(days=1), response="Response 3"),
+        Log(user_id=1, command="/test4", timestamp=now, response="Response 4"),
+    ]
+    db_session.add_all(logs)
+    await db_session.commit()
+
+
+async def test_export_logs_ndjson(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    logs = [json.loads(line) for line in response.text.splitlines()]
+    assert [log["command"] for log in logs] == ["/test1", "/test2", "/test3", "/test4"]
+    assert set(logs[0]) == {"id", "user_id", "command", "timestamp", "response"}
+
+
+async def test_export_logs_csv(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/export?format=csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "user_id", "command", "timestamp", "response"]
+    assert len(rows) == 5
+    assert rows[2][4] == "Response, with comma"
+
+
+async def test_export_logs_with_filters(client: AsyncClient, setup_logs: None) -> None:
+    start_date = (datetime.utcnow() - timedelta(days=2, hours=1)).isoformat()
+
+    response = await client.get(f"/logs/export?user_id=1&start_date={start_date}")
+    assert response.status_code == 200
+    logs = [json.loads(line) for line in response.text.splitlines()]
+    assert [log["command"] for log in logs] == ["/test2", "/test4"]
+
+
+async def test_export_logs_compressed(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/export?compress=true")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"] == 'attachment; filename="logs.ndjson.gz"'
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert len(lines) == 4
+
+
+async def test_export_logs_empty(client: AsyncClient) -> None:
+    response = await client.get("/logs/export?format=csv")
+    assert response.status_code == 200
+    assert response.text.splitlines() == ["id,user_id,command,timestamp,response"]
+
+
+async def test_export_logs_invalid_format(client: AsyncClient) -> None:
+    response = await client.get("/logs/export?format=xml")
+    assert response.status_code == 422
+    data = response.json()
+    assert data["detail"][0]["loc"] == ["query", "format"]
@@ -0,0 +1,173 @@
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncGenerator, List
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.ingest import IngestBuffer, get_ingest_buffer
+from api.main import app
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+def buffer(db_session: AsyncSession) -> IngestBuffer:
+    return IngestBuffer(
+        lambda: TestingSessionLocal(bind=db_session.bind),
+        max_size=2,
+        batch_size=2,
+        flush_interval=0.01
+    )
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession, buffer: IngestBuffer) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_ingest_buffer] = lambda: buffer
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+def make_row(user_id: int) -> dict:
+    return {"user_id": user_id, "command": "/test", "timestamp": datetime.utcnow(), "response": "Test response"}
+
+
+async def count_logs(db_session: AsyncSession) -> int:
+    return len((await db_session.scalars(select(Log))).all())
+
+
+async def test_add_logs_buffered_accepted(client: AsyncClient, db_session: AsyncSession, buffer: IngestBuffer) -> None:
+    log_data = {
+        "user_id": 1,
+        "command": "/test",
+        "response": "Test response"
+    }
+
+    response = await client.post("/logs/", json=log_data)
+    assert response.status_code == 202
+    assert response.json() == {"detail": "Accepted", "queue_depth": 1}
+    assert await count_logs(db_session) == 0
+
+    await buffer.stop()
+    assert await count_logs(db_session) == 1
+    assert buffer.stats().flushed_rows == 1
+
+
+async def test_add_logs_buffered_queue_full(client: AsyncClient, buffer: IngestBuffer) -> None:
+    log_data = {
+        "user_id": 1,
+        "command": "/test",
+        "response": "Test response"
+    }
+
+    for _ in range(2):
+        assert (await client.post("/logs/", json=log_data)).status_code == 202
+    response = await client.post("/logs/", json=log_data)
+    assert response.status_code == 429
+    assert response.json()["detail"] == "Too Many Requests"
+    assert buffer.stats().rejected == 1
+
+
+async def test_add_logs_direct_mode(client: AsyncClient, buffer: IngestBuffer) -> None:
+    buffer.enabled = False
+    log_data = {
+        "user_id": 1,
+        "command": "/test",
+        "response": "Test response"
+    }
+
+    response = await client.post("/logs/", json=log_data)
+    assert response.status_code == 200
+    assert buffer.stats().accepted == 0
+
+
+async def test_ingest_buffer_group_commit(db_session: AsyncSession) -> None:
+    buffer = IngestBuffer(
+        lambda: TestingSessionLocal(bind=db_session.bind),
+        max_size=10,
+        batch_size=2,
+        flush_interval=0.01
+    )
+    for user_id in range(5):
+        assert buffer.put(make_row(user_id))
+    statements: List[str] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        await buffer.start()
+        for _ in range(100):
+            if buffer.stats().flushed_rows == 5:
+                break
+            await asyncio.sleep(0.01)
+        await buffer.stop()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    stats = buffer.stats()
+    assert stats.flushed_rows == 5
+    assert stats.flushes == 3
+    assert stats.queue_depth == 0
+    assert len([statement for statement in statements if statement.startswith("INSERT INTO logs ")]) == 3
+    assert await count_logs(db_session) == 5
+
+
+async def test_ingest_buffer_flush_error(db_session: AsyncSession) -> None:
+    def broken_session() -> AsyncSession:
+        raise Exception("DB Error")
+
+    buffer = IngestBuffer(broken_session, max_size=10, batch_size=10, flush_interval=0.01)
+    buffer.put(make_row(1))
+
+    await buffer.stop()
+    stats = buffer.stats()
+    assert stats.failed_rows == 1
+    assert stats.flushed_rows == 0
+
+
+async def test_read_ingest_stats(client: AsyncClient, buffer: IngestBuffer) -> None:
+    buffer.put(make_row(1))
+
+    response = await client.get("/logs/ingest/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["enabled"] is True
+    assert data["queue_depth"] == 1
+    assert data["queue_capacity"] == 2
+    assert data["accepted"] == 1
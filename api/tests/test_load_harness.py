@@ -0,0 +1,87 @@
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.benchmarks.load import Sample, parse_mix, percentile, plan_requests, replay, summarize
+from api.main import app
+from api.models import Base, get_db, get_read_db, get_user_read_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+def test_parse_mix() -> None:
+    assert parse_mix("add=1, read_user=2.5") == {"add": 1.0, "read_user": 2.5}
+    for mix in ("add", "delete=1", "add=0,read=0"):
+        with pytest.raises(ValueError):
+            parse_mix(mix)
+
+
+def test_plan_is_reproducible() -> None:
+    plan = plan_requests({"add": 1, "read": 1, "read_user": 1}, rate=50, duration=2, users=10, limit=5, seed=7)
+
+    assert plan == plan_requests({"add": 1, "read": 1, "read_user": 1}, 50, 2, 10, 5, seed=7)
+    assert len(plan) == 100
+    assert [request.due for request in plan[:3]] == [0, 0.02, 0.04]
+    assert {request.operation for request in plan} == {"add", "read", "read_user"}
+    read = next(request for request in plan if request.operation == "read")
+    assert (read.method, read.url, read.body) == ("GET", "/logs/?limit=5", None)
+
+
+def test_summarize_percentiles() -> None:
+    samples = [Sample("read", index / 1000, 200) for index in range(1, 101)] + [Sample("add", 0.5, 500)]
+    results = summarize(samples, elapsed=2)
+
+    assert list(results) == ["all", "add", "read"]
+    assert results["read"] == {
+        "requests": 100, "errors": 0, "throughput": 50.0, "p50_ms": 50.0, "p95_ms": 95.0, "p99_ms": 99.0, "max_ms": 100.0
+    }
+    assert (results["add"]["errors"], results["all"]["requests"]) == (1, 101)
+    assert percentile([1.0], 99) == 1.0
+
+
+async def test_replay_against_app(client: AsyncClient) -> None:
+    plan = plan_requests(parse_mix("add=1,read=1,read_user=1"), rate=200, duration=0.1, users=3, limit=2)
+
+    samples = await replay(client, plan, concurrency=1)
+
+    assert len(samples) == len(plan) == 20
+    assert all(sample.status == 200 and sample.latency >= 0 for sample in samples)
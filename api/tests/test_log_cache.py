@@ -0,0 +1,171 @@
+import time
+from datetime import datetime, timedelta
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.cache import CachedPage, InMemoryLogCache, get_log_cache
+from api.main import app
+from api.routers.utils import Validator
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+def cache() -> InMemoryLogCache:
+    return InMemoryLogCache(ttl=60, max_entries=100, max_bytes=1024 * 1024)
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession, cache: InMemoryLogCache) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_log_cache] = lambda: cache
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def setup_logs(db_session: AsyncSession) -> None:
+    now = datetime.utcnow()
+    logs = [
+        Log(user_id=1, command="/test1", timestamp=now - timedelta(days=2), response="Response 1"),
+        Log(user_id=2, command="/test2", timestamp=now - timedelta(days=1), response="Response 2"),
+        Log(user_id=1, command="/test3", timestamp=now, response="Response 3"),
+    ]
+    db_session.add_all(logs)
+    await db_session.commit()
+
+
+def page(size: int) -> CachedPage:
+    return CachedPage(b"x" * size, None, Validator('W/"test"', None))
+
+
+async def test_read_user_logs_cached(client: AsyncClient, cache: InMemoryLogCache, setup_logs: None) -> None:
+    first = await client.get("/logs/1?limit=1")
+    second = await client.get("/logs/1?limit=1")
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert first.headers["X-Next-Cursor"] == second.headers["X-Next-Cursor"]
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+
+
+async def test_add_logs_invalidates_user(client: AsyncClient, cache: InMemoryLogCache, setup_logs: None) -> None:
+    await client.get("/logs/1")
+    await client.get("/logs/2")
+
+    response = await client.post("/logs/", json={"user_id": 1, "command": "/test4", "response": "Response 4"})
+    assert response.status_code == 200
+    assert cache.stats().entries == 1
+
+    logs = (await client.get("/logs/1")).json()
+    assert [log["command"] for log in logs] == ["/test1", "/test3", "/test4"]
+    await client.get("/logs/2")
+    assert cache.stats().hits == 1
+
+
+async def test_add_logs_batch_invalidates_users(client: AsyncClient, cache: InMemoryLogCache, setup_logs: None) -> None:
+    await client.get("/logs/1")
+    await client.get("/logs/2")
+
+    batch = [{"user_id": 2, "command": "/test4", "response": "Response 4"}]
+    assert (await client.post("/logs/batch", json=batch)).status_code == 200
+    assert cache.stats().entries == 1
+    assert len((await client.get("/logs/2")).json()) == 2
+
+
+async def test_read_cache_stats(client: AsyncClient, setup_logs: None) -> None:
+    await client.get("/logs/1")
+
+    response = await client.get("/logs/cache/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["enabled"] is True
+    assert data["entries"] == 1
+    assert data["misses"] == 1
+    assert data["bytes"] > 0
+
+
+async def test_cache_evicts_least_recently_used() -> None:
+    cache = InMemoryLogCache(ttl=60, max_entries=2, max_bytes=1024)
+    started = time.monotonic()
+    await cache.set((1, "a"), page(10), started)
+    await cache.set((1, "b"), page(10), started)
+    assert await cache.get((1, "a")) is not None
+    await cache.set((2, "c"), page(10), started)
+
+    assert await cache.get((1, "b")) is None
+    assert await cache.get((1, "a")) is not None
+    assert cache.stats().evictions == 1
+
+
+async def test_cache_bounded_by_bytes() -> None:
+    cache = InMemoryLogCache(ttl=60, max_entries=100, max_bytes=25)
+    started = time.monotonic()
+    await cache.set((1, "a"), page(10), started)
+    await cache.set((1, "b"), page(10), started)
+    await cache.set((1, "c"), page(10), started)
+    await cache.set((1, "d"), page(30), started)
+
+    stats = cache.stats()
+    assert (stats.entries, stats.bytes, stats.evictions) == (2, 20, 1)
+
+
+async def test_cache_entries_expire() -> None:
+    cache = InMemoryLogCache(ttl=0, max_entries=100, max_bytes=1024)
+    await cache.set((1, "a"), page(10), time.monotonic())
+
+    assert await cache.get((1, "a")) is None
+    stats = cache.stats()
+    assert (stats.entries, stats.expirations) == (0, 1)
+
+
+async def test_cache_skips_pages_read_before_invalidation() -> None:
+    cache = InMemoryLogCache(ttl=60, max_entries=100, max_bytes=1024)
+    started = time.monotonic()
+    await cache.invalidate_user(1)
+    await cache.set((1, "a"), page(10), started)
+    await cache.set((2, "a"), page(10), started)
+
+    assert await cache.get((1, "a")) is None
+    assert await cache.get((2, "a")) is not None
+
+
+async def test_read_user_logs_cached_etag(client: AsyncClient, cache: InMemoryLogCache, setup_logs: None) -> None:
+    first = await client.get("/logs/1")
+    response = await client.get("/logs/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert cache.stats().hits == 1
@@ -0,0 +1,159 @@
+from datetime import datetime
+from typing import AsyncGenerator, List, Optional
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.archive import LogArchive, archive_partitions, get_log_archive
+from api.main import app
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
+from api.partitions import Partition, drop_partition, rotate_partitions
+from api.routers.utils import QUERY_WARNING_HEADER, LogFilter
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+NOW = datetime(2024, 6, 15)
+# April ends up in the archive, May in a partition and June in `logs`; ids follow the list.
+LOGS = [
+    (1, "/start", datetime(2024, 4, 10)),
+    (2, "/weather Moscow", datetime(2024, 4, 20)),
+    (1, "/weather London", datetime(2024, 5, 5)),
+    (3, "/help", datetime(2024, 5, 25)),
+    (2, "/weather", datetime(2024, 6, 1)),
+    (1, "/start", datetime(2024, 6, 10)),
+]
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+def archive(tmp_path: str) -> LogArchive:
+    return LogArchive(str(tmp_path), segment_rows=1)
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession, archive: LogArchive) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_log_archive] = lambda: archive
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def tiered_logs(db_session: AsyncSession, archive: LogArchive) -> None:
+    db_session.add_all([
+        Log(user_id=user_id, command=command, timestamp=timestamp, response="Response")
+        for user_id, command, timestamp in LOGS
+    ])
+    await db_session.commit()
+
+    def move(session) -> None:
+        connection = session.connection()
+        rotate_partitions(connection, NOW)
+        for name in archive_partitions(connection, archive, NOW, 30):
+            drop_partition(connection, Partition.named(name))
+
+    await db_session.run_sync(move)
+
+
+async def read_ids(client: AsyncClient, url: str) -> List[int]:
+    response = await client.get(url)
+    assert response.status_code == 200, response.text
+    assert QUERY_WARNING_HEADER not in response.headers
+    return [log["id"] for log in response.json()]
+
+
+def test_log_filter_matches() -> None:
+    log = Log(user_id=1, command="/weather Moscow")
+    assert LogFilter(command_prefix="/weather", user_ids=(1, 2)).matches(log)
+    assert not LogFilter(command="/weather").matches(log)
+    assert not LogFilter(exclude_user_ids=(1,)).matches(log)
+    assert not LogFilter().active
+
+
+async def test_filter_by_command(client: AsyncClient, tiered_logs: None) -> None:
+    assert await read_ids(client, "/logs/?command=/start") == [1, 6]
+    assert await read_ids(client, "/logs/?command=/weather") == [5]
+    assert await read_ids(client, "/logs/?command_prefix=/weather") == [2, 3, 5]
+    assert await read_ids(client, "/logs/?command_prefix=/WEATHER") == []
+    assert await read_ids(client, "/logs/?command=/unknown") == []
+
+
+async def test_filter_by_users(client: AsyncClient, tiered_logs: None) -> None:
+    assert await read_ids(client, "/logs/?user_ids=1,3") == [1, 3, 4, 6]
+    assert await read_ids(client, "/logs/?user_ids=2&command_prefix=/weather") == [2, 5]
+    assert await read_ids(client, "/logs/?command_prefix=/weather&exclude_user_ids=1") == [2, 5]
+    assert await read_ids(client, "/logs/?user_ids=1,2&exclude_user_ids=2&start_date=2024-05-01T00:00:00") == [3, 6]
+
+
+async def test_sparse_fields_with_filters(client: AsyncClient, tiered_logs: None) -> None:
+    response = await client.get("/logs/?fields=id,command&command=/start&layout=columns")
+    assert response.json() == {"id": [1, 6], "command": ["/start", "/start"]}
+
+
+async def test_newest_first(client: AsyncClient, tiered_logs: None) -> None:
+    assert await read_ids(client, "/logs/?order=desc") == [6, 5, 4, 3, 2, 1]
+    assert await read_ids(client, "/logs/?order=desc&skip=3&limit=2") == [3, 2]
+    assert await read_ids(client, "/logs/?order=desc&skip=5&limit=2") == [1]
+    assert await read_ids(client, "/logs/?order=desc&user_ids=1") == [6, 3, 1]
+
+    ids: List[int] = []
+    url: Optional[str] = "/logs/?order=desc&limit=2"
+    while url:
+        response = await client.get(url)
+        ids += [log["id"] for log in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/logs/?order=desc&limit=2&cursor={cursor}" if cursor else None
+    assert ids == [6, 5, 4, 3, 2, 1]
+
+
+async def test_unindexed_filter_is_flagged(client: AsyncClient, tiered_logs: None) -> None:
+    response = await client.get("/logs/?exclude_user_ids=1")
+    assert response.status_code == 200
+    assert [log["id"] for log in response.json()] == [2, 4, 5]
+    assert "exclude_user_ids" in response.headers[QUERY_WARNING_HEADER]
+
+    with patch("api.routers.utils.LOG_FILTER_UNINDEXED", "reject"):
+        response = await client.get("/logs/?exclude_user_ids=1")
+        assert response.status_code == 422
+        response = await client.get("/logs/?exclude_user_ids=1&user_ids=2,3")
+        assert response.status_code == 200
+
+
+async def test_invalid_filters(client: AsyncClient, tiered_logs: None) -> None:
+    assert (await client.get("/logs/?user_ids=1,a")).status_code == 422
+    assert (await client.get("/logs/?order=newest")).status_code == 422
+    assert (await client.get("/logs/?q=weather&order=desc")).status_code == 422
+    with patch("api.routers.utils.LOG_FILTER_MAX_USERS", 2):
+        assert (await client.get("/logs/?user_ids=1,2,3")).status_code == 422
+        assert (await client.get("/logs/?exclude_user_ids=1,2,3&user_ids=1")).status_code == 422
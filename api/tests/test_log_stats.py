@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.main import app
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
+from api.rollups import command_name, rebuild_rollups
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def setup_logs(client: AsyncClient) -> None:
+    batch = [
+        {"user_id": 1, "command": "/start", "response": "This bot was created as a test for the BobrAi company."},
+        {"user_id": 1, "command": "/weather Moscow", "response": "Temperature: 7"},
+        {"user_id": 2, "command": "/weather", "response": "City not specified"},
+        {"user_id": 2, "command": "hello", "response": "Unknown command"},
+    ]
+    assert (await client.post("/logs/batch", json=batch)).status_code == 200
+    log = {"user_id": 3, "command": "/weather Tver", "response": "Temperature: 5"}
+    assert (await client.post("/logs/", json=log)).status_code == 200
+
+
+def test_command_name() -> None:
+    assert command_name("/weather Moscow") == "/weather"
+    assert command_name("/start") == "/start"
+    assert command_name("hello there") == ""
+    assert command_name("") == ""
+
+
+async def test_read_log_stats_by_command(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/stats")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"key": "/weather", "bucket": None, "count": 3},
+        {"key": "", "bucket": None, "count": 1},
+        {"key": "/start", "bucket": None, "count": 1},
+    ]
+
+
+async def test_read_log_stats_by_user(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/stats?group_by=user&granularity=hour")
+    assert response.status_code == 200
+    assert {stat["key"]: stat["count"] for stat in response.json()} == {"1": 2, "2": 2, "3": 1}
+
+
+async def test_read_log_stats_per_bucket(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/stats?group_by=total&granularity=hour&per_bucket=true")
+    assert response.status_code == 200
+    stats = response.json()
+    assert sum(stat["count"] for stat in stats) == 5
+    assert all(datetime.fromisoformat(stat["bucket"]).minute == 0 for stat in stats)
+
+
+async def test_read_log_stats_with_key_and_dates(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/stats?key=/weather")
+    assert response.json() == [{"key": "/weather", "bucket": None, "count": 3}]
+
+    start_date = (datetime.utcnow() + timedelta(days=2)).isoformat()
+    response = await client.get(f"/logs/stats?start_date={start_date}")
+    assert response.json() == []
+
+
+async def test_read_log_stats_invalid_group_by(client: AsyncClient) -> None:
+    response = await client.get("/logs/stats?group_by=response")
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["query", "group_by"]
+
+
+async def test_rebuild_rollups(client: AsyncClient, db_session: AsyncSession, setup_logs: None) -> None:
+    now = datetime.utcnow()
+    db_session.add_all([
+        Log(user_id=4, command="/start", timestamp=now - timedelta(days=30), response="Response"),
+        Log(user_id=4, command="/start", timestamp=now - timedelta(days=30), response="Response"),
+    ])
+    await db_session.commit()
+
+    assert await rebuild_rollups(db_session) == 7
+    response = await client.get("/logs/stats?group_by=command&key=/start")
+    assert response.json() == [{"key": "/start", "bucket": None, "count": 3}]
+    response = await client.get("/logs/stats?group_by=user&key=4&per_bucket=true")
+    assert [stat["count"] for stat in response.json()] == [2]
@@ -0,0 +1,152 @@
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from api.main import app
+from api.models import (
+    Base,
+    Log,
+    LogText,
+    get_db,
+    get_text_cache,
+    init_schema,
+    intern_texts,
+    get_read_db,
+    get_user_read_db
+)
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+async def test_add_logs_stores_text_ids(client: AsyncClient, db_session: AsyncSession) -> None:
+    for user_id in (1, 2):
+        response = await client.post("/logs/", json={"user_id": user_id, "command": "/start", "response": "Hello"})
+        assert response.status_code == 200
+        assert response.json()["response"] == "Hello"
+
+    rows = (await db_session.execute(select(Log.__table__.c.command_id, Log.__table__.c.response_id))).all()
+    texts = dict((await db_session.execute(select(LogText.id, LogText.text))).all())  # type: ignore[arg-type]
+    assert [(texts[command_id], texts[response_id]) for command_id, response_id in rows] == [("/start", "Hello")] * 2
+    assert len(texts) == 2
+
+
+async def test_add_logs_batch_shares_texts(client: AsyncClient, db_session: AsyncSession) -> None:
+    batch = [
+        {"user_id": 1, "command": "/weather", "response": "City not specified"},
+        {"user_id": 2, "command": "/weather", "response": "City not specified"},
+        {"user_id": 3, "command": "/start", "response": "City not specified"},
+    ]
+    response = await client.post("/logs/batch", json=batch)
+    assert response.status_code == 200
+
+    assert (await db_session.execute(select(func.count()).select_from(LogText.__table__))).scalar_one() == 3
+    response = await client.get("/logs/")
+    assert [(log["command"], log["response"]) for log in response.json()] == [
+        (item["command"], item["response"]) for item in batch
+    ]
+
+
+def test_text_cache_keeps_committed_ids_only() -> None:
+    sync_engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    Base.metadata.create_all(bind=sync_engine)
+    cache = get_text_cache(sync_engine)
+
+    with sync_engine.connect() as connection:
+        with connection.begin() as transaction:
+            intern_texts(connection, ["Unknown command"])
+            transaction.rollback()
+    assert cache.get("Unknown command") is None
+
+    with sync_engine.begin() as connection:
+        ids = intern_texts(connection, ["Unknown command", "/help"])
+    assert cache.get("Unknown command") == ids["Unknown command"]
+
+    with sync_engine.begin() as connection:
+        assert intern_texts(connection, ["Unknown command"]) == {"Unknown command": ids["Unknown command"]}
+        assert connection.scalar(select(func.count()).select_from(LogText.__table__)) == 2
+    sync_engine.dispose()
+
+
+def test_init_schema_interns_existing_logs() -> None:
+    sync_engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    with sync_engine.begin() as connection:
+        for name in ("logs", "logs_2024_05"):
+            connection.execute(text(
+                f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, user_id INTEGER, command VARCHAR, "
+                "timestamp DATETIME, response VARCHAR)"
+            ))
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {name}_fts USING fts5(command, response, content='{name}', content_rowid='id')"
+            ))
+        connection.execute(text(
+            "INSERT INTO logs_2024_05 (id, user_id, command, timestamp, response) VALUES "
+            "(1, 1, '/weather Moscow', '2024-05-01 00:00:00.000000', 'Moscow: +5°C'), "
+            "(2, 2, '/start', '2024-05-02 00:00:00.000000', 'Hello')"
+        ))
+        connection.execute(text(
+            "INSERT INTO logs (id, user_id, command, timestamp, response) VALUES "
+            "(3, 1, '/start', '2024-06-01 00:00:00.000000', 'Hello')"
+        ))
+
+    init_schema(sync_engine)
+
+    with sync_engine.connect() as connection:
+        for name in ("logs", "logs_2024_05"):
+            columns = {column["name"] for column in inspect(connection).get_columns(name)}
+            assert columns == {"id", "user_id", "command_id", "timestamp", "response_id"}
+        texts = connection.scalars(select(LogText.text))  # type: ignore[arg-type]
+        assert sorted(texts) == ["/start", "/weather Moscow", "Hello", "Moscow: +5°C"]
+        assert connection.execute(text("SELECT rowid FROM logs_fts WHERE logs_fts MATCH 'hello'")).all() == [(3,)]
+        assert connection.execute(
+            text("SELECT rowid FROM logs_2024_05_fts WHERE logs_2024_05_fts MATCH 'moscow'")
+        ).all() == [(1,)]
+
+    with Session(sync_engine) as db:  # type: ignore[attr-defined]
+        db.add(Log(user_id=2, command="/start", response="Hello"))
+        db.commit()
+        assert [(log.id, log.command, log.response) for log in db.scalars(select(Log))] == [
+            (3, "/start", "Hello"), (4, "/start", "Hello")
+        ]
+        assert db.scalar(select(func.count()).select_from(LogText.__table__)) == 4
+    sync_engine.dispose()
@@ -0,0 +1,142 @@
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api import metrics as api_metrics
+from api.main import app
+from api.metrics import Metrics, get_metrics, instrument_engine, statement_operation
+from api.models import Base, get_db, get_read_db, get_read_session_factory, get_user_read_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+def registry(monkeypatch: pytest.MonkeyPatch) -> Metrics:
+    registry = Metrics()
+    monkeypatch.setattr(api_metrics, "metrics", registry)
+    return registry
+
+
+@pytest.fixture(scope="function")
+async def db_session(registry: Metrics) -> AsyncGenerator[AsyncSession, None]:
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    instrument_engine(engine.sync_engine, registry)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await engine.dispose()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession, registry: Metrics) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_read_session_factory] = lambda: lambda: db_session
+    app.dependency_overrides[get_metrics] = lambda: registry
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+async def add_logs(client: AsyncClient, count: int) -> None:
+    for user_id in range(count):
+        response = await client.post("/logs/", json={"user_id": user_id, "command": "/start", "response": "Hello"})
+        assert response.status_code == 200
+
+
+def test_statement_operation() -> None:
+    assert statement_operation("\n  select id FROM logs") == "SELECT"
+    assert statement_operation("INSERT INTO logs VALUES (?)") == "INSERT"
+    assert statement_operation("-- comment\nSELECT 1") == "OTHER"
+    assert statement_operation("") == "OTHER"
+
+
+async def test_requests_are_measured(client: AsyncClient, registry: Metrics) -> None:
+    await add_logs(client, 3)
+    response = await client.get("/logs/?limit=2")
+    assert response.status_code == 200
+
+    assert registry.requests.values[("add_logs", "POST", "200")] == 3
+    assert registry.requests.values[("read_logs", "GET", "200")] == 1
+    assert registry.in_flight.values == {("add_logs",): 0, ("read_logs",): 0}
+    assert registry.request_seconds.count(("read_logs",)) == 1
+    assert registry.response_bytes.series[("read_logs",)][-1] == len(response.content)
+    # A single page of two rows: the bucket `le="1"` is empty, the one for `le="5"` holds it.
+    assert registry.rows.series[("read_logs",)][:3] == [0, 0, 1]
+
+
+async def test_queries_are_attributed_to_routes(client: AsyncClient, registry: Metrics) -> None:
+    await add_logs(client, 1)
+    await client.get("/logs/1")
+
+    assert registry.query_seconds.count(("add_logs", "INSERT")) >= 1
+    assert registry.query_seconds.count(("read_user_logs", "SELECT")) >= 1
+    # The fixture checked the connection out before any request.
+    assert registry.checkout_seconds.count(("background",)) == 1
+    assert registry.query_errors.values == {}
+
+
+async def test_error_statuses(client: AsyncClient, registry: Metrics) -> None:
+    assert (await client.get("/logs/?fields=nope")).status_code == 422
+    assert (await client.get("/logs/?limit=many")).status_code == 422
+
+    assert registry.requests.values == {("read_logs", "GET", "422"): 2}
+    assert registry.in_flight.values == {("read_logs",): 0}
+
+
+async def test_streaming_response_size(client: AsyncClient, registry: Metrics) -> None:
+    await add_logs(client, 2)
+    response = await client.get("/logs/export")
+    assert response.status_code == 200
+
+    assert registry.response_bytes.series[("export_logs",)][-1] == len(response.content)
+    assert registry.query_seconds.count(("export_logs", "SELECT")) >= 1
+
+
+async def test_metrics_endpoint(client: AsyncClient, registry: Metrics) -> None:
+    await add_logs(client, 1)
+    await client.get("/logs/")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE api_request_duration_seconds histogram" in lines
+    assert 'api_requests_total{route="read_logs",method="GET",status="200"} 1' in lines
+    assert 'api_request_duration_seconds_count{route="read_logs"} 1' in lines
+    assert 'api_rows_returned_bucket{route="read_logs",le="1"} 1' in lines
+    assert 'api_rows_returned_bucket{route="read_logs",le="+Inf"} 1' in lines
+    # The metrics endpoint measures nothing itself.
+    assert not any('route="read_metrics"' in line for line in lines)
+
+
+async def test_disabled_metrics(client: AsyncClient, registry: Metrics) -> None:
+    registry.enabled = False
+    await add_logs(client, 1)
+    await client.get("/logs/")
+
+    assert "api_requests_total{" not in registry.render()
+    # Only the schema the fixture created before the metrics were switched off.
+    assert {route for route, operation in registry.query_seconds.series} == {"background"}
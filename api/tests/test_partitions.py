@@ -0,0 +1,259 @@
+import json
+import logging
+from datetime import datetime
+from typing import AsyncGenerator, Generator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import Connection, create_engine, func, inspect, select, text  # type: ignore[attr-defined]
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.main import app
+from api.maintenance import MaintenanceScheduler, maintain
+from api.models import (
+    Base,
+    Log,
+    LogRollup,
+    get_db,
+    get_session_factory,
+    init_schema,
+    intern_logs,
+    get_read_db,
+    get_user_read_db,
+    get_read_session_factory
+)
+from api.partitions import Partition, drop_expired_partitions, list_partitions, log_source, rotate_partitions
+from api.routers.utils import LogFilter, apply_log_filter, filter_logs, paginate_logs
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+NOW = datetime(2024, 6, 15)
+TIMESTAMPS = [
+    datetime(2024, 4, 10),
+    datetime(2024, 4, 20),
+    datetime(2024, 5, 5),
+    datetime(2024, 5, 25),
+    datetime(2024, 6, 1),
+    datetime(2024, 6, 10),
+]
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+def make_logs() -> list:
+    return [
+        Log(user_id=index % 2, command=f"/weather City{index}", timestamp=timestamp,
+            response="Error: weather service unavailable" if index in (1, 5) else "Temperature: 7")
+        for index, timestamp in enumerate(TIMESTAMPS)
+    ]
+
+
+@pytest.fixture(scope="function")
+def connection() -> Generator[Connection, None, None]:
+    sync_engine = create_engine("sqlite:///:memory:")
+    init_schema(sync_engine)
+    with sync_engine.connect() as connection:
+        connection.execute(Log.__table__.insert(), intern_logs(connection, [
+            {"user_id": 1, "command": "/start", "timestamp": timestamp, "response": "Hello"}
+            for timestamp in TIMESTAMPS
+        ]))
+        yield connection
+    sync_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: lambda: db_session
+    app.dependency_overrides[get_read_session_factory] = lambda: lambda: db_session
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def partitioned_logs(db_session: AsyncSession) -> None:
+    db_session.add_all(make_logs())
+    await db_session.commit()
+    rotated = await db_session.run_sync(lambda session: rotate_partitions(session.connection(), NOW))
+    assert rotated == ["logs_2024_04", "logs_2024_05"]
+
+
+def test_rotate_partitions_moves_closed_months(connection: Connection) -> None:
+    assert rotate_partitions(connection, NOW) == ["logs_2024_04", "logs_2024_05"]
+    assert rotate_partitions(connection, NOW) == []
+
+    assert [partition.name for partition in list_partitions(connection)] == ["logs_2024_04", "logs_2024_05"]
+    assert connection.scalar(select(func.count()).select_from(Log.__table__)) == 2
+    assert connection.scalar(select(func.count()).select_from(Partition.for_month(NOW.replace(month=4)).table)) == 2
+    matches = connection.execute(text("SELECT rowid FROM logs_2024_05_fts WHERE logs_2024_05_fts MATCH 'hello'")).all()
+    assert sorted(matches) == [(3,), (4,)]
+
+
+def test_rotate_partitions_without_logs() -> None:
+    sync_engine = create_engine("sqlite:///:memory:")
+    init_schema(sync_engine)
+    with sync_engine.begin() as connection:
+        assert rotate_partitions(connection, NOW) == []
+    sync_engine.dispose()
+
+
+def test_rotate_partitions_keeps_newest_log(connection: Connection) -> None:
+    assert rotate_partitions(connection, datetime(2024, 8, 1)) == ["logs_2024_04", "logs_2024_05", "logs_2024_06"]
+    assert connection.execute(select(Log.id, Log.timestamp)).all() == [(6, TIMESTAMPS[-1])]  # type: ignore[arg-type]
+
+
+def test_list_partitions_prunes_by_date(connection: Connection) -> None:
+    rotate_partitions(connection, NOW)
+    partitions = list_partitions(connection, datetime(2024, 5, 1), datetime(2024, 6, 30))
+    assert [partition.name for partition in partitions] == ["logs_2024_05"]
+    assert list_partitions(connection, datetime(2024, 6, 1)) == []
+
+
+def test_drop_expired_partitions(connection: Connection) -> None:
+    rotate_partitions(connection, NOW)
+    connection.execute(LogRollup.__table__.insert(), [
+        {"granularity": "day", "dimension": "total", "bucket": timestamp, "key": "", "count": 1}
+        for timestamp in TIMESTAMPS
+    ])
+
+    assert drop_expired_partitions(connection, NOW, 30) == ["logs_2024_04"]
+
+    tables = inspect(connection).get_table_names()
+    assert "logs_2024_04" not in tables and "logs_2024_04_fts" not in tables
+    assert "logs_2024_05" in tables
+    assert connection.scalar(select(func.min(LogRollup.bucket))) == datetime(2024, 5, 5)
+
+
+def test_partitioned_query_plans_use_index(connection: Connection) -> None:
+    rotate_partitions(connection, NOW)
+    source = log_source(list_partitions(connection), "", "sqlite")
+    query = select(source).where(source.user_id == 1)
+    query = paginate_logs(filter_logs(query, datetime(2024, 4, 15), None, source), 0, 10, None, source)
+    compiled = query.compile(dialect=connection.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()]
+
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+    for name in ("logs_2024_04", "logs_2024_05", "logs"):
+        assert any(f"ix_{name}_user_id_timestamp" in step for step in plan), plan
+
+
+def test_partitioned_command_filter_uses_index(connection: Connection) -> None:
+    rotate_partitions(connection, NOW)
+    source = log_source(list_partitions(connection), "", "sqlite")
+    query = apply_log_filter(select(source), LogFilter(command="/start"), "sqlite", source)
+    query = paginate_logs(query, 0, 10, None, source, descending=True)
+    compiled = query.compile(dialect=connection.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()]
+
+    for name in ("logs_2024_04", "logs_2024_05", "logs"):
+        assert any(f"ix_{name}_command_id_timestamp" in step for step in plan), plan
+    assert [row.id for row in connection.execute(query)] == [6, 5, 4, 3, 2, 1]
+
+
+async def test_read_logs_across_partitions(client: AsyncClient, partitioned_logs: None) -> None:
+    response = await client.get("/logs/?limit=4")
+    assert response.status_code == 200
+    assert [log["timestamp"] for log in response.json()] == [t.isoformat() for t in TIMESTAMPS[:4]]
+
+    response = await client.get(f"/logs/?limit=4&cursor={response.headers['X-Next-Cursor']}")
+    assert [log["timestamp"] for log in response.json()] == [t.isoformat() for t in TIMESTAMPS[4:]]
+
+
+async def test_read_logs_date_range_in_partition(client: AsyncClient, partitioned_logs: None) -> None:
+    response = await client.get("/logs/?start_date=2024-05-01T00:00:00&end_date=2024-05-31T00:00:00")
+    assert response.status_code == 200
+    assert [log["timestamp"] for log in response.json()] == [t.isoformat() for t in TIMESTAMPS[2:4]]
+
+
+async def test_read_user_logs_across_partitions(client: AsyncClient, partitioned_logs: None) -> None:
+    response = await client.get("/logs/1")
+    assert response.status_code == 200
+    assert [log["command"] for log in response.json()] == ["/weather City1", "/weather City3", "/weather City5"]
+
+
+async def test_search_logs_across_partitions(client: AsyncClient, partitioned_logs: None) -> None:
+    response = await client.get("/logs/?q=unavailable")
+    assert response.status_code == 200
+    assert sorted(log["command"] for log in response.json()) == ["/weather City1", "/weather City5"]
+
+
+async def test_export_logs_across_partitions(client: AsyncClient, partitioned_logs: None) -> None:
+    response = await client.get("/logs/export")
+    assert response.status_code == 200
+    assert [json.loads(line)["timestamp"] for line in response.text.splitlines()] == [t.isoformat() for t in TIMESTAMPS]
+
+
+async def test_maintain_rotates_and_analyzes() -> None:
+    maintenance_engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=StaticPool)
+    async with maintenance_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(Log.__table__.insert(), await connection.run_sync(intern_logs, [
+            {"user_id": 1, "command": "/start", "timestamp": timestamp, "response": "Hello"}
+            for timestamp in TIMESTAMPS
+        ]))
+
+    result = await maintain(maintenance_engine, NOW, retention_days=30, vacuum_free_ratio=0.0)
+
+    assert result.rotated == ["logs_2024_04", "logs_2024_05"]
+    assert result.dropped == ["logs_2024_04"]
+    assert result.analyzed and result.vacuumed
+    await maintenance_engine.dispose()
+
+
+async def test_maintenance_scheduler_waits_for_idle() -> None:
+    scheduler = MaintenanceScheduler(engine, interval=3600, idle=60, retention_days=0, vacuum_free_ratio=1.0)
+    scheduler.last_activity -= 120
+    assert scheduler.is_due()
+
+    scheduler.touch()
+    assert not scheduler.is_due()
+
+    scheduler.last_activity -= 120
+    scheduler.last_run = scheduler.last_activity
+    assert not scheduler.is_due()
+
+
+async def test_maintenance_scheduler_reports_run(caplog: pytest.LogCaptureFixture) -> None:
+    maintenance_engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=StaticPool)
+    async with maintenance_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    scheduler = MaintenanceScheduler(maintenance_engine, interval=3600, idle=60, retention_days=0, vacuum_free_ratio=1.0)
+
+    # uvicorn runs its own loggers at INFO and leaves the root logger at WARNING.
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        assert await scheduler.run_once(NOW) is not None
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "Log storage maintenance: rotated [], archived [], dropped [], analyzed False, vacuumed False"
+    ]
+    await maintenance_engine.dispose()
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+from itertools import product
+from typing import Any, Generator, List, Optional
+
+import pytest
+from sqlalchemy import Connection, Select, create_engine, inspect, select, text  # type: ignore[attr-defined]
+from sqlalchemy.orm import Session
+
+from api.models import Log, init_schema
+from api.partitions import Partition, create_partition, list_partitions, log_source
+from api.routers.utils import (
+    LogFilter,
+    apply_log_filter,
+    filter_logs,
+    paginate_logs,
+    read_validator,
+    search_logs
+)
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+
+NOW = datetime(2024, 6, 1)
+DATES = [None, NOW - timedelta(days=7)]
+CURSORS = [None, (NOW - timedelta(days=1), 42)]
+
+
+@pytest.fixture(scope="function")
+def connection() -> Generator[Connection, None, None]:
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    init_schema(engine)
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+def explain(connection: Connection, query: Select) -> List[str]:
+    compiled = query.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+
+def assert_indexed(plan: List[str]) -> None:
+    for step in plan:
+        assert not (step.startswith("SCAN logs") and "INDEX" not in step), plan
+        assert "TEMP B-TREE" not in step, plan
+
+
+def log_queries(user_id: Optional[int]) -> Generator[Select, None, None]:
+    for start_date, end_date, cursor in product(DATES, [None, NOW], CURSORS):
+        query = select(Log) if user_id is None else select(Log).where(Log.user_id == user_id)
+        query = filter_logs(query, start_date, end_date)
+        yield paginate_logs(query, 0, 10, cursor)
+
+
+def test_read_logs_query_plans_use_index(connection: Connection) -> None:
+    for query in log_queries(None):
+        assert_indexed(explain(connection, query))
+
+
+def test_read_user_logs_query_plans_use_index(connection: Connection) -> None:
+    for query in log_queries(1):
+        plan = explain(connection, query)
+        assert_indexed(plan)
+        assert any("ix_logs_user_id_timestamp" in step for step in plan), plan
+
+
+def filtered_queries(log_filter: LogFilter) -> Generator[Select, None, None]:
+    for start_date, cursor, descending in product(DATES, CURSORS, [False, True]):
+        query = apply_log_filter(filter_logs(select(Log), start_date, None), log_filter, "sqlite")
+        yield paginate_logs(query, 0, 10, cursor, descending=descending)
+
+
+def test_command_filter_query_plans_use_index(connection: Connection) -> None:
+    for query in filtered_queries(LogFilter(command="/start", exclude_user_ids=(1,))):
+        plan = explain(connection, query)
+        assert_indexed(plan)
+        assert any("ix_logs_command_id_timestamp" in step for step in plan), plan
+
+
+def test_command_prefix_query_plans_use_index(connection: Connection) -> None:
+    for query in filtered_queries(LogFilter(command_prefix="/weather")):
+        plan = explain(connection, query)
+        assert any("sqlite_autoindex_log_texts_1 (text>? AND text<?)" in step for step in plan), plan
+        assert not any(step.startswith("SCAN logs") and "INDEX" not in step for step in plan), plan
+
+
+def test_newest_first_query_plans_use_index(connection: Connection) -> None:
+    for user_id in (None, 1):
+        for query in filtered_queries(LogFilter()):
+            if user_id is not None:
+                query = query.where(Log.user_id == user_id)
+            assert_indexed(explain(connection, query))
+
+
+def test_search_query_plans_are_driven_by_the_full_text_index(connection: Connection) -> None:
+    for month in (datetime(2024, 4, 1), datetime(2024, 5, 1)):
+        create_partition(connection, Partition.for_month(month))
+    # Statistics of a large table with a few logs per user, as `ANALYZE` reports them in production.
+    connection.exec_driver_sql("ANALYZE")
+    for name in ("logs", "logs_2024_04", "logs_2024_05"):
+        connection.exec_driver_sql(
+            "INSERT OR REPLACE INTO sqlite_stat1 VALUES (?, ?, '500000 5 1')", (name, f"ix_{name}_user_id_timestamp")
+        )
+    connection.exec_driver_sql("ANALYZE sqlite_schema")
+
+    for partitions, user_id in product((list_partitions(connection), []), (None, 1)):
+        source = log_source(partitions, "weather", "sqlite")
+        query = select(source) if user_id is None else select(source).where(source.user_id == user_id)
+        plan = explain(connection, paginate_logs(search_logs(query, "weather", "sqlite", source), 0, 10, None, source))
+        scans = [step for step in plan if "VIRTUAL TABLE" in step]
+        assert len(scans) == len(partitions) + 1, plan
+        # `=M` would be a full-text query, ranked again, for every log of the user.
+        assert all("INDEX 0:M" in step for step in scans), plan
+
+
+class ExplainingSession:
+    """
+    Stands in for the session of `read_validator`: records the plan of each statement and the number
+    of SQLite virtual machine steps it took to run.
+    """
+
+    def __init__(self, connection: Connection) -> None:
+        self.connection = connection
+        self.plans: List[List[str]] = []
+        self.steps: List[int] = []
+
+    async def execute(self, query: Select) -> Any:
+        self.plans.append(explain(self.connection, query))
+        steps = [0]
+
+        def count() -> int:
+            steps[0] += 1
+            return 0
+
+        driver_connection = self.connection.connection.driver_connection
+        driver_connection.set_progress_handler(count, 1)
+        try:
+            result = self.connection.execute(query)
+        finally:
+            driver_connection.set_progress_handler(None, 1)
+        self.steps.append(steps[0])
+        return result
+
+
+async def validator_steps(connection: Connection) -> List[int]:
+    session = ExplainingSession(connection)
+    for user_id, log_filter in product((None, 1), (LogFilter(), LogFilter(command="/start"))):
+        for start_date, end_date in product(DATES, [None, NOW]):
+            query = select(Log) if user_id is None else select(Log).where(Log.user_id == user_id)
+            query = apply_log_filter(filter_logs(query, start_date, end_date), log_filter, "sqlite")
+            await read_validator(session, query, ())  # type: ignore[arg-type]
+    for plan in session.plans:
+        assert_indexed(plan)
+    return session.steps
+
+
+async def test_validator_reads_a_bounded_number_of_rows(connection: Connection) -> None:
+    session = Session(bind=connection)
+    session.add(Log(user_id=1, command="/start", timestamp=NOW - timedelta(days=1), response="Hello"))
+    session.flush()
+    few = await validator_steps(connection)
+
+    session.add_all([
+        Log(user_id=index % 3, command="/start", timestamp=NOW - timedelta(days=1), response="Hello")
+        for index in range(2000)
+    ])
+    session.flush()
+    assert await validator_steps(connection) == few
+    session.close()
+
+
+def test_init_schema_migrates_existing_database() -> None:
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE logs (id INTEGER PRIMARY KEY, user_id INTEGER, command VARCHAR, "
+            "timestamp DATETIME, response VARCHAR)"
+        ))
+        connection.execute(text("CREATE INDEX ix_logs_user_id ON logs (user_id)"))
+
+    init_schema(engine)
+    init_schema(engine)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("logs")}
+    assert {"ix_logs_user_id_timestamp", "ix_logs_command_id_timestamp", "ix_logs_timestamp"} <= indexes
+    assert "ix_logs_user_id" not in indexes
+    engine.dispose()
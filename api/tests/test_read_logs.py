@@ -1,67 +1,67 @@
 from datetime import datetime, timedelta
-from typing import Generator
+from typing import AsyncGenerator
 from unittest.mock import patch
 
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
 from api.main import app
-from api.models import Base, Log, get_db
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
-TestingSessionLocal = sessionmaker(
-    autocommit=False, autoflush=False, bind=engine
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
 )
 
-Base.metadata.create_all(bind=engine)
-
 
 @pytest.fixture(scope="function")
-def db_session() -> Generator[Session, None, None]:
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
-    try:
-        yield session
-    finally:
-        session.close()
-        transaction.rollback()
-        connection.close()
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
 
 
 @pytest.fixture(scope="function")
-def client(db_session: Session) -> Generator[TestClient, None, None]:
-    def override_get_db() -> Generator[Session, None, None]:
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
         try:
             yield db_session
         finally:
             pass
 
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         yield c
     app.dependency_overrides.clear()
 
 
 @pytest.fixture
-def setup_logs(db_session: Session) -> None:
+async def setup_logs(db_session: AsyncSession) -> None:
     logs = [
         Log(user_id=1, command="/test1", timestamp=datetime.utcnow() - timedelta(days=2), response="Response 1"),
         Log(user_id=2, command="/test2", timestamp=datetime.utcnow() - timedelta(days=1), response="Response 2"),
         Log(user_id=3, command="/test3", timestamp=datetime.utcnow(), response="Response 3")
     ]
     db_session.add_all(logs)
-    db_session.commit()
+    await db_session.commit()
 
 
-def test_read_logs_all(client: TestClient, setup_logs: None) -> None:
-    response = client.get("/logs/")
+async def test_read_logs_all(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/")
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) == 3
@@ -69,19 +69,19 @@ def test_read_logs_all(client: TestClient, setup_logs: None) -> None:
     assert all(isinstance(log, dict) for log in logs)
 
 
-def test_read_logs_with_skip_and_limit(client: TestClient, setup_logs: None) -> None:
-    response = client.get("/logs/?skip=1&limit=1")
+async def test_read_logs_with_skip_and_limit(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?skip=1&limit=1")
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) == 1
     assert logs[0]["command"] == "/test2"
 
 
-def test_read_logs_with_date_filter(client: TestClient, setup_logs: None) -> None:
+async def test_read_logs_with_date_filter(client: AsyncClient, setup_logs: None) -> None:
     start_date = (datetime.utcnow() - timedelta(days=1, hours=2)).isoformat()
     end_date = datetime.utcnow().isoformat()
 
-    response = client.get(f"/logs/?start_date={start_date}&end_date={end_date}")
+    response = await client.get(f"/logs/?start_date={start_date}&end_date={end_date}")
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) == 2
@@ -89,8 +89,8 @@ def test_read_logs_with_date_filter(client: TestClient, setup_logs: None) -> Non
     assert logs[1]["command"] == "/test3"
 
 
-def test_read_logs_with_invalid_date_format(client: TestClient, setup_logs: None) -> None:
-    response = client.get("/logs/?start_date=invalid-date")
+async def test_read_logs_with_invalid_date_format(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?start_date=invalid-date")
     assert response.status_code == 422
     data = response.json()
     assert data["detail"][0]["loc"] == ["query", "start_date"]
@@ -98,9 +98,118 @@ def test_read_logs_with_invalid_date_format(client: TestClient, setup_logs: None
     assert data["detail"][0]["type"] == "datetime_from_date_parsing"
 
 
-def test_read_user_logs_db_error(client: TestClient, db_session: Session, setup_logs: None) -> None:
-    with patch.object(db_session, "query", side_effect=Exception("DB Error")):
-        response = client.get(f"/logs/")
+async def test_read_user_logs_db_error(client: AsyncClient, db_session: AsyncSession, setup_logs: None) -> None:
+    with patch.object(db_session, "scalars", side_effect=Exception("DB Error")):
+        response = await client.get(f"/logs/")
+        assert response.status_code == 500
+        data = response.json()
+        assert data["detail"] == "Internal Server Error"
+
+
+async def test_read_logs_with_cursor(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?limit=2")
+    assert response.status_code == 200
+    assert [log["command"] for log in response.json()] == ["/test1", "/test2"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await client.get(f"/logs/?limit=2&cursor={cursor}")
+    assert response.status_code == 200
+    assert [log["command"] for log in response.json()] == ["/test3"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_read_logs_cursor_same_timestamp(client: AsyncClient, db_session: AsyncSession) -> None:
+    timestamp = datetime.utcnow()
+    db_session.add_all([
+        Log(user_id=1, command=f"/test{index}", timestamp=timestamp, response="Response") for index in range(3)
+    ])
+    await db_session.commit()
+
+    response = await client.get("/logs/?limit=1")
+    commands = [response.json()[0]["command"]]
+    while "X-Next-Cursor" in response.headers:
+        response = await client.get(f"/logs/?limit=1&cursor={response.headers['X-Next-Cursor']}")
+        commands.extend(log["command"] for log in response.json())
+    assert commands == ["/test0", "/test1", "/test2"]
+
+
+async def test_read_logs_with_invalid_cursor(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?cursor=not-a-cursor")
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+async def test_read_logs_fast_json_matches_schema(
+        client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_session.add_all([
+        Log(user_id=1, command="/start", timestamp=datetime(2024, 4, 27, 12, 34, 56), response="Response 1"),
+        Log(user_id=2, command="/weather Москва", timestamp=datetime(2024, 4, 27, 12, 34, 56, 120),
+            response="Temperature: 7\nFeels like: 4 \"cloudy\""),
+        Log(user_id=2 ** 40, command="/test", timestamp=datetime(2024, 4, 28, 9, 15, 30, 500000), response=""),
+    ])
+    await db_session.commit()
+
+    for url in ("/logs/?limit=3", "/logs/?limit=2", "/logs/2?limit=5"):
+        expected = await client.get(url)
+        monkeypatch.setattr("api.routers.logs.read_logs.LOG_FAST_JSON", True)
+        monkeypatch.setattr("api.routers.logs.read_user_logs.LOG_FAST_JSON", True)
+        response = await client.get(url)
+        monkeypatch.undo()
+
+        assert response.status_code == expected.status_code == 200
+        assert response.content == expected.content
+        assert response.headers["content-type"] == expected.headers["content-type"]
+        assert response.headers.get("X-Next-Cursor") == expected.headers.get("X-Next-Cursor")
+
+
+async def test_read_logs_fast_json_db_error(
+        client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("api.routers.logs.read_logs.LOG_FAST_JSON", True)
+    with patch.object(db_session, "execute", side_effect=Exception("DB Error")):
+        response = await client.get("/logs/")
         assert response.status_code == 500
         data = response.json()
-        assert data["detail"] == "Internal Server Error"
\ No newline at end of file
+        assert data["detail"] == "Internal Server Error"
+
+
+async def test_read_logs_etag_not_modified(client: AsyncClient, db_session: AsyncSession, setup_logs: None) -> None:
+    response = await client.get("/logs/")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    with patch.object(db_session, "scalars", side_effect=Exception("Rows must not be loaded")):
+        response = await client.get("/logs/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+async def test_read_logs_etag_changes_after_write(
+        client: AsyncClient, db_session: AsyncSession, setup_logs: None
+) -> None:
+    etag = (await client.get("/logs/")).headers["ETag"]
+    db_session.add(Log(user_id=4, command="/test4", timestamp=datetime.utcnow(), response="Response 4"))
+    await db_session.commit()
+
+    response = await client.get("/logs/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 4
+
+
+async def test_read_logs_etag_depends_on_page(client: AsyncClient, setup_logs: None) -> None:
+    first = await client.get("/logs/?limit=1")
+    second = await client.get("/logs/?limit=1&skip=1")
+    assert first.headers["ETag"] != second.headers["ETag"]
+
+
+async def test_read_logs_if_modified_since(client: AsyncClient, setup_logs: None) -> None:
+    last_modified = (await client.get("/logs/")).headers["Last-Modified"]
+
+    response = await client.get("/logs/", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    response = await client.get("/logs/", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert response.status_code == 200
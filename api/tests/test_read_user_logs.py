@@ -1,56 +1,56 @@
 from datetime import datetime, timedelta
-from typing import Generator
+from typing import AsyncGenerator
 from unittest.mock import patch
 
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
 from api.main import app
-from api.models import Base, Log, get_db
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
-TestingSessionLocal = sessionmaker(
-    autocommit=False, autoflush=False, bind=engine
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
 )
 
-Base.metadata.create_all(bind=engine)
-
 
 @pytest.fixture(scope="function")
-def db_session() -> Generator[Session, None, None]:
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
-    try:
-        yield session
-    finally:
-        session.close()
-        transaction.rollback()
-        connection.close()
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
 
 
 @pytest.fixture(scope="function")
-def client(db_session: Session) -> Generator[TestClient, None, None]:
-    def override_get_db() -> Generator[Session, None, None]:
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
         try:
             yield db_session
         finally:
             pass
 
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         yield c
     app.dependency_overrides.clear()
 
 
 @pytest.fixture
-def setup_logs(db_session: Session) -> None:
+async def setup_logs(db_session: AsyncSession) -> None:
     now = datetime.utcnow()
     logs = [
         Log(user_id=1, command="/test1", timestamp=now - timedelta(days=3), response="Response 1"),
@@ -59,12 +59,12 @@ def setup_logs(db_session: Session) -> None:
         Log(user_id=1, command="/test4", timestamp=now, response="Response 4"),
     ]
     db_session.add_all(logs)
-    db_session.commit()
+    await db_session.commit()
 
 
-def test_read_user_logs_all(client: TestClient, setup_logs: None) -> None:
+async def test_read_user_logs_all(client: AsyncClient, setup_logs: None) -> None:
     user_id = 1
-    response = client.get(f"/logs/{user_id}")
+    response = await client.get(f"/logs/{user_id}")
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) == 3
@@ -72,21 +72,21 @@ def test_read_user_logs_all(client: TestClient, setup_logs: None) -> None:
     assert all(log["user_id"] == user_id for log in logs)
 
 
-def test_read_user_logs_with_skip_and_limit(client: TestClient, setup_logs: None) -> None:
+async def test_read_user_logs_with_skip_and_limit(client: AsyncClient, setup_logs: None) -> None:
     user_id = 1
-    response = client.get(f"/logs/{user_id}?skip=1&limit=1")
+    response = await client.get(f"/logs/{user_id}?skip=1&limit=1")
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) == 1
     assert logs[0]["command"] == "/test2"
 
 
-def test_read_user_logs_with_date_filter(client: TestClient, setup_logs: None) -> None:
+async def test_read_user_logs_with_date_filter(client: AsyncClient, setup_logs: None) -> None:
     user_id = 1
     start_date = (datetime.utcnow() - timedelta(days=2, hours=1)).isoformat()
     end_date = datetime.utcnow().isoformat()
 
-    response = client.get(f"/logs/{user_id}?start_date={start_date}&end_date={end_date}")
+    response = await client.get(f"/logs/{user_id}?start_date={start_date}&end_date={end_date}")
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) == 2
@@ -94,9 +94,9 @@ def test_read_user_logs_with_date_filter(client: TestClient, setup_logs: None) -
     assert logs[1]["command"] == "/test4"
 
 
-def test_read_user_logs_with_invalid_date_format(client: TestClient, setup_logs: None) -> None:
+async def test_read_user_logs_with_invalid_date_format(client: AsyncClient, setup_logs: None) -> None:
     user_id = 1
-    response = client.get(f"/logs/{user_id}?start_date=invalid-date")
+    response = await client.get(f"/logs/{user_id}?start_date=invalid-date")
     assert response.status_code == 422
     data = response.json()
     assert data["detail"][0]["loc"] == ["query", "start_date"]
@@ -104,16 +104,16 @@ def test_read_user_logs_with_invalid_date_format(client: TestClient, setup_logs:
     assert data["detail"][0]["type"] == "datetime_from_date_parsing"
 
 
-def test_read_user_logs_no_logs(client: TestClient, setup_logs: None) -> None:
+async def test_read_user_logs_no_logs(client: AsyncClient, setup_logs: None) -> None:
     user_id = 3
-    response = client.get(f"/logs/{user_id}")
+    response = await client.get(f"/logs/{user_id}")
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) == 0
 
 
-def test_read_user_logs_invalid_user_id(client: TestClient, setup_logs: None) -> None:
-    response = client.get("/logs/not-an-integer")
+async def test_read_user_logs_invalid_user_id(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/not-an-integer")
     assert response.status_code == 422
     data = response.json()
     assert data["detail"][0]["loc"] == ['path', 'user_id']
@@ -121,10 +121,59 @@ def test_read_user_logs_invalid_user_id(client: TestClient, setup_logs: None) ->
     assert data["detail"][0]["type"] == "int_parsing"
 
 
-def test_read_user_logs_db_error(client: TestClient, db_session: Session, setup_logs: None) -> None:
+async def test_read_user_logs_db_error(client: AsyncClient, db_session: AsyncSession, setup_logs: None) -> None:
     user_id = 1
-    with patch.object(db_session, "query", side_effect=Exception("DB Error")):
-        response = client.get(f"/logs/{user_id}")
+    with patch.object(db_session, "scalars", side_effect=Exception("DB Error")):
+        response = await client.get(f"/logs/{user_id}")
         assert response.status_code == 500
         data = response.json()
         assert data["detail"] == "Internal Server Error"
+
+
+async def test_read_user_logs_with_cursor(client: AsyncClient, setup_logs: None) -> None:
+    user_id = 1
+    response = await client.get(f"/logs/{user_id}?limit=2")
+    assert response.status_code == 200
+    assert [log["command"] for log in response.json()] == ["/test1", "/test2"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await client.get(f"/logs/{user_id}?limit=2&cursor={cursor}")
+    assert response.status_code == 200
+    assert [log["command"] for log in response.json()] == ["/test4"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_read_user_logs_with_invalid_cursor(client: AsyncClient, setup_logs: None) -> None:
+    user_id = 1
+    response = await client.get(f"/logs/{user_id}?cursor=not-a-cursor")
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+async def test_read_user_logs_etag_not_modified(
+        client: AsyncClient, db_session: AsyncSession, setup_logs: None
+) -> None:
+    user_id = 1
+    etag = (await client.get(f"/logs/{user_id}")).headers["ETag"]
+
+    with patch.object(db_session, "scalars", side_effect=Exception("Rows must not be loaded")):
+        response = await client.get(f"/logs/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    db_session.add(Log(user_id=2, command="/test5", timestamp=datetime.utcnow(), response="Response 5"))
+    await db_session.commit()
+    response = await client.get(f"/logs/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    db_session.add(Log(user_id=user_id, command="/test6", timestamp=datetime.utcnow(), response="Response 6"))
+    await db_session.commit()
+    response = await client.get(f"/logs/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_read_user_logs_no_logs_etag(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/3")
+    assert response.status_code == 200
+    assert "ETag" in response.headers
+    assert "Last-Modified" not in response.headers
@@ -0,0 +1,209 @@
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, List, Optional
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.main import app
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
+from api.recent import RecentLog, RecentLogs, get_recent_logs
+from api.routers.utils import NEXT_CURSOR_HEADER, decode_cursor
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+STARTED = datetime(2024, 6, 1)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+def recent() -> RecentLogs:
+    return RecentLogs(size=3)
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession, recent: RecentLogs) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_recent_logs] = lambda: recent
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+def make_log(log_id: int, user_id: int, minutes: int) -> RecentLog:
+    return RecentLog(log_id, user_id, "/start", STARTED + timedelta(minutes=minutes), "Hello")
+
+
+def page_ids(page: Optional[List[RecentLog]]) -> List[int]:
+    assert page is not None
+    return [log.id for log in page]
+
+
+def test_buffer_evicts_oldest(recent: RecentLogs) -> None:
+    recent.load([])
+    recent.add([make_log(log_id, log_id % 2, log_id)._asdict() for log_id in range(1, 6)])
+
+    assert [log.id for log in recent._logs] == [3, 4, 5]
+    assert recent.floor == (STARTED + timedelta(minutes=3), 3)
+    assert {user_id: [log.id for log in logs] for user_id, logs in recent._user_logs.items()} == {1: [3, 5], 0: [4]}
+
+
+def test_buffer_orders_late_logs(recent: RecentLogs) -> None:
+    recent.load([make_log(1, 1, 10), make_log(2, 1, 20)])
+    # A queued log whose timestamp falls between buffered ones, and one older than the floor.
+    recent.add([make_log(3, 2, 15)._asdict(), make_log(4, 2, 5)._asdict()])
+
+    assert [log.id for log in recent._logs] == [1, 3, 2]
+    assert [log.id for log in recent._user_logs[2]] == [3]
+
+
+def test_page_only_inside_buffer(recent: RecentLogs) -> None:
+    recent.load([make_log(log_id, 1, log_id) for log_id in range(1, 5)])
+    floor = recent.floor
+    assert floor == (STARTED + timedelta(minutes=2), 2)
+
+    assert recent.page(None, None, None, None, 0, 10) is None
+    assert recent.page(None, None, None, (STARTED + timedelta(minutes=1), 1), 0, 10) is None
+    assert recent.page(None, STARTED + timedelta(minutes=2), None, None, 0, 10) is None
+
+    assert page_ids(recent.page(None, None, None, floor, 0, 10)) == [3, 4]
+    assert page_ids(recent.page(1, STARTED + timedelta(minutes=2, seconds=1), None, None, 0, 1)) == [3]
+    assert page_ids(recent.page(None, None, STARTED + timedelta(minutes=3), floor, 0, 10)) == [3]
+    assert recent.page(2, None, None, floor, 0, 10) == []
+    assert (recent.hits, recent.misses) == (4, 3)
+
+
+def test_newest_page_inside_buffer(recent: RecentLogs) -> None:
+    recent.load([make_log(log_id, log_id % 2, log_id) for log_id in range(1, 5)])
+
+    assert page_ids(recent.page(None, None, None, None, 0, 2, True)) == [4, 3]
+    assert page_ids(recent.page(None, None, None, None, 1, 2, True)) == [3, 2]
+    assert page_ids(recent.page(None, None, None, (STARTED + timedelta(minutes=4), 4), 0, 2, True)) == [3, 2]
+    assert page_ids(recent.page(None, None, STARTED + timedelta(minutes=3), None, 0, 1, True)) == [3]
+    assert page_ids(recent.page(0, STARTED + timedelta(minutes=2, seconds=1), None, None, 0, 10, True)) == [4]
+    # Pages that would continue below the floor are read from the database.
+    assert recent.page(None, None, None, None, 0, 4, True) is None
+    assert recent.page(None, None, None, None, 2, 2, True) is None
+    assert recent.page(1, None, None, None, 0, 2, True) is None
+    assert (recent.hits, recent.misses) == (5, 3)
+
+
+def test_unprimed_buffer_ignores_writes(recent: RecentLogs) -> None:
+    recent.add([make_log(1, 1, 1)._asdict()])
+    assert recent.floor is None
+    assert recent.page(None, STARTED, None, None, 0, 10) is None
+
+
+def test_discard_before(recent: RecentLogs) -> None:
+    recent.load([make_log(log_id, 1, log_id) for log_id in range(1, 4)])
+    recent.discard_before(STARTED + timedelta(minutes=3))
+    assert [log.id for log in recent._logs] == [3]
+
+    recent.discard_before(STARTED + timedelta(days=1))
+    assert recent.floor is None and recent._user_logs == {}
+
+
+async def test_prime_loads_newest_logs(db_session: AsyncSession, recent: RecentLogs) -> None:
+    db_session.add_all([
+        Log(user_id=log_id % 2, command="/start", timestamp=STARTED + timedelta(minutes=log_id), response="Hello")
+        for log_id in range(1, 6)
+    ])
+    await db_session.commit()
+
+    await recent.prime(lambda: TestingSessionLocal(bind=db_session.bind))
+
+    assert recent.ready
+    assert [(log.id, log.command) for log in recent._logs] == [(3, "/start"), (4, "/start"), (5, "/start")]
+    assert recent.floor == (STARTED + timedelta(minutes=3), 3)
+
+
+async def test_reads_served_from_buffer(client: AsyncClient, recent: RecentLogs) -> None:
+    recent.load([])
+    for user_id in (1, 2, 1):
+        response = await client.post("/logs/", json={"user_id": user_id, "command": "/start", "response": "Hello"})
+        assert response.status_code == 200
+    first = response.json()
+
+    # The first page reaches below the buffer and comes from the database.
+    response = await client.get("/logs/?limit=1")
+    assert [log["id"] for log in response.json()] == [1]
+    cursor = response.headers[NEXT_CURSOR_HEADER]
+    recent.enabled = False
+    database_page = await client.get(f"/logs/?limit=2&cursor={cursor}")
+    recent.enabled = True
+
+    async def no_db() -> AsyncGenerator[None, None]:
+        yield None
+
+    recent.hits = recent.misses = 0
+    for dependency in (get_read_db, get_user_read_db):
+        app.dependency_overrides[dependency] = no_db
+    buffered_page = await client.get(f"/logs/?limit=2&cursor={cursor}")
+    assert buffered_page.status_code == 200
+    assert buffered_page.content == database_page.content
+    assert decode_cursor(buffered_page.headers[NEXT_CURSOR_HEADER])[1] == first["id"]
+
+    response = await client.get(f"/logs/1?cursor={cursor}&fields=id&layout=columns")
+    assert response.json() == {"id": [first["id"]]}
+
+    response = await client.get(f"/logs/?limit=2&cursor={cursor}", headers={"If-None-Match": buffered_page.headers["etag"]})
+    assert response.status_code == 304
+    assert (recent.hits, recent.misses) == (3, 0)
+
+
+async def test_newest_first_reads_served_from_buffer(client: AsyncClient, recent: RecentLogs) -> None:
+    recent.load([])
+    for user_id in (1, 2, 1):
+        response = await client.post("/logs/", json={"user_id": user_id, "command": "/start", "response": "Hello"})
+        assert response.status_code == 200
+
+    recent.enabled = False
+    database_page = await client.get("/logs/?limit=2&order=desc")
+    recent.enabled = True
+
+    recent.hits = recent.misses = 0
+    buffered_page = await client.get("/logs/?limit=2&order=desc")
+    assert buffered_page.content == database_page.content
+    assert buffered_page.headers[NEXT_CURSOR_HEADER] == database_page.headers[NEXT_CURSOR_HEADER]
+    ascending_page = await client.get("/logs/?limit=2", headers={"If-None-Match": buffered_page.headers["etag"]})
+    assert ascending_page.status_code == 200
+    assert (recent.hits, recent.misses) == (1, 1)
+
+
+async def test_recent_stats(client: AsyncClient, recent: RecentLogs) -> None:
+    recent.load([make_log(1, 1, 1), make_log(2, 2, 2)])
+    recent.page(None, None, None, None, 0, 10)
+
+    response = await client.get("/logs/recent/stats")
+    assert response.status_code == 200
+    assert response.json() == {
+        "enabled": True, "entries": 2, "users": 2, "max_entries": 3, "hits": 0, "misses": 1, "hit_rate": 0.0
+    }
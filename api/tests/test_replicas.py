@@ -0,0 +1,118 @@
+import json
+import os
+from datetime import datetime
+from typing import AsyncGenerator, Tuple
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from api.main import app
+from api.models import Log, ReadRouter, get_db, get_read_router, init_schema
+
+Factories = Tuple[async_sessionmaker, async_sessionmaker]
+
+
+def create_database(path: str, responses: list) -> None:
+    sync_engine = create_engine(f"sqlite:///{path}")
+    init_schema(sync_engine)
+    with Session(sync_engine) as db:  # type: ignore[attr-defined]
+        db.add_all([
+            Log(user_id=user_id, command="/start", timestamp=datetime(2024, 6, 1, index), response=response)
+            for index, (user_id, response) in enumerate(responses)
+        ])
+        db.commit()
+    sync_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+async def databases(tmp_path: str) -> AsyncGenerator[Factories, None]:
+    # The replica has caught up with the first log only; the primary marks its copy to tell them apart.
+    create_database(os.path.join(tmp_path, "primary.db"), [(1, "primary")])
+    create_database(os.path.join(tmp_path, "replica.db"), [(1, "replica")])
+    engines = [
+        create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp_path, name)}")
+        for name in ("primary.db", "replica.db")
+    ]
+    primary, replica = (async_sessionmaker(bind=engine, expire_on_commit=False) for engine in engines)
+    yield primary, replica
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def router(databases: Factories) -> ReadRouter:
+    primary, replica = databases
+    return ReadRouter(primary, [replica], pin_seconds=60)
+
+
+@pytest.fixture(scope="function")
+async def client(databases: Factories, router: ReadRouter) -> AsyncGenerator[AsyncClient, None]:
+    primary, _ = databases
+
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        async with primary() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_router] = lambda: router
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+async def test_reads_use_replica(client: AsyncClient) -> None:
+    for url in ("/logs/", "/logs/1"):
+        response = await client.get(url)
+        assert response.status_code == 200
+        assert [log["response"] for log in response.json()] == ["replica"]
+
+
+async def test_user_reads_follow_writes(client: AsyncClient, router: ReadRouter) -> None:
+    response = await client.post("/logs/", json={"user_id": 2, "command": "/start", "response": "written"})
+    assert response.status_code == 200
+    assert router.is_pinned(2) and not router.is_pinned(1)
+
+    response = await client.get("/logs/2")
+    assert [log["response"] for log in response.json()] == ["written"]
+    response = await client.get("/logs/export?user_id=2")
+    assert [json.loads(line)["response"] for line in response.text.splitlines()] == ["written"]
+
+    response = await client.get("/logs/1")
+    assert [log["response"] for log in response.json()] == ["replica"]
+    response = await client.get("/logs/")
+    assert [log["response"] for log in response.json()] == ["replica"]
+
+
+async def test_batch_writes_pin_users(client: AsyncClient, router: ReadRouter) -> None:
+    response = await client.post("/logs/batch", json=[
+        {"user_id": 1, "command": "/weather", "response": "City not specified"},
+        {"user_id": 3, "command": "/start", "response": "Hello"},
+    ])
+    assert response.status_code == 200
+    assert router.is_pinned(1) and router.is_pinned(3)
+
+    response = await client.get("/logs/1")
+    assert [log["response"] for log in response.json()] == ["primary", "City not specified"]
+
+
+async def test_pin_expires(databases: Factories) -> None:
+    primary, replica = databases
+    router = ReadRouter(primary, [replica], pin_seconds=0)
+    router.pin([1])
+    assert not router.is_pinned(1)
+    assert router.session_factory(1) is replica
+
+
+def test_read_router_round_robin() -> None:
+    primary, first, second = async_sessionmaker(), async_sessionmaker(), async_sessionmaker()
+    router = ReadRouter(primary, [first, second], pin_seconds=60)
+    assert [router.session_factory() for _ in range(3)] == [first, second, first]
+
+    router.pin([7])
+    assert router.session_factory(7) is primary
+    assert router.session_factory() is second
+
+    assert ReadRouter(primary, [], pin_seconds=60).session_factory() is primary
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.main import app
+from api.models import Base, Log, get_db, init_schema, get_read_db, get_user_read_db
+from api.routers.utils import encode_cursor, fts_query
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def setup_logs(db_session: AsyncSession) -> None:
+    now = datetime.utcnow()
+    logs = [
+        Log(user_id=1, command="/weather Moscow", timestamp=now - timedelta(hours=4), response="Moscow: +5°C"),
+        Log(user_id=1, command="/weather Paris", timestamp=now - timedelta(hours=3),
+            response="Error: weather service unavailable"),
+        Log(user_id=2, command="/weather Moscow", timestamp=now - timedelta(hours=2),
+            response="Error: /weather command error, Moscow error"),
+        Log(user_id=2, command="/start", timestamp=now - timedelta(hours=1), response="Welcome!")
+    ]
+    db_session.add_all(logs)
+    await db_session.commit()
+
+
+def test_fts_query_quotes_terms() -> None:
+    assert fts_query('/weather "error" OR') == '"/weather" """error""" "OR"'
+
+
+async def test_search_logs_matches_command_and_response(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?q=moscow")
+    assert response.status_code == 200
+    assert {log["response"] for log in response.json()} == {
+        "Moscow: +5°C", "Error: /weather command error, Moscow error"
+    }
+
+
+async def test_search_logs_requires_every_term(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/", params={"q": "/weather command error"})
+    assert response.status_code == 200
+    logs = response.json()
+    assert len(logs) == 1
+    assert logs[0]["user_id"] == 2
+
+
+async def test_search_logs_orders_by_relevance(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?q=error")
+    assert response.status_code == 200
+    logs = response.json()
+    assert [log["command"] for log in logs] == ["/weather Moscow", "/weather Paris"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_search_logs_with_skip_and_limit(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?q=weather&skip=1&limit=1")
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+async def test_search_user_logs(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/1?q=error")
+    assert response.status_code == 200
+    logs = response.json()
+    assert len(logs) == 1
+    assert logs[0]["command"] == "/weather Paris"
+
+
+async def test_search_logs_finds_new_logs(client: AsyncClient, db_session: AsyncSession) -> None:
+    await client.post("/logs/", json={"user_id": 3, "command": "/weather Berlin", "response": "Berlin: +9°C"})
+    response = await client.get("/logs/?q=berlin")
+    assert response.status_code == 200
+    assert [log["user_id"] for log in response.json()] == [3]
+
+
+async def test_search_logs_with_cursor_is_rejected(client: AsyncClient, setup_logs: None) -> None:
+    cursor = encode_cursor(datetime.utcnow(), 1)
+    response = await client.get(f"/logs/?q=error&cursor={cursor}")
+    assert response.status_code == 422
+    assert response.json() == {"detail": "cursor cannot be combined with q"}
+
+
+def test_init_schema_indexes_existing_logs() -> None:
+    sync_engine = create_engine("sqlite:///:memory:")
+    with sync_engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE logs (id INTEGER PRIMARY KEY, user_id INTEGER, command VARCHAR, "
+            "timestamp DATETIME, response VARCHAR)"
+        ))
+        connection.execute(text(
+            "INSERT INTO logs (user_id, command, timestamp, response) "
+            "VALUES (1, '/weather Moscow', '2024-06-01 00:00:00.000000', 'Moscow: +5°C')"
+        ))
+
+    init_schema(sync_engine)
+
+    with sync_engine.connect() as connection:
+        rows = connection.execute(text("SELECT rowid FROM logs_fts WHERE logs_fts MATCH 'moscow'")).all()
+    assert rows == [(1,)]
+    sync_engine.dispose()
@@ -0,0 +1,209 @@
+import json
+import logging
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, List
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.main import app
+from api.models import Base, get_db, get_read_db, get_read_session_factory, get_user_read_db
+from api.schemas import SlowQuery
+from api.slow_queries import (
+    MAX_PARAMETERS_LENGTH,
+    SlowQueryLog,
+    explain,
+    format_parameters,
+    get_slow_query_log,
+    watch_slow_queries
+)
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+def slow_log() -> SlowQueryLog:
+    # Schema setup runs before the log is enabled, so only the statements of the requests are recorded.
+    return SlowQueryLog(threshold=0, max_entries=100, enabled=False)
+
+
+@pytest.fixture(scope="function")
+async def db_session(slow_log: SlowQueryLog) -> AsyncGenerator[AsyncSession, None]:
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    watch_slow_queries(engine.sync_engine, slow_log)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await engine.dispose()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession, slow_log: SlowQueryLog) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_read_session_factory] = lambda: lambda: db_session
+    app.dependency_overrides[get_slow_query_log] = lambda: slow_log
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+async def add_logs(client: AsyncClient, count: int) -> None:
+    for user_id in range(count):
+        response = await client.post("/logs/", json={"user_id": user_id, "command": "/start", "response": "Hello"})
+        assert response.status_code == 200
+
+
+def test_format_parameters() -> None:
+    assert format_parameters((1, "a")) == "(1, 'a')"
+    long = format_parameters([(index,) for index in range(1000)])
+    assert len(long) == MAX_PARAMETERS_LENGTH and long.endswith("...")
+
+
+async def test_slow_statements_are_recorded(
+        client: AsyncClient,
+        slow_log: SlowQueryLog,
+        caplog: pytest.LogCaptureFixture
+) -> None:
+    await add_logs(client, 3)
+    slow_log.enabled = True
+
+    with caplog.at_level(logging.WARNING):
+        response = await client.get("/logs/?limit=2&start_date=2000-01-01T00:00:00")
+    assert response.status_code == 200
+
+    entries = slow_log.entries()
+    page = next(entry for entry in entries if entry.rows == 2)
+    assert page.route == "read_logs"
+    assert page.operation == "SELECT"
+    assert "2000-01-01" in page.parameters
+    assert page.duration_ms >= 0
+    assert page.plan and any(line.lstrip().startswith(("SCAN", "SEARCH")) for line in page.plan)
+
+    messages = [record.getMessage() for record in caplog.records]
+    logged = [json.loads(message.split(": ", 1)[1]) for message in messages if message.startswith("Slow query:")]
+    assert len(logged) == len(entries)
+    assert {entry["route"] for entry in logged} == {"read_logs"}
+    assert logged[-1]["statement"] == entries[0].statement
+
+
+async def test_fast_statements_and_writes(client: AsyncClient, slow_log: SlowQueryLog) -> None:
+    slow_log.enabled = True
+    slow_log.explain = False
+    await add_logs(client, 1)
+
+    inserts = [entry for entry in slow_log.entries() if entry.operation == "INSERT"]
+    assert inserts and all(entry.route == "add_logs" and entry.plan is None for entry in inserts)
+    assert any(entry.rows == 1 for entry in inserts)
+
+    slow_log.threshold = 60
+    recorded = slow_log.recorded
+    await client.get("/logs/")
+    assert slow_log.recorded == recorded
+
+
+class FailingExplainCursor:
+    """DBAPI cursor that records its statements and rejects EXPLAIN, as PostgreSQL does on a parameter mismatch."""
+
+    def __init__(self, executed: List[str]) -> None:
+        self.executed = executed
+
+    def execute(self, statement: str, parameters: Any = None) -> None:
+        self.executed.append(statement)
+        if statement.startswith("EXPLAIN"):
+            raise RuntimeError("could not determine data type of parameter $1")
+
+    def fetchall(self) -> List[Any]:
+        return []
+
+    def close(self) -> None:
+        self.executed.append("close")
+
+
+def test_failed_explain_is_rolled_back_to_its_savepoint() -> None:
+    executed: List[str] = []
+    with pytest.raises(RuntimeError):
+        conn = SimpleNamespace(
+            dialect=SimpleNamespace(name="postgresql"),
+            connection=SimpleNamespace(cursor=lambda: FailingExplainCursor(executed))
+        )
+        explain(conn, "SELECT id FROM logs WHERE user_id = $1", (1,))
+    assert executed == [
+        "SAVEPOINT slow_query_explain",
+        "EXPLAIN SELECT id FROM logs WHERE user_id = $1",
+        "ROLLBACK TO SAVEPOINT slow_query_explain",
+        "RELEASE SAVEPOINT slow_query_explain",
+        "close"
+    ]
+
+
+def test_explain_keeps_the_transaction() -> None:
+    sync_engine = create_engine("sqlite://")
+    log = SlowQueryLog(threshold=0, max_entries=100)
+    watch_slow_queries(sync_engine, log)
+    with sync_engine.connect() as connection:
+        connection.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        connection.commit()
+        connection.exec_driver_sql("INSERT INTO items (id) VALUES (1), (2)")
+        assert connection.exec_driver_sql("SELECT id FROM items WHERE id > ?", (0,)).all() == [(1,), (2,)]
+        connection.rollback()
+        assert connection.exec_driver_sql("SELECT count(*) FROM items").scalar() == 0
+    sync_engine.dispose()
+
+    page = next(entry for entry in log.entries() if entry.statement.startswith("SELECT id"))
+    assert page.rows == 2 and page.plan
+
+
+def test_oldest_entries_are_evicted() -> None:
+    log = SlowQueryLog(threshold=0, max_entries=2)
+    for index in range(3):
+        log.record(SlowQuery(
+            timestamp=datetime(2024, 1, 1, 0, 0, index), route="background", operation="SELECT",
+            statement=f"SELECT {index}", parameters="()", duration_ms=1.0, rows=1, plan=None
+        ))
+
+    assert [entry.statement for entry in log.entries()] == ["SELECT 2", "SELECT 1"]
+    assert log.recorded == 3
+    log.clear()
+    assert log.entries() == [] and log.recorded == 3
+
+
+async def test_read_slow_queries(client: AsyncClient, slow_log: SlowQueryLog) -> None:
+    slow_log.enabled = True
+    await add_logs(client, 3)
+    slow_log.enabled = False
+
+    response = await client.get("/logs/slow-queries")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["enabled"] is False
+    assert body["threshold_ms"] == 0
+    assert body["max_entries"] == 100
+    assert body["recorded"] == len(body["entries"]) >= 3
+    assert body["entries"][0]["timestamp"] >= body["entries"][-1]["timestamp"]
+
+    response = await client.get("/logs/slow-queries?limit=1")
+    assert response.json()["entries"] == body["entries"][:1]
@@ -0,0 +1,130 @@
+from datetime import datetime
+from typing import AsyncGenerator, Generator, List
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.main import app
+from api.models import Base, Log, get_db, get_read_db, get_user_read_db
+from api.routers.utils import NEXT_CURSOR_HEADER
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def setup_logs(db_session: AsyncSession) -> None:
+    db_session.add_all([
+        Log(user_id=1, command="/start", timestamp=datetime(2024, 6, 1, 10), response="Hello"),
+        Log(user_id=2, command="/help", timestamp=datetime(2024, 6, 1, 11), response="Unknown command"),
+        Log(user_id=1, command="/weather", timestamp=datetime(2024, 6, 1, 12), response="City not specified")
+    ])
+    await db_session.commit()
+
+
+@pytest.fixture
+def statements() -> Generator[List[str], None, None]:
+    captured: List[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        captured.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+async def test_read_logs_fields(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?fields=timestamp,user_id,id")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "user_id": 1, "timestamp": "2024-06-01T10:00:00"},
+        {"id": 2, "user_id": 2, "timestamp": "2024-06-01T11:00:00"},
+        {"id": 3, "user_id": 1, "timestamp": "2024-06-01T12:00:00"}
+    ]
+
+
+async def test_read_logs_fields_skip_log_texts(
+        client: AsyncClient, setup_logs: None, statements: List[str]
+) -> None:
+    response = await client.get("/logs/?fields=id,user_id")
+    assert response.status_code == 200
+    page_query = statements[-1]
+    assert "log_texts" not in page_query
+    assert "response" not in page_query
+
+
+async def test_read_logs_columns(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/?layout=columns&limit=2")
+    assert response.status_code == 200
+    assert response.json() == {
+        "id": [1, 2],
+        "user_id": [1, 2],
+        "command": ["/start", "/help"],
+        "timestamp": ["2024-06-01T10:00:00", "2024-06-01T11:00:00"],
+        "response": ["Hello", "Unknown command"]
+    }
+
+    cursor = response.headers[NEXT_CURSOR_HEADER]
+    response = await client.get(f"/logs/?layout=columns&fields=command&limit=2&cursor={cursor}")
+    assert response.json() == {"command": ["/weather"]}
+
+
+async def test_read_user_logs_fields_and_columns(client: AsyncClient, setup_logs: None) -> None:
+    response = await client.get("/logs/1?fields=id,response&layout=columns")
+    assert response.status_code == 200
+    assert response.json() == {"id": [1, 3], "response": ["Hello", "City not specified"]}
+
+    response = await client.get("/logs/1?fields=command")
+    assert response.json() == [{"command": "/start"}, {"command": "/weather"}]
+
+
+async def test_fields_change_etag(client: AsyncClient, setup_logs: None) -> None:
+    full = await client.get("/logs/1")
+    projected = await client.get("/logs/1?fields=id")
+    assert full.headers["etag"] != projected.headers["etag"]
+
+
+@pytest.mark.parametrize("query", ["fields=id,secret", "fields=,", "layout=table"])
+async def test_invalid_projection(client: AsyncClient, setup_logs: None, query: str) -> None:
+    for url in ("/logs/", "/logs/1"):
+        response = await client.get(f"{url}?{query}")
+        assert response.status_code == 422
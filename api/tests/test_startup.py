@@ -0,0 +1,84 @@
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import select
+
+from api import models
+from api.main import app
+
+IMPORT_SCRIPT = """
+import sys
+import api.main
+from api.models import async_engines
+assert not async_engines, async_engines
+assert "sqlalchemy.dialects.postgresql" not in sys.modules
+"""
+
+# Modules that read their settings at import time must not load `.env` themselves.
+SETTINGS_SCRIPT = """
+import dotenv
+def load_dotenv(*args, **kwargs):
+    raise AssertionError("loaded .env")
+dotenv.load_dotenv = load_dotenv
+import api.metrics, api.models, api.slow_queries, api.storage
+api.storage.profile_from_env()
+"""
+
+
+def test_import_does_not_touch_database(tmp_path: str) -> None:
+    path = os.path.join(tmp_path, "logs.db")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "DATABASE_READ_URLS": ""}
+
+    subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=env, check=True)
+
+    assert not os.path.exists(path)
+
+
+def test_settings_modules_do_not_load_dotenv() -> None:
+    subprocess.run([sys.executable, "-c", SETTINGS_SCRIPT], check=True)
+
+
+async def test_lifespan_creates_schema(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = os.path.join(tmp_path, "logs.db")
+    monkeypatch.setattr(models, "DATABASE_URL", f"sqlite:///{path}")
+
+    async with app.router.lifespan_context(app):
+        assert list(models.async_engines) == [f"sqlite+aiosqlite:///{path}"]
+    assert models.async_engines == {}
+
+    connection = sqlite3.connect(path)
+    tables = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    connection.close()
+    assert {"logs", "log_texts", "log_rollups", "logs_fts"} <= tables
+
+
+async def test_lifespan_reports_storage_settings(
+        tmp_path: str,
+        monkeypatch: pytest.MonkeyPatch,
+        caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setattr(models, "DATABASE_URL", f"sqlite:///{os.path.join(tmp_path, 'logs.db')}")
+
+    # The levels uvicorn sets up: INFO for its own loggers, the root logger left at WARNING.
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        async with app.router.lifespan_context(app):
+            pass
+
+    reports = [record for record in caplog.records if record.getMessage().startswith("Storage settings:")]
+    assert [record.levelno for record in reports] == [logging.INFO]
+    assert "'journal_mode': 'wal'" in reports[0].getMessage()
+
+
+async def test_session_factory_creates_engine_on_first_session(tmp_path: str) -> None:
+    path = os.path.join(tmp_path, "replica.db")
+    factory = models.SessionFactory(f"sqlite:///{path}")
+    assert f"sqlite+aiosqlite:///{path}" not in models.async_engines
+
+    async with factory() as db:
+        assert (await db.execute(select(1))).scalar() == 1  # type: ignore[arg-type]
+    assert db.bind is models.get_async_engine(f"sqlite:///{path}")
+    await models.dispose_engines()
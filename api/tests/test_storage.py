@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # type: ignore[attr-defined]
+
+from api.storage import DEFAULT_PROFILE, StorageProfile, apply_storage_profile, profile_from_env, read_storage_settings
+
+TUNED = StorageProfile(
+    journal_mode="wal", synchronous="normal", mmap_size=1048576, cache_size=-2000, busy_timeout=3000,
+    pool_size=2, max_overflow=1, pool_recycle=60
+)
+
+
+def test_profile_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DATABASE_JOURNAL_MODE", "WAL")
+    monkeypatch.setenv("DATABASE_SYNCHRONOUS", "")
+    monkeypatch.setenv("DATABASE_POOL_SIZE", "20")
+    profile = profile_from_env()
+    assert (profile.journal_mode, profile.synchronous, profile.pool_size) == ("wal", None, 20)
+    assert "synchronous" not in profile.pragmas()
+
+    monkeypatch.setenv("DATABASE_JOURNAL_MODE", "wal; DROP TABLE logs")
+    with pytest.raises(ValueError):
+        profile_from_env()
+
+
+def test_engine_options() -> None:
+    assert TUNED.engine_options("sqlite+aiosqlite:///:memory:") == {}
+    assert TUNED.engine_options("sqlite+aiosqlite:///./logs.db") == {
+        "pool_size": 2, "max_overflow": 1, "pool_recycle": 60, "poolclass": AsyncAdaptedQueuePool
+    }
+    assert TUNED.engine_options("postgresql+asyncpg://user@host/logs") == {
+        "pool_size": 2, "max_overflow": 1, "pool_recycle": 60
+    }
+    assert DEFAULT_PROFILE.engine_options("sqlite+aiosqlite:///./logs.db") == {}
+
+
+@pytest.mark.parametrize("profile, expected", [
+    (TUNED, {"journal_mode": "wal", "synchronous": 1, "mmap_size": 1048576, "cache_size": -2000, "busy_timeout": 3000}),
+    (DEFAULT_PROFILE, {"journal_mode": "delete", "synchronous": 2}),
+])
+async def test_settings_applied_on_connect(tmp_path: str, profile: StorageProfile, expected: dict) -> None:
+    url = f"sqlite+aiosqlite:///{os.path.join(tmp_path, 'logs.db')}"
+    engine = create_async_engine(url, **profile.engine_options(url))
+    apply_storage_profile(engine.sync_engine, profile)
+    try:
+        settings = await read_storage_settings(engine)
+    finally:
+        await engine.dispose()
+
+    assert {name: settings[name] for name in expected} == expected
+    assert settings["pool"] == ("AsyncAdaptedQueuePool" if profile is TUNED else "NullPool")
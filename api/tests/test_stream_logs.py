@@ -0,0 +1,162 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.broadcast import DROPPED_EVENT, KEEPALIVE_EVENT, LogBroadcaster, get_log_broadcaster
+from api.ingest import IngestBuffer
+from api.main import app
+from api.models import Base, get_db, get_read_db, get_user_read_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await connection.run_sync(Base.metadata.create_all)
+        session = TestingSessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+def broadcaster() -> LogBroadcaster:
+    return LogBroadcaster(buffer_size=2, keepalive=0.01)
+
+
+@pytest.fixture(scope="function")
+async def client(db_session: AsyncSession, broadcaster: LogBroadcaster) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    app.dependency_overrides[get_log_broadcaster] = lambda: broadcaster
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+def make_log(log_id: int, user_id: int) -> dict:
+    return {
+        "id": log_id,
+        "user_id": user_id,
+        "command": "/start",
+        "timestamp": datetime(2024, 6, 1),
+        "response": "This bot was created as a test for the BobrAi company."
+    }
+
+
+def event_data(event: str) -> dict:
+    return json.loads(event.split("data: ", 1)[1])
+
+
+async def test_broadcaster_filters_by_user(broadcaster: LogBroadcaster) -> None:
+    everyone = broadcaster.subscribe()
+    user = broadcaster.subscribe(user_id=2)
+
+    broadcaster.publish([make_log(1, 1), make_log(2, 2)])
+
+    assert [event_data(everyone.queue.get_nowait())["id"] for _ in range(2)] == [1, 2]
+    assert event_data(user.queue.get_nowait())["id"] == 2
+    assert user.queue.empty()
+    assert broadcaster.stats().model_dump() == {
+        "subscribers": 2, "buffer_size": 2, "published": 2, "delivered": 3, "dropped": 0
+    }
+
+
+async def test_broadcaster_drops_slow_subscriber(broadcaster: LogBroadcaster) -> None:
+    slow = broadcaster.subscribe()
+    broadcaster.publish([make_log(log_id, 1) for log_id in (1, 2, 3)])
+
+    assert broadcaster.subscriptions == set()
+    assert broadcaster.stats().dropped == 1
+    events = [event async for event in slow.events(broadcaster.keepalive)]
+    assert [event_data(event)["id"] for event in events[:-1]] == [1, 2]
+    assert events[-1] == DROPPED_EVENT
+
+
+async def test_subscription_sends_keepalive(broadcaster: LogBroadcaster) -> None:
+    subscription = broadcaster.subscribe()
+    events = subscription.events(broadcaster.keepalive)
+    assert await events.__anext__() == KEEPALIVE_EVENT
+    await events.aclose()
+
+
+async def test_stream_logs(client: AsyncClient, broadcaster: LogBroadcaster) -> None:
+    stream = asyncio.create_task(client.get("/logs/stream?user_id=1"))
+    while not broadcaster.subscriptions:
+        await asyncio.sleep(0)
+
+    # Logs of other users are skipped; the third log of user 1 overflows the buffer and ends the stream.
+    broadcaster.publish([make_log(1, 2), make_log(2, 1), make_log(3, 1), make_log(4, 1)])
+    response = await stream
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [event for event in response.text.split("\n\n") if event and not event.startswith(":")]
+    assert events[0].startswith("id: 2\n")
+    assert [event_data(event)["id"] for event in events[:-1]] == [2, 3]
+    assert events[-1] + "\n\n" == DROPPED_EVENT
+    assert broadcaster.subscriptions == set()
+
+
+async def test_add_logs_publishes(client: AsyncClient, broadcaster: LogBroadcaster) -> None:
+    subscription = broadcaster.subscribe()
+
+    response = await client.post("/logs/", json={"user_id": 1, "command": "/start", "response": "Hello"})
+    assert response.status_code == 200
+
+    assert event_data(subscription.queue.get_nowait()) == response.json()
+
+
+async def test_add_logs_batch_publishes(client: AsyncClient, broadcaster: LogBroadcaster) -> None:
+    subscription = broadcaster.subscribe(user_id=2)
+
+    response = await client.post("/logs/batch", json=[
+        {"user_id": 1, "command": "/start", "response": "Hello"},
+        {"user_id": 2, "command": "/weather", "response": "City not specified"},
+    ])
+    assert response.status_code == 200
+
+    data = event_data(subscription.queue.get_nowait())
+    assert (data["id"], data["command"]) == (response.json()["ids"][1], "/weather")
+    assert subscription.queue.empty()
+
+
+async def test_ingest_flush_publishes(db_session: AsyncSession, broadcaster: LogBroadcaster) -> None:
+    buffer = IngestBuffer(
+        lambda: TestingSessionLocal(bind=db_session.bind),
+        max_size=10,
+        batch_size=10,
+        flush_interval=0.01,
+        broadcaster=broadcaster
+    )
+    subscription = broadcaster.subscribe()
+
+    await buffer.flush([{"user_id": 1, "command": "/start", "timestamp": datetime(2024, 6, 1), "response": "Hello"}])
+
+    data = event_data(subscription.queue.get_nowait())
+    assert (data["user_id"], data["response"]) == (1, "Hello")
+    assert isinstance(data["id"], int)
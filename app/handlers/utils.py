@@ -23,7 +23,7 @@ async def send_log(message: Message, response: str) -> None:
     try:
         async with aiohttp.ClientSession() as session:
             async with session.post(url, json=payload, headers=headers) as resp:
-                if resp.status == 200:
+                if resp.status in (200, 202):
                     log_response = await resp.json()
                     logging.info("Log added successfully: %s", log_response)
                 else: